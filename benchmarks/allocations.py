@@ -0,0 +1,114 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Measures the memory allocated when parsing and serializing the typical frame of every implemented action.
+
+Usage:
+
+    python -m benchmarks.allocations [--update-budgets]
+
+For each action, message type and operation, reports:
+
+- peak: the highest amount of memory allocated while running the operation once, including short-lived objects
+- retained: the memory still allocated after the operation, i.e. the size of the parsed message or serialized list
+- blocks: the number of memory blocks still allocated after the operation
+- gc/1k: the number of generation 0 garbage collections triggered by running the operation 1000 times, keeping every
+  result alive as a batch would
+
+'--update-budgets' writes the peak and retained memory of every measure to 'allocation_budgets.json', checked by
+'benchmarks/test_allocations.py'. Measures depend on the Python version, budgets are only checked with the version
+they were written with.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+import typing
+
+from benchmarks import corpus
+from ocpp_codec import serializer
+
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'allocation_budgets.json')
+# Samples measured, the typical frame of every action
+SAMPLES = [sample for sample in corpus.build_corpus() if sample.size == 'typical']
+
+
+def _measure(operation: typing.Callable[[], typing.Any]) -> typing.Dict[str, float]:
+    # Warm up caches first, they're not part of the operation's cost
+    operation()
+    gc.collect()
+
+    tracemalloc.start()
+    try:
+        result = operation()
+        retained, peak = tracemalloc.get_traced_memory()
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    finally:
+        tracemalloc.stop()
+    del result
+
+    collections_before = gc.get_stats()[0]['collections']
+    results = [operation() for _ in range(1000)]
+    collections = gc.get_stats()[0]['collections'] - collections_before
+    del results
+
+    return {'peak': peak, 'retained': retained, 'blocks': blocks, 'gc/1k': collections}
+
+
+def measure_sample(sample: corpus.Sample) -> typing.Dict[str, typing.Dict[str, float]]:
+    """Measures parsing and serializing the frame of a sample.
+
+    Returns:
+        dict, the measures of the 'parse' and 'serialize' operations
+    """
+    def parse():
+        return serializer.parse(sample.frame, sample.call_result_action_name, protocol=sample.protocol)
+
+    message = parse()
+    return {
+        'parse': _measure(parse),
+        'serialize': _measure(lambda: serializer.serialize(message)),
+    }
+
+
+def measure_all() -> typing.Dict[str, typing.Dict[str, float]]:
+    """Measures every sample, by '<sample id> <operation>'."""
+    return {
+        f'{sample.id} {operation}': measures
+        for sample in SAMPLES
+        for operation, measures in measure_sample(sample).items()
+    }
+
+
+def python_version() -> str:
+    return '.'.join(map(str, sys.version_info[:2]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--update-budgets', action='store_true', help="write the measures as the new budgets")
+    args = parser.parse_args(argv)
+
+    results = measure_all()
+    print(f"{'measure':<52} {'peak (B)':>10} {'retained (B)':>13} {'blocks':>7} {'gc/1k':>6}")
+    for key, measures in results.items():
+        print(
+            f"{key:<52} {measures['peak']:>10} {measures['retained']:>13} {measures['blocks']:>7} "
+            f"{measures['gc/1k']:>6}"
+        )
+
+    if args.update_budgets:
+        budgets = {
+            'python': python_version(),
+            'budgets': {
+                key: {'peak': measures['peak'], 'retained': measures['retained']} for key, measures in results.items()
+            },
+        }
+        with open(BUDGETS_PATH, 'w') as budgets_file:
+            json.dump(budgets, budgets_file, indent=2, sort_keys=True)
+            budgets_file.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Deterministic corpus of valid OCPP frames, for every implemented action of every protocol version.
+
+Frames are built by 'ocpp_codec.generator', with a fixed seed, in three sizes:
+
+- small: only required fields, lists of a single element and strings of a single character
+- typical: every field, a few list elements and strings of a realistic length
+- worst: every field, long lists and long strings, capped by the fields validators
+"""
+import dataclasses
+import typing
+
+from ocpp_codec import compat
+from ocpp_codec import generator
+from ocpp_codec import structure
+
+
+SIZES = ('small', 'typical', 'worst')
+
+# Settings of the generator building the frames of each size
+_SETTINGS: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+    'small': {'optional_density': 0, 'list_length': (1, 1), 'string_length': 1},
+    'typical': {'optional_density': 1, 'list_length': (3, 3), 'string_length': 10},
+    'worst': {'optional_density': 1, 'list_length': (20, 20), 'string_length': 1000},
+}
+_SEED = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class Sample:
+    """A frame of the corpus, and what's needed to parse it."""
+    protocol: compat.OcppJsonProtocol
+    action: str
+    message_type: structure.MessageTypeEnum
+    size: str
+    frame: typing.List
+
+    @property
+    def call_result_action_name(self) -> typing.Optional[str]:
+        return self.action if self.message_type is structure.MessageTypeEnum.CALLRESULT else None
+
+    @property
+    def id(self) -> str:
+        return f'{self.protocol.name}-{self.action}-{self.message_type.name}-{self.size}'
+
+
+def build_corpus() -> typing.List[Sample]:
+    """Builds a sample of every size, for the Call and CallResult of every implemented action of every protocol."""
+    corpus = []
+    for protocol in compat.OcppJsonProtocol:
+        frame_generators = {size: generator.Generator(protocol, seed=_SEED, **_SETTINGS[size]) for size in SIZES}
+        for action_name in sorted(compat.get_implemented_messages(protocol)):
+            for size, frame_generator in frame_generators.items():
+                corpus.append(Sample(
+                    protocol, action_name, structure.MessageTypeEnum.CALL, size, frame_generator.call(action_name),
+                ))
+                corpus.append(Sample(
+                    protocol, action_name, structure.MessageTypeEnum.CALLRESULT, size,
+                    frame_generator.call_result(action_name),
+                ))
+    return corpus
@@ -0,0 +1,97 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Compares the memory footprint of slotted message and type dataclasses with their '__dict__' based equivalents.
+
+Usage:
+
+    python -m benchmarks.memory_slots [--count 100000]
+"""
+import argparse
+import dataclasses
+import tracemalloc
+
+from ocpp_codec import serializer
+from ocpp_codec import structure
+from ocpp_codec.v16 import messages as messages_v16
+from ocpp_codec.v16 import types as types_v16
+from ocpp_codec.v20 import types as types_v20
+
+
+def _factory(dataclass_class, data):
+    """Parses 'data' once, returning a factory of copies of the parsed instance, sharing its nested values."""
+    sample = serializer.parse_data(dataclass_class, data)
+    return lambda: dataclasses.replace(sample)
+
+
+# One instance factory per measured class, nested values are shared so that only the instance itself is measured
+_SAMPLES = {
+    types_v16.IdTagInfo: _factory(types_v16.IdTagInfo, {'status': 'Accepted'}),
+    types_v16.SampledValue: _factory(types_v16.SampledValue, {
+        'value': '1200.5', 'measurand': 'Energy.Active.Import.Register', 'unit': 'Wh',
+    }),
+    types_v16.MeterValue: _factory(types_v16.MeterValue, {
+        'timestamp': '2020-06-01T12:00:00Z', 'sampledValue': [{'value': '1200.5'}],
+    }),
+    types_v16.ChargingProfile: _factory(types_v16.ChargingProfile, {
+        'chargingProfileId': 1,
+        'stackLevel': 0,
+        'chargingProfilePurpose': 'TxProfile',
+        'chargingProfileKind': 'Absolute',
+        'chargingSchedule': {'chargingRateUnit': 'W', 'chargingSchedulePeriod': [{'startPeriod': 0, 'limit': 11000.0}]},
+    }),
+    types_v20.SampledValueType: _factory(types_v20.SampledValueType, {
+        'value': 1200.5, 'measurand': 'Energy.Active.Import.Register',
+    }),
+    types_v20.ComponentType: _factory(types_v20.ComponentType, {'name': 'EVSE'}),
+    messages_v16.StatusNotification.req: _factory(messages_v16.StatusNotification.req, {
+        'connectorId': 1, 'errorCode': 'NoError', 'status': 'Available',
+    }),
+    structure.CallResult: _factory(structure.CallResult, {'messageTypeId': 3, 'uniqueId': '19223201', 'payload': {}}),
+}
+
+
+def _dict_based_equivalent(dataclass_class):
+    """Builds an equivalent of 'dataclass_class' using a regular '__dict__' to store its fields."""
+    return dataclasses.make_dataclass(
+        dataclass_class.__name__,
+        [(field.name, field.type, dataclasses.field(default=None)) for field in dataclasses.fields(dataclass_class)],
+    )
+
+
+def _measure(factory, count):
+    tracemalloc.start()
+    try:
+        snapshot_before = tracemalloc.take_snapshot()
+        instances = [factory() for _ in range(count)]
+        snapshot_after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, 'filename'))
+    # Don't account for the list holding the instances
+    allocated -= instances.__sizeof__()
+    return allocated / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000, help="number of instances built per class")
+    args = parser.parse_args(argv)
+
+    print(f"{'class':<40} {'slots (B)':>10} {'__dict__ (B)':>13} {'saved':>6}")
+    for dataclass_class, factory in _SAMPLES.items():
+        sample = factory()
+        dict_based_class = _dict_based_equivalent(dataclass_class)
+        values = {
+            field.name: getattr(sample, field.name) for field in dataclasses.fields(dataclass_class) if field.init
+        }
+
+        slotted_size = _measure(factory, args.count)
+        dict_based_size = _measure(lambda: dict_based_class(**values), args.count)
+        print(
+            f"{dataclass_class.__qualname__:<40} {slotted_size:>10.0f} {dict_based_size:>13.0f} "
+            f"{1 - slotted_size / dict_based_size:>6.0%}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Memory allocation budgets of parsing and serializing the typical frame of every implemented action.
+
+Fails when an operation allocates more memory than its budget, see 'benchmarks/allocations.py' to measure and update
+budgets.
+"""
+import json
+
+import pytest
+
+from benchmarks import allocations
+
+
+# Relative increase over the budget tolerated, absorbing the small variations between runs
+TOLERANCE = 0.1
+
+with open(allocations.BUDGETS_PATH) as budgets_file:
+    BUDGETS = json.load(budgets_file)
+
+
+@pytest.mark.skipif(
+    BUDGETS['python'] != allocations.python_version(),
+    reason=f"Budgets were measured with Python {BUDGETS['python']}, run 'python -m benchmarks.allocations "
+           f"--update-budgets' to measure them with this version",
+)
+@pytest.mark.parametrize('sample', allocations.SAMPLES, ids=lambda sample: sample.id)
+def test_allocation_budget(sample):
+    for operation, measures in allocations.measure_sample(sample).items():
+        budget = BUDGETS['budgets'][f'{sample.id} {operation}']
+        for measure in ('peak', 'retained'):
+            assert measures[measure] <= budget[measure] * (1 + TOLERANCE), (
+                f"{operation} allocates {measures[measure]} bytes ({measure}), over its budget of {budget[measure]}"
+            )
@@ -0,0 +1,105 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Throughput and latency benchmarks of parsing and serializing, using pytest-benchmark.
+
+Usage:
+
+    pytest benchmarks/ [--benchmark-group-by=group] [--benchmark-autosave]
+
+Every implemented action is measured with the small, typical and worst-case frames of 'benchmarks.corpus'. The
+message envelope, validators and encoders are measured separately. Compare with a previous run to catch regressions:
+
+    pytest benchmarks/ --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+import datetime
+import json
+
+import pytest
+
+from benchmarks import corpus
+from ocpp_codec import compat
+from ocpp_codec import encoders
+from ocpp_codec import serializer
+from ocpp_codec import validators
+from ocpp_codec.v16 import types as types_v16
+
+
+CORPUS = corpus.build_corpus()
+
+
+@pytest.mark.parametrize('sample', CORPUS, ids=lambda sample: sample.id)
+def test_parse(benchmark, sample):
+    benchmark.group = f'parse-{sample.size}'
+    benchmark.extra_info['bytes'] = len(json.dumps(sample.frame))
+    benchmark(serializer.parse, sample.frame, sample.call_result_action_name, protocol=sample.protocol)
+
+
+@pytest.mark.parametrize('sample', CORPUS, ids=lambda sample: sample.id)
+def test_serialize(benchmark, sample):
+    benchmark.group = f'serialize-{sample.size}'
+    benchmark.extra_info['bytes'] = len(json.dumps(sample.frame))
+    message = serializer.parse(sample.frame, sample.call_result_action_name, protocol=sample.protocol)
+    benchmark(serializer.serialize, message)
+
+
+#################################################
+# Envelope, validators and encoders, in isolation
+
+# Frames with an empty payload, and the action name of CallResult frames
+ENVELOPES = {
+    'Call': ([2, '19223201', 'Heartbeat', {}], None),
+    'CallResult': ([3, '19223201', {}], 'StatusNotification'),
+    'CallError': ([4, '19223201', 'GenericError', 'Something went wrong', {'field': 'value'}], None),
+}
+
+
+@pytest.mark.parametrize('frame,action', ENVELOPES.values(), ids=ENVELOPES.keys())
+def test_parse_envelope(benchmark, frame, action):
+    benchmark.group = 'envelope'
+    benchmark(serializer.parse, frame, action, protocol=compat.OcppJsonProtocol.v16)
+
+
+@pytest.mark.parametrize('frame,action', ENVELOPES.values(), ids=ENVELOPES.keys())
+def test_serialize_envelope(benchmark, frame, action):
+    benchmark.group = 'envelope'
+    message = serializer.parse(frame, action, protocol=compat.OcppJsonProtocol.v16)
+    benchmark(serializer.serialize, message)
+
+
+VALIDATORS = {
+    'max_length_20': (validators.max_length_20, 'A' * 20),
+    'max_length_2500': (validators.max_length_2500, 'A' * 2500),
+    'decimal_precision_1': (validators.decimal_precision_1, 1200.5),
+    'is_positive': (validators.is_positive, 1200),
+    'is_not_zero': (validators.is_not_zero, 1200),
+    'is_identifier': (validators.is_identifier, 'A' * 36),
+}
+
+
+@pytest.mark.parametrize('validator,value', VALIDATORS.values(), ids=VALIDATORS.keys())
+def test_validator(benchmark, validator, value):
+    benchmark.group = 'validators'
+    benchmark(validator, value)
+
+
+_NOW = datetime.datetime(2020, 6, 1, 12, 0, 0, 123456, tzinfo=datetime.timezone.utc)
+ENCODERS = {
+    'DateTimeEncoder': (encoders.DateTimeEncoder(), '2020-06-01T12:00:00.123456Z', _NOW),
+    'EnumEncoder': (
+        encoders.EnumEncoder(types_v16.MeasurandEnum),
+        'Energy.Active.Import.Register',
+        types_v16.MeasurandEnum.Energy_Active_Import_Register,
+    ),
+    'OutgoingMessageDecimalEncoder': (encoders.OutgoingMessageDecimalEncoder(), 1200.123456789, 1200.123456789),
+}
+
+
+@pytest.mark.parametrize('encoder,json_value,value', ENCODERS.values(), ids=ENCODERS.keys())
+def test_encoder_from_json(benchmark, encoder, json_value, value):
+    benchmark.group = 'encoders-from-json'
+    benchmark(encoder.from_json, json_value)
+
+
+@pytest.mark.parametrize('encoder,json_value,value', ENCODERS.values(), ids=ENCODERS.keys())
+def test_encoder_to_json(benchmark, encoder, json_value, value):
+    benchmark.group = 'encoders-to-json'
+    benchmark(encoder.to_json, value)
@@ -0,0 +1,620 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Compact append-only log of OCPP frames.
+
+OCPP traffic is very repetitive: action names, enum values, vendor strings, field names... Archives store each frame
+as a tagged value tree, where repeated strings are replaced by references to a string dictionary shared by the whole
+file. Records are grouped in blocks compressed with zlib, or zstd when the 'zstandard' package is installed.
+
+    with archive.ArchiveWriter('traffic.ocpplog') as writer:
+        writer.write(raw_frame, charge_point_id='CP-1', direction=archive.Direction.RECEIVED)
+
+    for call in archive.ArchiveReader('traffic.ocpplog').messages(protocol=compat.OcppJsonProtocol.v16):
+        ...
+
+File layout:
+- header: magic bytes, format version and compression method,
+- blocks, each made of an uncompressed header (varints: timestamp of the first record in microseconds since the
+  epoch, number of records, length of the dictionary section, length of the records section), a compressed dictionary
+  section holding the strings added to the dictionary by this block, and a compressed records section.
+
+Dictionary sections are compressed separately from records, so that the dictionary of a file can be loaded without
+decompressing its records, e.g. to read a single block from its offset.
+
+Each record holds its timestamp as a zigzag varint delta to the previous record of the block (in microseconds), a
+reference to the charge point id in the dictionary, its direction and the frame itself. Frames which aren't valid
+JSON are stored as raw bytes, so that they can still be inspected.
+"""
+import datetime
+import enum
+import json
+import mmap
+import os
+import struct
+import time
+import typing
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore # zstandard is an optional dependency
+
+from ocpp_codec import compat
+from ocpp_codec import exceptions
+from ocpp_codec import serializer
+from ocpp_codec import structure
+from ocpp_codec.utils import slotted_dataclass
+
+
+MAGIC = b'OCPPLOG'
+FORMAT_VERSION = 1
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+_FLOAT = struct.Struct('>d')
+
+# Strings longer than this are never added to the dictionary
+_MAX_DICTIONARY_STRING_LENGTH = 64
+# Number of distinct strings seen only once remembered while looking for repeated strings
+_MAX_CANDIDATES = 65536
+
+# Value tree tags
+_NULL, _FALSE, _TRUE, _INT, _FLOAT_TAG, _STRING, _STRING_REF, _LIST, _DICT, _RAW = range(10)
+
+
+class Direction(enum.Enum):
+    RECEIVED = 0  # Sent by the charge point
+    SENT = 1  # Sent to the charge point
+
+
+class Compression(enum.Enum):
+    ZLIB = 0
+    ZSTD = 1
+
+
+@slotted_dataclass
+class Record:
+    """A frame read from an archive.
+
+    Attributes:
+        - timestamp: datetime.datetime, when the frame was recorded
+        - charge_point_id: str, identifier of the charge point which sent or received the frame
+        - direction: Direction, whether the frame was received from, or sent to, the charge point
+        - frame: object, the frame as decoded from JSON, or the raw frame bytes when it wasn't valid JSON (str frames
+                 are encoded to UTF-8)
+        - block_offset: int, offset of the block holding the record in the file
+        - index: int, position of the record in its block
+    """
+    timestamp: datetime.datetime
+    charge_point_id: str
+    direction: Direction
+    frame: typing.Any
+    block_offset: int
+    index: int
+
+
+########
+# Varints
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data, offset: int) -> typing.Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value // 2 if not value & 1 else -(value + 1) // 2
+
+
+def _to_microseconds(timestamp: datetime.datetime) -> int:
+    if timestamp.utcoffset() is None:
+        raise ValueError(f"Can't archive naive timestamp {timestamp.isoformat()}, a timezone is required")
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+
+#############
+# Compression
+
+def _compressor(compression: Compression, level: typing.Optional[int]):
+    if compression is Compression.ZSTD:
+        if zstandard is None:
+            raise ImportError("zstandard is required to use zstd compression, install ocpp-codec[zstd]")
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress
+    return lambda data: zlib.compress(data, 6 if level is None else level)
+
+
+def _decompressor(compression: Compression):
+    if compression is Compression.ZSTD:
+        if zstandard is None:
+            raise ImportError("zstandard is required to read zstd compressed archives, install ocpp-codec[zstd]")
+        return zstandard.ZstdDecompressor().decompress
+    return zlib.decompress
+
+
+#########
+# Writing
+
+class ArchiveWriter:
+    """Appends frames to an archive file.
+
+    Records are buffered until 'block_size' bytes of records are accumulated, then written as a compressed block.
+    Opening an existing archive appends new blocks to it, reusing its dictionary and compression method.
+    """
+
+    def __init__(
+        self,
+        path: typing.Union[str, os.PathLike],
+        *,
+        compression: Compression = Compression.ZLIB,
+        level: typing.Optional[int] = None,
+        block_size: int = 65536,
+    ):
+        """Opens an archive for writing, creating it if needed.
+
+        Args:
+            - path: str or path-like, the path of the archive
+            - compression: Compression, compression method of new archives (default: Compression.ZLIB)
+            - level: int, compression level, uses the compression method's default when None (default: None)
+            - block_size: int, the size of uncompressed records after which a block is written (default: 65536)
+        """
+        self.block_size = block_size
+        self._dictionary: typing.Dict[str, int] = {}
+        self._candidates: typing.Set[str] = set()
+
+        if os.path.exists(path) and os.path.getsize(path):
+            reader = ArchiveReader(path)
+            compression = reader.compression
+            self._dictionary = {string: index for index, string in enumerate(reader.dictionary)}
+            reader.close()
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(MAGIC + bytes([FORMAT_VERSION, compression.value]))
+
+        self.compression = compression
+        self._compress = _compressor(compression, level)
+        self._reset_block()
+
+    def _reset_block(self) -> None:
+        self._records = bytearray()
+        self._new_strings: typing.List[str] = []
+        self._record_count = 0
+        self._base_timestamp: typing.Optional[int] = None
+        self._last_timestamp = 0
+
+    def write(
+        self,
+        frame: typing.Union[str, bytes, list],
+        *,
+        charge_point_id: str,
+        direction: Direction,
+        timestamp: typing.Optional[datetime.datetime] = None,
+    ) -> None:
+        """Appends a frame to the archive.
+
+        Args:
+            - frame: str, bytes or list, the raw JSON frame, or the frame decoded from JSON
+            - charge_point_id: str, identifier of the charge point which sent or received the frame
+            - direction: Direction, whether the frame was received from, or sent to, the charge point
+            - timestamp: datetime.datetime, when the frame was received or sent, defaults to now (default: None)
+
+        Raises:
+            - ValueError: raised when the frame holds values that can't be archived, or when the timestamp is naive
+        """
+        if timestamp is None:
+            timestamp = datetime.datetime.now(datetime.timezone.utc)
+        microseconds = _to_microseconds(timestamp)
+
+        # Drop the partially written record on errors, so that the block stays readable
+        state = (len(self._records), len(self._new_strings), self._base_timestamp, self._last_timestamp)
+        try:
+            self._write_record(frame, charge_point_id, direction, microseconds)
+        except BaseException:
+            self._rollback(*state)
+            raise
+
+        self._record_count += 1
+        if len(self._records) >= self.block_size:
+            self.flush()
+
+    def _write_record(
+        self,
+        frame: typing.Union[str, bytes, list],
+        charge_point_id: str,
+        direction: Direction,
+        microseconds: int,
+    ) -> None:
+        if self._base_timestamp is None:
+            self._base_timestamp = self._last_timestamp = microseconds
+
+        records = self._records
+        _write_varint(records, _zigzag(microseconds - self._last_timestamp))
+        self._last_timestamp = microseconds
+        _write_varint(records, self._reference(charge_point_id))
+        records.append(direction.value)
+
+        if isinstance(frame, (str, bytes)):
+            try:
+                value = json.loads(frame)
+            except ValueError:
+                records.append(_RAW)
+                raw = frame.encode('utf-8') if isinstance(frame, str) else frame
+                _write_varint(records, len(raw))
+                records += raw
+            else:
+                self._write_value(value, is_frame=True)
+        else:
+            self._write_value(frame, is_frame=True)
+
+    def _rollback(
+        self,
+        records_length: int,
+        new_strings_count: int,
+        base_timestamp: typing.Optional[int],
+        last_timestamp: int,
+    ) -> None:
+        del self._records[records_length:]
+        for string in self._new_strings[new_strings_count:]:
+            del self._dictionary[string]
+        del self._new_strings[new_strings_count:]
+        self._base_timestamp = base_timestamp
+        self._last_timestamp = last_timestamp
+
+    def _reference(self, string: str) -> int:
+        try:
+            return self._dictionary[string]
+        except KeyError:
+            index = self._dictionary[string] = len(self._dictionary)
+            self._new_strings.append(string)
+            return index
+
+    def _write_string(self, string: str) -> None:
+        records = self._records
+        index = self._dictionary.get(string)
+        if index is None and len(string) <= _MAX_DICTIONARY_STRING_LENGTH:
+            # Only strings seen at least twice are worth a dictionary entry, unique identifiers and timestamps are not
+            if string in self._candidates:
+                self._candidates.discard(string)
+                index = self._reference(string)
+            else:
+                if len(self._candidates) >= _MAX_CANDIDATES:
+                    self._candidates.clear()
+                self._candidates.add(string)
+
+        if index is not None:
+            records.append(_STRING_REF)
+            _write_varint(records, index)
+        else:
+            data = string.encode('utf-8')
+            records.append(_STRING)
+            _write_varint(records, len(data))
+            records += data
+
+    def _write_value(self, value: typing.Any, *, is_frame: bool = False) -> None:
+        records = self._records
+        if value is None:
+            records.append(_NULL)
+        elif value is True:
+            records.append(_TRUE)
+        elif value is False:
+            records.append(_FALSE)
+        elif isinstance(value, int):
+            records.append(_INT)
+            _write_varint(records, _zigzag(value))
+        elif isinstance(value, float):
+            records.append(_FLOAT_TAG)
+            records += _FLOAT.pack(value)
+        elif isinstance(value, str):
+            self._write_string(value)
+        elif isinstance(value, list):
+            records.append(_LIST)
+            _write_varint(records, len(value))
+            for position, item in enumerate(value):
+                # Unique ids are unique by definition, don't consider them for the dictionary
+                if is_frame and position == 1 and isinstance(item, str):
+                    data = item.encode('utf-8')
+                    records.append(_STRING)
+                    _write_varint(records, len(data))
+                    records += data
+                else:
+                    self._write_value(item)
+        elif isinstance(value, dict):
+            records.append(_DICT)
+            _write_varint(records, len(value))
+            for key, item in value.items():
+                self._write_string(key)
+                self._write_value(item)
+        else:
+            raise ValueError(f"Can't archive values of type '{type(value).__name__}'")
+
+    def flush(self) -> None:
+        """Writes buffered records as a block, and flushes the file."""
+        # Blocks get their base timestamp from their first record
+        if self._base_timestamp is not None:
+            strings = bytearray()
+            for string in self._new_strings:
+                data = string.encode('utf-8')
+                _write_varint(strings, len(data))
+                strings += data
+            compressed_strings = self._compress(bytes(strings))
+            compressed_records = self._compress(bytes(self._records))
+
+            header = bytearray()
+            for value in (self._base_timestamp, self._record_count, len(compressed_strings), len(compressed_records)):
+                _write_varint(header, value)
+            self._file.write(header + compressed_strings + compressed_records)
+            self._reset_block()
+        self._file.flush()
+
+    def close(self) -> None:
+        """Writes buffered records and closes the file."""
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+#########
+# Reading
+
+@slotted_dataclass
+class _BlockHeader:
+    offset: int
+    base_timestamp: int
+    record_count: int
+    # Offsets of the compressed dictionary and records sections
+    strings_offset: int
+    records_offset: int
+    end_offset: int
+    # Size of the dictionary before this block's strings are added
+    dictionary_size: int
+
+
+class ArchiveReader:
+    """Reads the frames of an archive, sequentially or block by block.
+
+    The file is memory-mapped, block headers and the dictionary are loaded when the archive is opened. Only the blocks
+    being read are decompressed.
+
+    Attributes:
+        - compression: Compression, compression method of the archive
+        - dictionary: list of str, the string dictionary of the archive
+        - block_offsets: list of int, offsets of every block of the archive
+    """
+
+    def __init__(self, path: typing.Union[str, os.PathLike]):
+        """Opens an archive, loading its dictionary.
+
+        Raises:
+            - ValueError: raised when the file isn't an archive, or is corrupted
+        """
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._data: typing.Union[mmap.mmap, bytes] = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        )
+
+        header_size = len(MAGIC) + 2
+        if self._data[:len(MAGIC)] != MAGIC or len(self._data) < header_size:
+            self.close()
+            raise ValueError(f"'{path}' isn't an OCPP archive")
+        version, compression = self._data[len(MAGIC)], self._data[len(MAGIC) + 1]
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported archive format version {version}")
+        self.compression = Compression(compression)
+        self._decompress = _decompressor(self.compression)
+
+        self.dictionary: typing.List[str] = []
+        self._blocks: typing.Dict[int, _BlockHeader] = {}
+        offset = header_size
+        try:
+            while offset < len(self._data):
+                block = self._read_block_header(offset)
+                self._blocks[offset] = block
+                self._load_strings(block)
+                offset = block.end_offset
+        except (IndexError, UnicodeDecodeError, zlib.error) as exc:
+            self.close()
+            raise ValueError(f"Corrupted archive block at offset {offset}") from exc
+        self.block_offsets = list(self._blocks)
+
+    def _read_block_header(self, offset: int) -> _BlockHeader:
+        data = self._data
+        base_timestamp, position = _read_varint(data, offset)
+        record_count, position = _read_varint(data, position)
+        strings_length, position = _read_varint(data, position)
+        records_length, position = _read_varint(data, position)
+        end_offset = position + strings_length + records_length
+        if end_offset > len(data):
+            raise IndexError("Truncated block")
+        return _BlockHeader(
+            offset=offset,
+            base_timestamp=base_timestamp,
+            record_count=record_count,
+            strings_offset=position,
+            records_offset=position + strings_length,
+            end_offset=end_offset,
+            dictionary_size=len(self.dictionary),
+        )
+
+    def _load_strings(self, block: _BlockHeader) -> None:
+        strings = self._decompress(self._data[block.strings_offset:block.records_offset])
+        offset = 0
+        while offset < len(strings):
+            length, offset = _read_varint(strings, offset)
+            self.dictionary.append(strings[offset:offset + length].decode('utf-8'))
+            offset += length
+
+    def read_block(self, offset: int) -> typing.List[Record]:
+        """Decompresses and decodes every record of the block at 'offset'.
+
+        Raises:
+            - KeyError: raised when no block starts at 'offset'
+        """
+        block = self._blocks[offset]
+        data = self._decompress(self._data[block.records_offset:block.end_offset])
+        dictionary = self.dictionary
+
+        records = []
+        timestamp = block.base_timestamp
+        position = 0
+        for index in range(block.record_count):
+            delta, position = _read_varint(data, position)
+            timestamp += _unzigzag(delta)
+            charge_point_index, position = _read_varint(data, position)
+            direction = Direction(data[position])
+            frame, position = self._read_value(data, position + 1)
+            records.append(Record(
+                timestamp=_EPOCH + timestamp * _MICROSECOND,
+                charge_point_id=dictionary[charge_point_index],
+                direction=direction,
+                frame=frame,
+                block_offset=offset,
+                index=index,
+            ))
+        return records
+
+    def _read_value(self, data: bytes, position: int) -> typing.Tuple[typing.Any, int]:
+        tag = data[position]
+        position += 1
+        if tag == _STRING_REF:
+            index, position = _read_varint(data, position)
+            return self.dictionary[index], position
+        if tag == _STRING:
+            length, position = _read_varint(data, position)
+            return data[position:position + length].decode('utf-8'), position + length
+        if tag == _RAW:
+            # Frames which weren't valid JSON may not be valid UTF-8 either
+            length, position = _read_varint(data, position)
+            return bytes(data[position:position + length]), position + length
+        if tag == _INT:
+            value, position = _read_varint(data, position)
+            return _unzigzag(value), position
+        if tag == _LIST:
+            length, position = _read_varint(data, position)
+            items = []
+            for _ in range(length):
+                item, position = self._read_value(data, position)
+                items.append(item)
+            return items, position
+        if tag == _DICT:
+            length, position = _read_varint(data, position)
+            mapping = {}
+            for _ in range(length):
+                key, position = self._read_value(data, position)
+                mapping[key], position = self._read_value(data, position)
+            return mapping, position
+        if tag == _FLOAT_TAG:
+            return _FLOAT.unpack_from(data, position)[0], position + _FLOAT.size
+        if tag == _NULL:
+            return None, position
+        if tag == _TRUE:
+            return True, position
+        if tag == _FALSE:
+            return False, position
+        raise ValueError(f"Unknown value tag {tag}")
+
+    def __iter__(self) -> typing.Iterator[Record]:
+        """Yields every record of the archive, in order."""
+        for offset in self.block_offsets:
+            yield from self.read_block(offset)
+
+    def messages(
+        self,
+        *,
+        protocol: compat.OcppJsonProtocol,
+    ) -> typing.Iterator[typing.Tuple[Record, typing.Union[structure.OCPPMessage, exceptions.OCPPException]]]:
+        """Yields every record of the archive along with its parsed message.
+
+        CallResult messages are parsed using the action of the matching Call message of the same charge point, sent in
+        the other direction. Frames which can't be parsed are yielded along with the raised 'exceptions.OCPPException'.
+
+        Args:
+            - protocol: OcppJsonProtocol, which version of the OCPP Json protocol the archived frames use
+
+        Yields:
+            tuple, a record and its parsed message or exception
+        """
+        # Action of Calls waiting for a result, by charge point, direction and unique id. Both ends pick their own
+        # unique ids, a Call sent to the charge point may use the unique id of a Call received from it.
+        pending_actions: typing.Dict[typing.Tuple[str, Direction, str], str] = {}
+        for record in self:
+            frame = record.frame
+            call_result_action_name = None
+            if isinstance(frame, list) and len(frame) > 2 and isinstance(frame[1], str):
+                if frame[0] == structure.MessageTypeEnum.CALL.value and isinstance(frame[2], str):
+                    pending_actions[record.charge_point_id, record.direction, frame[1]] = frame[2]
+                elif frame[0] != structure.MessageTypeEnum.CALL.value:
+                    call_direction = Direction.SENT if record.direction is Direction.RECEIVED else Direction.RECEIVED
+                    key = (record.charge_point_id, call_direction, frame[1])
+                    call_result_action_name = pending_actions.pop(key, None)
+
+            try:
+                message = serializer.parse(frame, call_result_action_name, protocol=protocol)
+            except exceptions.OCPPException as exc:
+                yield record, exc
+            except ValueError as exc:
+                # CallResult without a matching Call
+                yield record, exceptions.OCPPException(
+                    compat.get_rpc_framework_error(str(exc), protocol=protocol), frame[1],
+                )
+            else:
+                yield record, message
+
+    def replay(
+        self,
+        *,
+        speed: float = 1.0,
+        sleep: typing.Callable[[float], None] = time.sleep,
+        timer: typing.Callable[[], float] = time.monotonic,
+    ) -> typing.Iterator[Record]:
+        """Yields every record of the archive, preserving the original time elapsed between records.
+
+        Args:
+            - speed: float, replay speed factor, 2.0 replays twice as fast as the original traffic (default: 1.0)
+            - sleep: callable, function used to wait, e.g. to replay from an event loop (default: time.sleep)
+            - timer: callable, monotonic clock, in seconds (default: time.monotonic)
+        """
+        start = None
+        for record in self:
+            if start is None:
+                start = (timer(), record.timestamp)
+            else:
+                elapsed = (record.timestamp - start[1]).total_seconds() / speed
+                delay = start[0] + elapsed - timer()
+                if delay > 0:
+                    sleep(delay)
+            yield record
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
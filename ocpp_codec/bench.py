@@ -0,0 +1,329 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Compares the parsing and serializing performance of two versions of the codec.
+
+Usage:
+
+    python -m ocpp_codec.bench compare BASELINE CANDIDATE [--threshold 0.05] [--processes 5] [--json results.json]
+
+BASELINE and CANDIDATE are either a directory holding the 'ocpp_codec' package (e.g.: a source checkout), or a git
+reference prefixed by 'git:' (e.g.: 'git:0.2.0'), exported from the repository found in '--repo'.
+
+A fixed corpus of frames, generated by 'generator' from '--seed', is parsed then serialized by both versions. Each
+version runs in its own processes, alternating between the baseline and the candidate, so that they don't share any
+import or cache. Every process yields a throughput sample per action, message type and operation, confidence intervals
+are computed over these samples. Latency percentiles are computed over every operation of every process, allocations
+are the average peak of memory allocated by an operation, measured in a separate pass with 'tracemalloc'.
+
+The command exits with status 1 when the throughput of any measure regressed by more than '--threshold' and the
+confidence intervals of both versions don't overlap.
+
+Only the standard library is imported at the top of this module: worker processes run it against another version of
+the codec, which may not provide this module.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+import typing
+
+
+# Two-sided 95% Student's t critical values, by degrees of freedom
+_T_VALUES = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    15: 2.131, 20: 2.086, 30: 2.042,
+}
+# Number of timed passes over the frames of a measure in each process, the fastest pass is its throughput sample
+_PASSES = 3
+
+
+def confidence_interval(samples: typing.Sequence[float]) -> typing.Tuple[float, float]:
+    """Returns the mean of samples and the half-width of its 95% confidence interval."""
+    mean = statistics.mean(samples)
+    if len(samples) < 2:
+        return mean, math.inf
+    degrees = len(samples) - 1
+    t_value = next((_T_VALUES[key] for key in sorted(_T_VALUES) if key >= degrees), 1.96)
+    return mean, t_value * statistics.stdev(samples) / math.sqrt(len(samples))
+
+
+def _percentile(sorted_values: typing.Sequence[float], percentile: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percentile / 100))]
+
+
+########
+# Worker
+
+def _measure_allocations(operation: typing.Callable[[], typing.Any]) -> int:
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        operation()
+        return tracemalloc.get_traced_memory()[1] - before
+
+    # Python < 3.9, restart tracing to reset the peak
+    tracemalloc.stop()
+    tracemalloc.start()
+    operation()
+    return tracemalloc.get_traced_memory()[1]
+
+
+def _worker(corpus_path: str, results_path: str) -> None:
+    """Measures the codec found in 'sys.path' with the frames of a corpus, and writes the results in a JSON file."""
+    # Imported here, the worker must use the version of the codec it's measuring
+    from ocpp_codec import compat
+    from ocpp_codec import exceptions
+    from ocpp_codec import serializer
+
+    with open(corpus_path) as corpus_file:
+        corpus = json.load(corpus_file)
+
+    # Measures of each group and operation, or the error raised when parsing a group
+    results: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    for group in corpus:
+        protocol = compat.OcppJsonProtocol[group['protocol']]
+        action_name = group['action'] if group['message_type'] == 'CALLRESULT' else None
+
+        def parse(frame, protocol=protocol, action_name=action_name):
+            return serializer.parse(frame, action_name, protocol=protocol)
+
+        try:
+            messages = [parse(frame) for frame in group['frames']]  # Also warms up caches
+        except exceptions.OCPPException as exc:
+            results[group['key']] = {'error': f'{type(exc.ocpp_error).__name__}: {exc.ocpp_error.msg}'}
+            continue
+
+        operations = {
+            'parse': [lambda frame=frame: parse(frame) for frame in group['frames']],
+            'serialize': [lambda message=message: serializer.serialize(message) for message in messages],
+        }
+        for operation_name, calls in operations.items():
+            latencies = []
+            pass_durations = []
+            for _ in range(_PASSES):
+                pass_latencies = []
+                for call in calls:
+                    start = time.perf_counter()
+                    call()
+                    pass_latencies.append((time.perf_counter() - start) * 1e9)
+                latencies.extend(pass_latencies)
+                pass_durations.append(sum(pass_latencies))
+
+            tracemalloc.start()
+            try:
+                allocations = [_measure_allocations(call) for call in calls]
+            finally:
+                tracemalloc.stop()
+
+            results[f"{group['key']} {operation_name}"] = {
+                'ops': len(calls) * 1e9 / min(pass_durations),
+                'latencies': latencies,
+                'allocations': statistics.mean(allocations),
+            }
+
+    with open(results_path, 'w') as results_file:
+        json.dump(results, results_file)
+
+
+#########
+# Compare
+
+def _build_corpus(seed: int, frames_per_action: int) -> typing.List[typing.Dict[str, typing.Any]]:
+    from ocpp_codec import compat
+    from ocpp_codec import generator
+
+    corpus = []
+    for protocol in compat.OcppJsonProtocol:
+        frame_generator = generator.Generator(protocol, seed=seed)
+        for action in sorted(compat.get_implemented_messages(protocol)):
+            corpus.append({
+                'key': f'{protocol.name} {action} CALL', 'protocol': protocol.name, 'action': action,
+                'message_type': 'CALL', 'frames': [frame_generator.call(action) for _ in range(frames_per_action)],
+            })
+            corpus.append({
+                'key': f'{protocol.name} {action} CALLRESULT', 'protocol': protocol.name, 'action': action,
+                'message_type': 'CALLRESULT',
+                'frames': [frame_generator.call_result(action) for _ in range(frames_per_action)],
+            })
+    return corpus
+
+
+def _resolve_version(version: str, repo: str, directory: str) -> str:
+    """Returns the directory to add to 'sys.path' to import the 'ocpp_codec' package of a version."""
+    if version.startswith('git:'):
+        reference = version[len('git:'):]
+        archive = subprocess.run(
+            ['git', '-C', repo, 'archive', '--format=tar', reference],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+        )
+        if archive.returncode:
+            raise ValueError(f"Can't export '{reference}': {archive.stderr.decode().strip()}")
+        path = os.path.join(directory, reference.replace('/', '_'))
+        with tarfile.open(fileobj=io.BytesIO(archive.stdout)) as tar_file:
+            tar_file.extractall(path)
+    else:
+        path = os.path.abspath(version)
+
+    if not os.path.isfile(os.path.join(path, 'ocpp_codec', '__init__.py')):
+        raise ValueError(f"'{version}' doesn't hold an 'ocpp_codec' package")
+    return path
+
+
+def _run_worker(path: str, corpus_path: str, results_path: str, directory: str) -> typing.Dict[str, typing.Any]:
+    # Run this very file, so that the worker doesn't need the measured version to provide it. The working directory
+    # is the temporary directory, so that nothing else is importable from it.
+    bootstrap = 'import runpy, sys; runpy.run_path(sys.argv[1], run_name="__bench_worker__")'
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join([path, os.environ.get('PYTHONPATH', '')]))
+    subprocess.run(
+        [sys.executable, '-c', bootstrap, os.path.abspath(__file__), corpus_path, results_path],
+        env=environment, cwd=directory, check=True,
+    )
+    with open(results_path) as results_file:
+        return json.load(results_file)
+
+
+def _summarize(samples: typing.List[typing.Dict[str, typing.Any]]) -> typing.Dict[str, typing.Any]:
+    if any('error' in sample for sample in samples):
+        return {'error': next(sample['error'] for sample in samples if 'error' in sample)}
+    ops, ops_interval = confidence_interval([sample['ops'] for sample in samples])
+    latencies = sorted(latency for sample in samples for latency in sample['latencies'])
+    return {
+        'ops': ops,
+        'ops_interval': ops_interval,
+        'p50': _percentile(latencies, 50),
+        'p99': _percentile(latencies, 99),
+        'allocations': statistics.mean(sample['allocations'] for sample in samples),
+    }
+
+
+def compare(
+    baseline: str,
+    candidate: str,
+    *,
+    repo: str = '.',
+    processes: int = 5,
+    seed: int = 0,
+    frames_per_action: int = 100,
+    threshold: float = 0.05,
+) -> typing.Tuple[typing.Dict[str, typing.Dict[str, typing.Any]], typing.List[str]]:
+    """Measures two versions of the codec with the same corpus.
+
+    Args:
+        - baseline: str, a directory holding the 'ocpp_codec' package, or a git reference prefixed by 'git:'
+        - candidate: str, same as 'baseline'
+        - repo: str, the git repository to export git references from (default: '.')
+        - processes: int, the number of worker processes to run per version (default: 5)
+        - seed: int, the seed of the generated corpus (default: 0)
+        - frames_per_action: int, the number of frames per action and message type (default: 100)
+        - threshold: float, the relative loss of throughput considered a regression (default: 0.05)
+
+    Returns:
+        tuple, results by measure then version ('baseline' and 'candidate'), and the measures which regressed
+
+    Raises:
+        - ValueError: raised when a version can't be found
+        - subprocess.CalledProcessError: raised when a worker process fails
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {
+            'baseline': _resolve_version(baseline, repo, directory),
+            'candidate': _resolve_version(candidate, repo, directory),
+        }
+        corpus_path = os.path.join(directory, 'corpus.json')
+        with open(corpus_path, 'w') as corpus_file:
+            json.dump(_build_corpus(seed, frames_per_action), corpus_file)
+
+        samples: typing.Dict[str, typing.Dict[str, typing.List]] = {}
+        for index in range(processes):
+            for version, path in paths.items():
+                results_path = os.path.join(directory, f'{version}-{index}.json')
+                for key, sample in _run_worker(path, corpus_path, results_path, directory).items():
+                    samples.setdefault(key, {}).setdefault(version, []).append(sample)
+
+    results = {
+        key: {version: _summarize(version_samples) for version, version_samples in versions.items()}
+        for key, versions in samples.items()
+    }
+    regressions = []
+    for key, versions in results.items():
+        base, cand = versions.get('baseline', {}), versions.get('candidate', {})
+        if 'ops' not in base or 'ops' not in cand:
+            continue
+        if (
+            cand['ops'] < base['ops'] * (1 - threshold)
+            and cand['ops'] + cand['ops_interval'] < base['ops'] - base['ops_interval']
+        ):
+            regressions.append(key)
+    return results, regressions
+
+
+def _format_results(results: typing.Dict[str, typing.Dict[str, typing.Any]], regressions: typing.List[str]) -> str:
+    header = (
+        f"{'measure':<48} {'baseline ops/s':>20} {'candidate ops/s':>20} {'change':>8} "
+        f"{'p50 (us)':>15} {'p99 (us)':>15} {'alloc (B)':>15}"
+    )
+    lines = [header, '-' * len(header)]
+    for key, versions in results.items():
+        base, cand = versions.get('baseline', {}), versions.get('candidate', {})
+        if 'ops' not in base or 'ops' not in cand:
+            error = base.get('error') or cand.get('error') or 'missing'
+            lines.append(f'{key:<48} {error}')
+            continue
+        lines.append(
+            f"{key:<48} {base['ops']:>10.0f} ±{base['ops_interval']:>8.0f} {cand['ops']:>10.0f} "
+            f"±{cand['ops_interval']:>8.0f} {cand['ops'] / base['ops'] - 1:>+8.1%} "
+            f"{base['p50'] / 1000:>7.1f}/{cand['p50'] / 1000:<7.1f} "
+            f"{base['p99'] / 1000:>7.1f}/{cand['p99'] / 1000:<7.1f} "
+            f"{base['allocations']:>7.0f}/{cand['allocations']:<7.0f}{' REGRESSION' if key in regressions else ''}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m ocpp_codec.bench', description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+    compare_parser = subparsers.add_parser('compare', help="compare the performance of two versions of the codec")
+    compare_parser.add_argument('baseline', help="directory holding 'ocpp_codec', or 'git:<reference>'")
+    compare_parser.add_argument('candidate', help="directory holding 'ocpp_codec', or 'git:<reference>'")
+    compare_parser.add_argument('--repo', default='.', help="git repository of git references (default: '.')")
+    compare_parser.add_argument('--processes', type=int, default=5, help="worker processes per version (default: 5)")
+    compare_parser.add_argument('--seed', type=int, default=0, help="seed of the generated corpus (default: 0)")
+    compare_parser.add_argument(
+        '--frames-per-action', type=int, default=100, help="frames per action and message type (default: 100)",
+    )
+    compare_parser.add_argument(
+        '--threshold', type=float, default=0.05, help="relative throughput loss failing the command (default: 0.05)",
+    )
+    compare_parser.add_argument('--json', help="path of a file to write the results to, as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        results, regressions = compare(
+            args.baseline, args.candidate, repo=args.repo, processes=args.processes, seed=args.seed,
+            frames_per_action=args.frames_per_action, threshold=args.threshold,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    print(_format_results(results, regressions))
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump({'results': results, 'regressions': regressions}, json_file, indent=2)
+    if regressions:
+        print(f"\n{len(regressions)} measure(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__bench_worker__':
+    _worker(*sys.argv[2:])
+elif __name__ == '__main__':
+    sys.exit(main())
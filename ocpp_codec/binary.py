@@ -0,0 +1,360 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Compact binary encoding of parsed OCPP messages, for exchanges between trusted services.
+
+Messages are encoded in MessagePack, with a layout derived from the same dataclasses and field metadata as the
+'serializer' module:
+- dataclasses are encoded as arrays of their fields values, in the order of their definition, trailing undefined
+  fields are omitted,
+- enums are encoded as the index of the member in its enum class,
+- datetimes are encoded as the number of microseconds since the epoch,
+- messages start with a header: [schema version, protocol, message type, unique id, ...].
+
+    data = binary.dumps(call, protocol=compat.OcppJsonProtocol.v16)
+    assert binary.loads(data) == call
+
+Enum codes and field positions depend on the definition of the dataclasses, 'SCHEMA_VERSION' must be bumped whenever
+a change to these definitions alters the layout of existing messages. Decoding doesn't run validators, data is expected
+to have been validated when it was first parsed.
+
+MessagePack encoding and decoding is built in, only the subset of the format needed to encode OCPP messages is
+supported: nil, booleans, integers, floats, strings, arrays and maps.
+"""
+import datetime
+from dataclasses import fields
+from dataclasses import is_dataclass
+import struct
+import typing
+
+from ocpp_codec import compat
+from ocpp_codec import encoders
+from ocpp_codec import serializer
+from ocpp_codec import structure
+from ocpp_codec import types
+
+
+SCHEMA_VERSION = 1
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+###############
+# MessagePack
+
+def _pack(value: typing.Any, buffer: bytearray) -> None:
+    # Order matters: bool is a subclass of int
+    if value is None:
+        buffer.append(0xc0)
+    elif value is True:
+        buffer.append(0xc3)
+    elif value is False:
+        buffer.append(0xc2)
+    elif isinstance(value, int):
+        _pack_int(value, buffer)
+    elif isinstance(value, float):
+        buffer.append(0xcb)
+        buffer += struct.pack('>d', value)
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        _pack_header(len(data), buffer, 0xa0, 32, (0xd9, 0xda, 0xdb))
+        buffer += data
+    elif isinstance(value, (list, tuple)):
+        _pack_header(len(value), buffer, 0x90, 16, (None, 0xdc, 0xdd))
+        for item in value:
+            _pack(item, buffer)
+    elif isinstance(value, dict):
+        _pack_header(len(value), buffer, 0x80, 16, (None, 0xde, 0xdf))
+        for key, item in value.items():
+            _pack(key, buffer)
+            _pack(item, buffer)
+    else:
+        raise ValueError(f"Can't encode values of type '{type(value).__name__}'")
+
+
+def _pack_int(value: int, buffer: bytearray) -> None:
+    if 0 <= value < 0x80:
+        buffer.append(value)
+    elif -0x20 <= value < 0:
+        buffer.append(value & 0xff)
+    elif value >= 0:
+        for marker, fmt, limit in ((0xcc, '>B', 1 << 8), (0xcd, '>H', 1 << 16), (0xce, '>I', 1 << 32)):
+            if value < limit:
+                buffer.append(marker)
+                buffer += struct.pack(fmt, value)
+                return
+        if value >= 1 << 64:
+            raise ValueError(f"Integer {value} is too large to be encoded")
+        buffer.append(0xcf)
+        buffer += struct.pack('>Q', value)
+    else:
+        for marker, fmt, limit in ((0xd0, '>b', 1 << 7), (0xd1, '>h', 1 << 15), (0xd2, '>i', 1 << 31)):
+            if value >= -limit:
+                buffer.append(marker)
+                buffer += struct.pack(fmt, value)
+                return
+        if value < -(1 << 63):
+            raise ValueError(f"Integer {value} is too small to be encoded")
+        buffer.append(0xd3)
+        buffer += struct.pack('>q', value)
+
+
+def _pack_header(length: int, buffer: bytearray, fix_marker: int, fix_limit: int, markers: typing.Tuple) -> None:
+    # Markers are given for 8, 16 and 32 bits lengths, arrays and maps have no 8 bits variant
+    marker_8, marker_16, marker_32 = markers
+    if length < fix_limit:
+        buffer.append(fix_marker | length)
+    elif marker_8 is not None and length < 1 << 8:
+        buffer.append(marker_8)
+        buffer.append(length)
+    elif length < 1 << 16:
+        buffer.append(marker_16)
+        buffer += struct.pack('>H', length)
+    else:
+        buffer.append(marker_32)
+        buffer += struct.pack('>I', length)
+
+
+_FIXED_FORMATS = {
+    0xca: struct.Struct('>f'), 0xcb: struct.Struct('>d'),
+    0xcc: struct.Struct('>B'), 0xcd: struct.Struct('>H'), 0xce: struct.Struct('>I'), 0xcf: struct.Struct('>Q'),
+    0xd0: struct.Struct('>b'), 0xd1: struct.Struct('>h'), 0xd2: struct.Struct('>i'), 0xd3: struct.Struct('>q'),
+}
+_STR_LENGTHS = {0xd9: struct.Struct('>B'), 0xda: struct.Struct('>H'), 0xdb: struct.Struct('>I')}
+_ARRAY_LENGTHS = {0xdc: struct.Struct('>H'), 0xdd: struct.Struct('>I')}
+_MAP_LENGTHS = {0xde: struct.Struct('>H'), 0xdf: struct.Struct('>I')}
+
+
+def _unpack(data: bytes, offset: int) -> typing.Tuple[typing.Any, int]:
+    marker = data[offset]
+    offset += 1
+
+    if marker < 0x80:
+        return marker, offset
+    if marker >= 0xe0:
+        return marker - 0x100, offset
+    if marker == 0xc0:
+        return None, offset
+    if marker == 0xc2:
+        return False, offset
+    if marker == 0xc3:
+        return True, offset
+    if marker in _FIXED_FORMATS:
+        fmt = _FIXED_FORMATS[marker]
+        return fmt.unpack_from(data, offset)[0], offset + fmt.size
+
+    if 0xa0 <= marker < 0xc0:
+        length = marker & 0x1f
+    elif marker in _STR_LENGTHS:
+        fmt = _STR_LENGTHS[marker]
+        length = fmt.unpack_from(data, offset)[0]
+        offset += fmt.size
+    else:
+        length = None
+    if length is not None:
+        end = offset + length
+        if end > len(data):
+            raise ValueError("Truncated data")
+        return bytes(data[offset:end]).decode('utf-8'), end
+
+    if 0x90 <= marker < 0xa0:
+        length = marker & 0x0f
+    elif marker in _ARRAY_LENGTHS:
+        fmt = _ARRAY_LENGTHS[marker]
+        length = fmt.unpack_from(data, offset)[0]
+        offset += fmt.size
+    if length is not None:
+        items = []
+        for _ in range(length):
+            item, offset = _unpack(data, offset)
+            items.append(item)
+        return items, offset
+
+    if 0x80 <= marker < 0x90:
+        length = marker & 0x0f
+    elif marker in _MAP_LENGTHS:
+        fmt = _MAP_LENGTHS[marker]
+        length = fmt.unpack_from(data, offset)[0]
+        offset += fmt.size
+    if length is not None:
+        mapping = {}
+        for _ in range(length):
+            key, offset = _unpack(data, offset)
+            mapping[key], offset = _unpack(data, offset)
+        return mapping, offset
+
+    raise ValueError(f"Unsupported MessagePack type 0x{marker:02x}")
+
+
+def packb(value: typing.Any) -> bytes:
+    """Encodes a value made of Python simple types to MessagePack."""
+    buffer = bytearray()
+    _pack(value, buffer)
+    return bytes(buffer)
+
+
+def unpackb(data: bytes) -> typing.Any:
+    """Decodes a MessagePack value, made of Python simple types.
+
+    Raises:
+        - ValueError: raised when the data is malformed, truncated or uses an unsupported MessagePack type
+    """
+    try:
+        value, offset = _unpack(data, 0)
+    except (IndexError, struct.error, UnicodeDecodeError) as exc:
+        raise ValueError("Malformed MessagePack data") from exc
+    if offset != len(data):
+        raise ValueError("Extra data after MessagePack value")
+    return value
+
+
+#########
+# Layouts
+
+_Codec = typing.Tuple[typing.Callable[[typing.Any], typing.Any], typing.Callable[[typing.Any], typing.Any]]
+
+
+def _identity(value):
+    return value
+
+
+def _field_codec(field) -> _Codec:
+    """Builds the functions encoding a field value to a MessagePack-friendly value, and decoding it back."""
+    if not serializer._is_generic(field.type) and issubclass(field.type, types.SimpleType):
+        field = serializer._extract_base_type(field)
+
+    if is_dataclass(field.type):
+        dataclass_class = field.type
+        return _encode_dataclass, lambda value: _decode_dataclass(dataclass_class, value)
+
+    if serializer._is_list(field.type):
+        encode_item, decode_item = _field_codec(serializer._unpack_field(field))
+        return (
+            lambda value: [encode_item(item) for item in value],
+            lambda value: [decode_item(item) for item in value],
+        )
+
+    encoder = field.metadata.get('encoder')
+    if isinstance(encoder, encoders.EnumEncoder):
+        members = list(encoder.enum_class)
+        codes = {member: code for code, member in enumerate(members)}
+        return codes.__getitem__, members.__getitem__
+    if isinstance(encoder, encoders.DateTimeEncoder):
+        return (
+            lambda value: (value - _EPOCH) // _MICROSECOND,
+            lambda value: _EPOCH + value * _MICROSECOND,
+        )
+    return _identity, _identity
+
+
+# Name and codec of each field of a dataclass, by dataclass
+_LAYOUTS: typing.Dict[typing.Type, typing.List[typing.Tuple[str, _Codec]]] = {}
+
+
+def _get_layout(dataclass_class) -> typing.List[typing.Tuple[str, _Codec]]:
+    try:
+        return _LAYOUTS[dataclass_class]
+    except KeyError:
+        layout = [(field.name, _field_codec(field)) for field in fields(dataclass_class)]
+        return _LAYOUTS.setdefault(dataclass_class, layout)
+
+
+def _encode_dataclass(value) -> typing.List:
+    encoded = []
+    for name, (encode, _) in _get_layout(type(value)):
+        field_value = getattr(value, name)
+        encoded.append(None if field_value is None else encode(field_value))
+
+    while encoded and encoded[-1] is None:
+        encoded.pop()
+    return encoded
+
+
+def _decode_dataclass(dataclass_class, values: typing.List):
+    layout = _get_layout(dataclass_class)
+    if len(values) > len(layout):
+        raise ValueError(f"Too many fields for '{dataclass_class.__name__}'")
+    return dataclass_class(*[
+        None if value is None else decode(value)
+        for (_, (_, decode)), value in zip(layout, values)
+    ])
+
+
+##########
+# Messages
+
+# 'CallError.errorCode' is annotated with the 'structure.ErrorCode' field type, but holds the enum members
+_ERROR_CODES: typing.List[typing.Any] = list(types.ErrorCodeEnum)
+
+
+def dumps(
+    message: structure.OCPPMessage,
+    *,
+    protocol: compat.OcppJsonProtocol,
+    action: typing.Optional[str] = None,
+) -> bytes:
+    """Encodes a parsed OCPP message to bytes.
+
+    Args:
+        - message: OCPPMessage, the message to encode, Call and CallResult payloads must be dataclass instances
+        - protocol: OcppJsonProtocol, the version of the OCPP Json protocol the message belongs to
+        - action: str, name of the action of a CallResult message, ignored for other messages (default: None)
+
+    Returns:
+        bytes, the encoded message
+
+    Raises:
+        - ValueError: raised when the message can't be encoded
+    """
+    header = [SCHEMA_VERSION, protocol.value, message.messageTypeId.value, message.uniqueId]
+    body: typing.List[typing.Any]
+    if isinstance(message, structure.Call):
+        body = [message.action, _encode_dataclass(message.payload)]
+    elif isinstance(message, structure.CallResult):
+        if action is None:
+            raise ValueError("'action' must be provided when encoding a CallResult message")
+        body = [action, _encode_dataclass(message.payload)]
+    elif isinstance(message, structure.CallError):
+        body = [_ERROR_CODES.index(message.errorCode), message.errorDescription, message.errorDetails]
+    else:
+        raise ValueError(f"Can't encode '{type(message).__name__}' messages")
+    return packb(header + body)
+
+
+def loads(data: bytes) -> structure.OCPPMessage:
+    """Decodes an OCPP message encoded by 'dumps'.
+
+    The returned message is equal to the message that was encoded, using the same dataclasses as 'serializer.parse'.
+    Values aren't validated again.
+
+    Args:
+        - data: bytes, the encoded message
+
+    Returns:
+        OCPPMessage, the decoded message
+
+    Raises:
+        - ValueError: raised when the data is malformed, or was encoded with a different schema version
+    """
+    values = unpackb(data)
+    if not isinstance(values, list) or len(values) < 4:
+        raise ValueError("Malformed message header")
+    schema_version, protocol, message_type_id, unique_id, *body = values
+    if schema_version != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported schema version {schema_version}, expected {SCHEMA_VERSION}")
+
+    try:
+        protocol = compat.OcppJsonProtocol(protocol)
+        message_type = structure.MessageTypeEnum(message_type_id)
+        if message_type is structure.MessageTypeEnum.CALLERROR:
+            error_code, error_description, error_details = body
+            return structure.CallError(unique_id, _ERROR_CODES[error_code], error_description, error_details)
+
+        action_name, payload = body
+        action_class = compat.get_implemented_messages(protocol)[action_name]
+        if message_type is structure.MessageTypeEnum.CALL:
+            payload_class = compat.get_request_payload_dataclass(action_class)
+            return structure.Call(unique_id, action_name, _decode_dataclass(payload_class, payload))
+        payload_class = compat.get_response_payload_dataclass(action_class)
+        return structure.CallResult(unique_id, _decode_dataclass(payload_class, payload))
+    except (KeyError, IndexError, TypeError, ValueError) as exc:
+        raise ValueError(f"Malformed message: {exc}") from exc
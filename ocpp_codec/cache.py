@@ -0,0 +1,179 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Bounded caches used to avoid repeating work on identical OCPP data."""
+import collections
+import hashlib
+import threading
+import time
+import typing
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded mapping evicting its least recently used entries first.
+
+    Lookups and insertions are thread-safe, a single cache can be shared between connections.
+
+    Attributes:
+        - maxsize: int, the maximum number of entries kept in the cache
+        - hits: int, number of lookups that found an entry
+        - misses: int, number of lookups that didn't find any entry
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize <= 0:
+            raise ValueError("'maxsize' must be a positive integer")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: typing.MutableMapping[typing.Hashable, typing.Any] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        """Returns the value stored for 'key' and mark it as the most recently used, or 'default' if there's none."""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)  # type: ignore # mypy doesn't know we're using an OrderedDict
+            self.hits += 1
+            return value
+
+    def put(self, key: typing.Hashable, value: typing.Any) -> None:
+        """Stores 'value' for 'key', evicting the least recently used entry if the cache is full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)  # type: ignore # mypy doesn't know we're using an OrderedDict
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)  # type: ignore # mypy doesn't know we're using an OrderedDict
+
+    def clear(self) -> None:
+        """Empties the cache, hit and miss counters are kept."""
+        with self._lock:
+            self._data.clear()
+
+
+class TTLCache(LRUCache):
+    """LRU cache whose entries also expire after a fixed amount of time.
+
+    Expired entries are counted as misses, and dropped when looked up.
+
+    Attributes:
+        - ttl: float, number of seconds an entry is kept in the cache
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60, *, timer: typing.Callable[[], float] = time.monotonic):
+        if ttl <= 0:
+            raise ValueError("'ttl' must be a positive number")
+
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self._timer = timer
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        now = self._timer()
+        # Look the entry up and drop it if it expired at once, so that an entry stored meanwhile isn't dropped instead
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)  # type: ignore # mypy doesn't know we're using an OrderedDict
+            self.hits += 1
+            return value
+
+    def put(self, key: typing.Hashable, value: typing.Any) -> None:
+        super().put(key, (self._timer() + self.ttl, value))
+
+
+class InternTable(LRUCache):
+    """Bounded table of interned values, so that equal values parsed from different messages share a single object.
+
+    Meant for fields taking only a handful of distinct values, e.g. charge point vendors and models. Once full, the
+    least recently used values are dropped from the table.
+    """
+
+    def intern(self, value: typing.Hashable) -> typing.Hashable:
+        """Returns the interned object equal to 'value', interning 'value' if there's none."""
+        interned = self.get(value, _MISSING)
+        if interned is _MISSING:
+            self.put(value, value)
+            return value
+        return interned
+
+
+class RetransmissionCache:
+    """Cache of the responses sent to recently received 'Call' messages, meant to be used for a single connection.
+
+    Charge points may send a 'Call' again when they don't receive its response in time. Looking the raw frame up before
+    parsing it detects such retransmissions, and provides the response to send back instead of handling the 'Call'
+    again.
+
+    Frames are identified by a digest of their raw content, which covers both their uniqueId and their payload: a 'Call'
+    reusing a uniqueId with a different payload isn't a retransmission.
+
+    Example:
+
+        response = retransmissions.get(raw_frame)
+        if response is None:
+            response = serializer.serialize(handle(serializer.parse(json.loads(raw_frame), protocol=protocol)))
+            retransmissions.put(raw_frame, response)
+        send(json.dumps(response))
+    """
+
+    def __init__(
+        self, maxsize: int = 128, ttl: float = 300, *, timer: typing.Callable[[], float] = time.monotonic,
+    ):
+        self._responses = TTLCache(maxsize, ttl, timer=timer)
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    @property
+    def hits(self) -> int:
+        return self._responses.hits
+
+    @property
+    def misses(self) -> int:
+        return self._responses.misses
+
+    @staticmethod
+    def _digest(raw_frame: typing.Union[bytes, str]) -> bytes:
+        if isinstance(raw_frame, str):
+            raw_frame = raw_frame.encode()
+        return hashlib.blake2b(raw_frame, digest_size=16).digest()
+
+    def get(self, raw_frame: typing.Union[bytes, str]) -> typing.Optional[typing.List]:
+        """Returns the response sent to a previous identical frame, or None if there's none.
+
+        Args:
+            - raw_frame: bytes or str, the frame as received from the connection, before any decoding
+
+        Returns:
+            list, the response as returned by 'serializer.serialize' when it was stored, or None
+        """
+        return self._responses.get(self._digest(raw_frame))
+
+    def put(self, raw_frame: typing.Union[bytes, str], response: typing.List) -> None:
+        """Stores the response sent to a frame.
+
+        Args:
+            - raw_frame: bytes or str, the frame as received from the connection, before any decoding
+            - response: list, the serialized response, as returned by 'serializer.serialize'
+        """
+        self._responses.put(self._digest(raw_frame), response)
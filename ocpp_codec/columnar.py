@@ -0,0 +1,255 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Columnar representation of meter values.
+
+A single meter values message can carry hundreds of sampled values. Instead of building a dataclass instance for each
+of them, meter values can be parsed into a 'MeterValueColumns' sequence storing timestamps, numeric values and enum
+fields in compact 'array.array' columns. Rows are only built on access, as regular 'MeterValue' dataclass instances.
+
+Columnar parsing is opt-in, and applies to 'MeterValues.req.meterValue' (v16) and 'TransactionEvent.Request.meterValue'
+(v20):
+
+    options = serializer.ParseOptions(field_parsers=columnar.FIELD_PARSERS)
+    call = serializer.parse(raw_data, protocol=compat.OcppJsonProtocol.v16, options=options)
+    call.payload.meterValue.values  # array('d', [...])
+
+Attributes:
+    - FIELD_PARSERS: dict, 'ParseOptions.field_parsers' parsing supported meter values fields into columns
+"""
+import array
+import collections.abc
+import datetime
+from dataclasses import fields
+from dataclasses import is_dataclass
+import math
+import typing
+
+from ocpp_codec import encoders
+from ocpp_codec import errors
+from ocpp_codec import serializer
+from ocpp_codec import types
+from ocpp_codec.v16 import messages as messages_v16
+from ocpp_codec.v20 import messages as messages_v20
+
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Code stored in enum columns for undefined values
+UNDEFINED = -1
+
+
+def _format_value(value: float) -> str:
+    # Mirrors how charge points usually format numbers, e.g.: 12.0 -> '12'
+    formatted = repr(value)
+    return formatted[:-2] if formatted.endswith('.0') else formatted
+
+
+class _SampledValueLayout:
+    """How the fields of a sampled value dataclass are split into columns."""
+
+    def __init__(self, sampled_value_class):
+        self.sampled_value_class = sampled_value_class
+        # Every field of the dataclass, with SimpleType fields replaced by their base type
+        self.fields = []
+        # Members of enum fields, stored as codes in 'array.array' columns, and the code of each member
+        self.enums: typing.Dict[str, typing.List] = {}
+        self.codes: typing.Dict[str, typing.Dict[typing.Any, int]] = {}
+
+        for field in fields(sampled_value_class):
+            if is_dataclass(field.type) and issubclass(field.type, types.SimpleType):
+                field = serializer._extract_base_type(field)
+            self.fields.append(field)
+
+            encoder = field.metadata.get('encoder')
+            if isinstance(encoder, encoders.EnumEncoder):
+                self.enums[field.name] = list(encoder.enum_class)
+                self.codes[field.name] = {member: code for code, member in enumerate(encoder.enum_class)}
+
+        # OCPP 1.6 transmits values as strings, OCPP 2.0 as numbers
+        self.string_values = next(field.type for field in self.fields if field.name == 'value') is str
+
+
+class MeterValueColumns(collections.abc.Sequence):
+    """Sequence of meter values, storing their sampled values column by column.
+
+    Indexing the sequence builds a regular meter value dataclass instance, so that code expecting a list of meter values
+    keeps working (including serialization).
+
+    Attributes:
+        - timestamps: array of int, timestamp of each meter value, in microseconds since the epoch
+        - offsets: array of int, index of the first sampled value of each meter value, followed by the total number of
+                   sampled values
+        - values: array of float, the value of each sampled value (NaN when the value isn't a number)
+        - enums: dict, an array of codes for each enum field of sampled values, indexed by field name. Codes are the
+                 index of the enum member in its enum class, or 'UNDEFINED'.
+        - extras: dict, values of non-enum optional fields of sampled values, indexed by field name then by sampled
+                  value index. Also holds the original value of sampled values which couldn't be stored as is in
+                  'values', under the 'value' key.
+    """
+
+    def __init__(self, meter_value_class, layout: _SampledValueLayout):
+        self._meter_value_class = meter_value_class
+        self._layout = layout
+
+        self.timestamps = array.array('q')
+        self.offsets = array.array('L', [0])
+        self.values = array.array('d')
+        self.enums = {name: array.array('b') for name in layout.enums}
+        self.extras: typing.Dict[str, typing.Dict[int, typing.Any]] = collections.defaultdict(dict)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('meter value index out of range')
+
+        return self._meter_value_class(
+            timestamp=_EPOCH + self.timestamps[index] * _MICROSECOND,
+            sampledValue=[
+                self.sampled_value(sample_index)
+                for sample_index in range(self.offsets[index], self.offsets[index + 1])
+            ],
+        )
+
+    def __repr__(self):
+        return f'{type(self).__name__}({list(self)!r})'
+
+    def sampled_value(self, index: int):
+        """Builds the sampled value dataclass instance at 'index', counting from the first meter value."""
+        row = {}
+        for name, codes in self.enums.items():
+            code = codes[index]
+            if code != UNDEFINED:
+                row[name] = self._layout.enums[name][code]
+        for name, column in self.extras.items():
+            if index in column:
+                row[name] = column[index]
+        row.setdefault('value', self._raw_value(self.values[index]))
+        return self._layout.sampled_value_class(**row)
+
+    def enum_members(self, name: str) -> typing.List:
+        """Returns the members of the enum field 'name' of sampled values, indexed by their code in 'enums'."""
+        return self._layout.enums[name]
+
+    def _raw_value(self, value: float):
+        return _format_value(value) if self._layout.string_values else value
+
+    def append(self, timestamp: datetime.datetime, sampled_values: typing.Iterable[typing.Dict[str, typing.Any]]):
+        """Appends a meter value, given its cleaned timestamp and the cleaned fields of its sampled values."""
+        self.timestamps.append((timestamp - _EPOCH) // _MICROSECOND)
+        for sampled_value in sampled_values:
+            index = len(self.values)
+            for name, codes in self._layout.codes.items():
+                member = sampled_value.pop(name, None)
+                self.enums[name].append(UNDEFINED if member is None else codes[member])
+
+            value = sampled_value.pop('value')
+            try:
+                numeric_value = float(value)
+            except ValueError:
+                numeric_value = math.nan
+            self.values.append(numeric_value)
+            # NaN isn't a number, even when spelled 'nan', keep the original value as is
+            if numeric_value != numeric_value or self._raw_value(numeric_value) != value:
+                self.extras['value'][index] = value
+
+            for name, field_value in sampled_value.items():
+                self.extras[name][index] = field_value
+        self.offsets.append(len(self.values))
+
+
+def parse_meter_values(
+    field, data: typing.Any, options: typing.Optional[serializer.ParseOptions] = None,
+) -> MeterValueColumns:
+    """Parses a list of meter values into columns, running the same checks as 'serializer.parse_data'.
+
+    Meant to be used as a 'ParseOptions.field_parsers' function.
+
+    Args:
+        - field: dataclasses.Field, the 'List[MeterValue]' field being parsed
+        - data: object, the list of meter values retrieved from the OCPP-JSON message
+        - options: serializer.ParseOptions, options of the message being parsed, whose limits are enforced on sampled
+                   values. Parsing uses the default options when None.
+
+    Returns:
+        MeterValueColumns, the parsed meter values
+
+    Raises:
+        - errors.ProtocolError
+        - errors.TypeConstraintViolationError
+        - errors.PropertyConstraintViolationError
+        - errors.OccurenceConstraintViolationError
+    """
+    limits = options.limits if options else serializer.DEFAULT_LIMITS
+    if not isinstance(data, list):
+        raise errors.TypeConstraintViolationError(
+            f"Field '{field.name}' is not a list (type is {type(data).__name__}",
+        )
+    serializer._clean_data(field, data, parsing=True)
+
+    meter_value_class = field.type.__args__[0]
+    meter_value_fields = {field.name: field for field in fields(meter_value_class)}
+    timestamp_field = serializer._extract_base_type(meter_value_fields['timestamp'])
+    sampled_value_field = meter_value_fields['sampledValue']
+    layout = _get_layout(sampled_value_field.type.__args__[0])
+
+    columns = MeterValueColumns(meter_value_class, layout)
+    for meter_value in data:
+        serializer.check_fields(meter_value_class, meter_value)
+        timestamp = serializer.parse_field(timestamp_field, meter_value['timestamp'])
+
+        sampled_values = meter_value['sampledValue']
+        if not isinstance(sampled_values, list):
+            raise errors.TypeConstraintViolationError(
+                f"Field 'sampledValue' is not a list (type is {type(sampled_values).__name__}",
+            )
+        if limits is not None:
+            serializer._check_list_length(meter_value_class, sampled_value_field, sampled_values, limits)
+        serializer._clean_data(sampled_value_field, sampled_values, parsing=True)
+        columns.append(timestamp, [
+            _parse_sampled_value(layout, sampled_value, options, limits) for sampled_value in sampled_values
+        ])
+
+    return columns
+
+
+def _parse_sampled_value(
+    layout: _SampledValueLayout, data: typing.Any, options: typing.Optional[serializer.ParseOptions],
+    limits: typing.Optional[serializer.Limits],
+) -> typing.Dict[str, typing.Any]:
+    serializer.check_fields(layout.sampled_value_class, data)
+
+    cleaned_data = {}
+    for field in layout.fields:
+        value = data.get(field.name)
+        if value is None:
+            continue
+        if is_dataclass(field.type):
+            cleaned_data[field.name] = serializer.parse_data(field.type, value, options=options)
+        else:
+            if limits is not None:
+                serializer._check_string_length(field, value, limits)
+            cleaned_data[field.name] = serializer.parse_field(field, value)
+    return cleaned_data
+
+
+_LAYOUTS: typing.Dict[typing.Type, _SampledValueLayout] = {}
+
+
+def _get_layout(sampled_value_class) -> _SampledValueLayout:
+    try:
+        return _LAYOUTS[sampled_value_class]
+    except KeyError:
+        return _LAYOUTS.setdefault(sampled_value_class, _SampledValueLayout(sampled_value_class))
+
+
+FIELD_PARSERS = {
+    messages_v16.MeterValues.req: {'meterValue': parse_meter_values},
+    messages_v20.TransactionEvent.Request: {'meterValue': parse_meter_values},
+}
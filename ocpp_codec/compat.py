@@ -34,6 +34,30 @@ def get_message_type_not_supported_error(msg: str, protocol: OcppJsonProtocol) -
     return errors.GenericError(msg)
 
 
+# Errors raised by version independent code, and their OCPP v20 equivalent
+_V20_ERRORS = {
+    errors.FormationViolationError: errors.FormatViolationError,
+    errors.OccurenceConstraintViolationError: errors.OccurrenceConstraintViolationError,
+}
+
+
+def get_protocol_error(error: errors.BaseOCPPError, protocol: OcppJsonProtocol) -> errors.BaseOCPPError:
+    """Translates an error raised by version independent code, using OCPP v16 codes, to the given protocol."""
+    if protocol is OcppJsonProtocol.v20 and type(error) in _V20_ERRORS:
+        translated_error = _V20_ERRORS[type(error)](error.msg, **error.details)
+        translated_error.__cause__ = error
+        return translated_error
+    return error
+
+
+def get_action_protocol(
+    action: typing.Type[typing.Union[messages_v16.Action, messages_v20.Action]],
+) -> OcppJsonProtocol:
+    if issubclass(action, messages_v20.Action):
+        return OcppJsonProtocol.v20
+    return OcppJsonProtocol.v16
+
+
 def get_request_payload_dataclass(action: typing.Union[messages_v16.Action, messages_v20.Action]):
     if issubclass(action, messages_v20.Action):
         return action.Request
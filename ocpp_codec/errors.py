@@ -4,6 +4,8 @@
 These errors are representations of OCPP error codes, as specified in
 OCPP JSON specification, section 4.2.3 (v16) or 4.3 (v20).
 """
+import typing
+
 from ocpp_codec import types
 
 
@@ -17,7 +19,7 @@ class BaseOCPPError(Exception):
     """
     # The ErrorCodeEnum value that should be used as the 'code' of this exception, useful when the class name doesn't
     # match the enum value.
-    __error_code_name__ = None
+    __error_code_name__: typing.Optional[str] = None
 
     def __init__(self, msg, *args, **kwargs):
         super().__init__(msg, *args)
@@ -58,6 +60,16 @@ class TypeConstraintViolationError(BaseOCPPError):
     __error_code_name__ = 'TypeConstraintViolation'
 
 
+class FormationViolationError(BaseOCPPError):
+    """Raised when a message doesn't conform to the expected structure (e.g.: too large, or too deeply nested)."""
+    __error_code_name__ = 'FormationViolation'
+
+
+class OccurenceConstraintViolationError(BaseOCPPError):
+    """Raised when a field holds more elements than allowed."""
+    __error_code_name__ = 'OccurenceConstraintViolation'
+
+
 class GenericError(BaseOCPPError):
     """Raised when there aren't any other more appropriate error."""
 
@@ -70,3 +82,13 @@ class MessageTypeNotSupportedError(BaseOCPPError):
 
 class RpcFrameworkError(BaseOCPPError):
     """Raised when the message isn't a valid RPC request (e.g.: can't read the message type id)."""
+
+
+class FormatViolationError(BaseOCPPError):
+    """OCPP v20 equivalent of 'FormationViolationError'."""
+    __error_code_name__ = 'FormatViolation'
+
+
+class OccurrenceConstraintViolationError(BaseOCPPError):
+    """OCPP v20 equivalent of 'OccurenceConstraintViolationError', fixing the spelling of its code."""
+    __error_code_name__ = 'OccurrenceConstraintViolation'
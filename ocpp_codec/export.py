@@ -0,0 +1,272 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Export of parsed meter values to Apache Arrow and Parquet.
+
+Meter values found in parsed MeterValues (v16), StopTransaction (v16) and TransactionEvent (v20) Call messages are
+flattened into one row per sampled value, following 'SCHEMA'. Rows are accumulated column by column and turned into
+Arrow record batches, which 'ParquetWriter' writes to a Parquet file as soon as they're full, keeping memory usage
+bounded:
+
+    with export.ParquetWriter('meter_values.parquet') as writer:
+        for call in calls:
+            writer.write(call)
+
+This module requires pyarrow, installed with the 'arrow' extra: pip install ocpp-codec[arrow]
+
+Attributes:
+    - SCHEMA: pyarrow.Schema, the schema of exported record batches
+"""
+import datetime
+import enum
+import typing
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+from ocpp_codec import columnar
+from ocpp_codec import structure
+from ocpp_codec.v16 import messages as messages_v16
+from ocpp_codec.v20 import messages as messages_v20
+
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Sampled value fields exported as dictionary-encoded columns, by column name. OCPP 2.0 names its 'unit' field
+# 'unitOfMeasure'.
+_ENUM_COLUMNS = {
+    'context': ('context',),
+    'format': ('format',),
+    'measurand': ('measurand',),
+    'phase': ('phase',),
+    'location': ('location',),
+    'unit': ('unit', 'unitOfMeasure'),
+}
+
+
+def _build_schema():
+    if pyarrow is None:
+        return None
+
+    dictionary = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    return pyarrow.schema([
+        ('protocol', dictionary),
+        ('action', dictionary),
+        ('unique_id', pyarrow.string()),
+        ('connector_id', pyarrow.int32()),
+        ('evse_id', pyarrow.int32()),
+        ('transaction_id', pyarrow.string()),
+        # Timestamp of the meter value, in microseconds since the epoch
+        ('timestamp', pyarrow.int64()),
+        ('value', pyarrow.float64()),
+        # Original value of OCPP 1.6 sampled values which aren't numbers, e.g. signed data
+        ('raw_value', pyarrow.string()),
+    ] + [(name, dictionary) for name in _ENUM_COLUMNS])
+
+
+SCHEMA = _build_schema()
+
+
+def _check_pyarrow():
+    if pyarrow is None:
+        raise ImportError("pyarrow is required to export meter values, install ocpp-codec[arrow]")
+
+
+def _enum_value(value) -> typing.Optional[str]:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def _numeric_value(value) -> typing.Optional[float]:
+    try:
+        numeric_value = float(value)
+    except ValueError:
+        return None
+    return None if numeric_value != numeric_value else numeric_value  # NaN isn't a number either
+
+
+class RecordBatchBuilder:
+    """Accumulates the sampled values of parsed messages, column by column.
+
+    Attributes:
+        - num_rows: int, the number of rows accumulated since the last call to 'flush'
+    """
+
+    def __init__(self):
+        _check_pyarrow()
+        self._columns: typing.Dict[str, typing.List] = {name: [] for name in SCHEMA.names}
+        self.num_rows = 0
+
+    def append(self, message: structure.Call) -> int:
+        """Appends the sampled values of a parsed Call message.
+
+        Args:
+            - message: structure.Call, a parsed MeterValues, StopTransaction or TransactionEvent Call message
+
+        Returns:
+            int, the number of rows appended
+
+        Raises:
+            - ValueError: raised when the message doesn't carry meter values
+        """
+        payload = message.payload
+        # Protocol, connector id, EVSE id and transaction id of every row
+        context: typing.Tuple[str, typing.Any, typing.Any, typing.Any]
+        # Meter values of either protocol, possibly parsed into columns
+        meter_values: typing.Any
+        if isinstance(payload, messages_v16.MeterValues.req):
+            context = ('v16', payload.connectorId, None, payload.transactionId)
+            meter_values = payload.meterValue
+        elif isinstance(payload, messages_v16.StopTransaction.req):
+            context = ('v16', None, None, payload.transactionId)
+            meter_values = payload.transactionData
+        elif isinstance(payload, messages_v20.TransactionEvent.Request):
+            evse = payload.evse
+            context = (
+                'v20',
+                evse.connectorId if evse is not None else None,
+                evse.id if evse is not None else None,
+                payload.transactionData.id,
+            )
+            meter_values = payload.meterValue
+        else:
+            raise ValueError(f"Can't export meter values from a '{type(payload).__name__}' payload")
+
+        if not meter_values:
+            return 0
+        if isinstance(meter_values, columnar.MeterValueColumns):
+            count = self._append_columns(meter_values)
+        else:
+            count = self._append_rows(meter_values)
+
+        protocol, connector_id, evse_id, transaction_id = context
+        columns = self._columns
+        columns['protocol'].extend([protocol] * count)
+        columns['action'].extend([message.action] * count)
+        columns['unique_id'].extend([message.uniqueId] * count)
+        columns['connector_id'].extend([connector_id] * count)
+        columns['evse_id'].extend([evse_id] * count)
+        columns['transaction_id'].extend([None if transaction_id is None else str(transaction_id)] * count)
+        self.num_rows += count
+        return count
+
+    def _append_rows(self, meter_values) -> int:
+        columns = self._columns
+        count = 0
+        for meter_value in meter_values:
+            timestamp = (meter_value.timestamp - _EPOCH) // _MICROSECOND
+            for sampled_value in meter_value.sampledValue:
+                columns['timestamp'].append(timestamp)
+                numeric_value = _numeric_value(sampled_value.value)
+                columns['value'].append(numeric_value)
+                columns['raw_value'].append(sampled_value.value if numeric_value is None else None)
+                for name, field_names in _ENUM_COLUMNS.items():
+                    value = None
+                    for field_name in field_names:
+                        value = getattr(sampled_value, field_name, None)
+                        if value is not None:
+                            break
+                    columns[name].append(_enum_value(value))
+                count += 1
+        return count
+
+    def _append_columns(self, meter_values: columnar.MeterValueColumns) -> int:
+        # Columns are read directly, without building a dataclass instance per sampled value
+        columns = self._columns
+        offsets = meter_values.offsets
+        count = offsets[-1]
+        for index, timestamp in enumerate(meter_values.timestamps):
+            columns['timestamp'].extend([timestamp] * (offsets[index + 1] - offsets[index]))
+
+        raw_values = meter_values.extras.get('value', {})
+        for index, value in enumerate(meter_values.values):
+            if value != value:  # NaN, the original value isn't a number
+                columns['value'].append(None)
+                columns['raw_value'].append(raw_values.get(index))
+            else:
+                columns['value'].append(value)
+                columns['raw_value'].append(None)
+
+        for name, field_names in _ENUM_COLUMNS.items():
+            column = columns[name]
+            column_values: typing.Dict[int, typing.Any] = {}
+            for field_name in field_names:
+                codes = meter_values.enums.get(field_name)
+                if codes is not None:
+                    members = meter_values.enum_members(field_name)
+                    column_values.update(
+                        (index, members[code]) for index, code in enumerate(codes) if code != columnar.UNDEFINED
+                    )
+                else:
+                    column_values.update(meter_values.extras.get(field_name, {}))
+            column.extend(_enum_value(column_values.get(index)) for index in range(count))
+        return count
+
+    def flush(self) -> 'pyarrow.RecordBatch':
+        """Builds a record batch from the accumulated rows, and starts a new one.
+
+        Returns:
+            pyarrow.RecordBatch, a record batch following 'SCHEMA'
+        """
+        batch = pyarrow.RecordBatch.from_arrays(
+            [pyarrow.array(self._columns[field.name], type=field.type) for field in SCHEMA],
+            schema=SCHEMA,
+        )
+        for column in self._columns.values():
+            column.clear()
+        self.num_rows = 0
+        return batch
+
+
+def to_record_batch(messages: typing.Iterable[structure.Call]) -> 'pyarrow.RecordBatch':
+    """Exports the sampled values of parsed Call messages to a single Arrow record batch.
+
+    Args:
+        - messages: iterable of structure.Call, parsed MeterValues, StopTransaction or TransactionEvent Call messages
+
+    Returns:
+        pyarrow.RecordBatch, a record batch following 'SCHEMA'
+    """
+    builder = RecordBatchBuilder()
+    for message in messages:
+        builder.append(message)
+    return builder.flush()
+
+
+class ParquetWriter:
+    """Writes the sampled values of parsed Call messages to a Parquet file, one record batch at a time.
+
+    At most 'batch_size' rows (plus the rows of the last appended message) are held in memory before being written.
+    """
+
+    def __init__(self, where, *, batch_size: int = 65536, **kwargs):
+        """Opens the Parquet file.
+
+        Args:
+            - where: str or file-like object, passed to 'pyarrow.parquet.ParquetWriter'
+            - batch_size: int, the number of rows of record batches written to the file (default: 65536)
+            - kwargs: extra arguments passed to 'pyarrow.parquet.ParquetWriter', e.g. 'compression'
+        """
+        _check_pyarrow()
+        self.batch_size = batch_size
+        self._builder = RecordBatchBuilder()
+        self._writer = pyarrow.parquet.ParquetWriter(where, SCHEMA, **kwargs)
+
+    def write(self, message: structure.Call) -> None:
+        """Adds the sampled values of a message, writing a record batch once 'batch_size' rows are accumulated."""
+        self._builder.append(message)
+        if self._builder.num_rows >= self.batch_size:
+            self._writer.write_batch(self._builder.flush())
+
+    def close(self) -> None:
+        """Writes the remaining rows and closes the Parquet file."""
+        if self._builder.num_rows:
+            self._writer.write_batch(self._builder.flush())
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,498 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Synthetic OCPP frames, built from the messages dataclasses.
+
+Payloads are generated from each field's type, validators ('max_length', 'is_positive', 'is_not_zero',
+'is_identifier', 'decimal_validator') and encoder ('EnumEncoder', 'DateTimeEncoder'), so that every generated frame is
+valid. Generation is deterministic, two generators with the same seed and settings yield the same frames:
+
+    frame_generator = generator.Generator(compat.OcppJsonProtocol.v16, seed=42, optional_density=0.8)
+    for generated in frame_generator.frames(1000000, mutations=list(generator.Mutation), mutation_rate=0.1):
+        ...
+
+Mutations turn a valid frame into an invalid one, raising a known error when parsed, see 'expected_error'. Every error
+raised by the parser can be triggered, errors the parser never raises (e.g.: 'NotSupportedError') can't.
+"""
+import dataclasses
+import datetime
+import enum
+import functools
+import random
+import string
+import typing
+
+from ocpp_codec import compat
+from ocpp_codec import encoders
+from ocpp_codec import errors
+from ocpp_codec import serializer
+from ocpp_codec import structure
+from ocpp_codec import types
+from ocpp_codec import validators
+
+
+class Mutation(enum.Enum):
+    """Ways of turning a valid frame into an invalid one."""
+    # Frame level mutations, applicable to any frame
+    NOT_A_LIST = enum.auto()
+    UNKNOWN_MESSAGE_TYPE = enum.auto()
+    TOO_MANY_ELEMENTS = enum.auto()
+    # Replaces the frame by a CallError answering it, its details nested deeper than the default limits allow
+    TOO_DEEP = enum.auto()
+    # Only applicable to Calls
+    UNKNOWN_ACTION = enum.auto()
+    # Payload mutations, only applicable to payloads holding a matching field
+    MISSING_REQUIRED_FIELD = enum.auto()
+    WRONG_TYPE = enum.auto()
+    TOO_LONG = enum.auto()
+    NEGATIVE_NUMBER = enum.auto()
+    EXCESS_PRECISION = enum.auto()
+    INVALID_IDENTIFIER = enum.auto()
+    INVALID_ENUM = enum.auto()
+    INVALID_DATETIME = enum.auto()
+    LIST_TOO_LONG = enum.auto()
+
+
+def expected_error(mutation: Mutation, protocol: compat.OcppJsonProtocol) -> typing.Type[errors.BaseOCPPError]:
+    """Returns the class of the error raised when parsing a frame altered by a mutation."""
+    if mutation is Mutation.NOT_A_LIST:
+        return type(compat.get_rpc_framework_error('', protocol=protocol))
+    if mutation is Mutation.UNKNOWN_MESSAGE_TYPE:
+        return type(compat.get_message_type_not_supported_error('', protocol=protocol))
+    if mutation is Mutation.UNKNOWN_ACTION:
+        return errors.NotImplementedError
+    if mutation in (Mutation.TOO_MANY_ELEMENTS, Mutation.MISSING_REQUIRED_FIELD):
+        return errors.ProtocolError
+    if mutation is Mutation.WRONG_TYPE:
+        return errors.TypeConstraintViolationError
+    if mutation is Mutation.TOO_DEEP:
+        return type(compat.get_protocol_error(errors.FormationViolationError(''), protocol))
+    if mutation is Mutation.LIST_TOO_LONG:
+        return type(compat.get_protocol_error(errors.OccurenceConstraintViolationError(''), protocol))
+    return errors.PropertyConstraintViolationError
+
+
+class GeneratedFrame(typing.NamedTuple):
+    """A generated frame, and what's needed to parse it."""
+    action: str
+    message_type: structure.MessageTypeEnum
+    frame: typing.Any
+    mutation: typing.Optional[Mutation] = None
+
+    @property
+    def call_result_action_name(self) -> typing.Optional[str]:
+        return self.action if self.message_type is structure.MessageTypeEnum.CALLRESULT else None
+
+
+class _FieldSpec:
+    """What values a field accepts, extracted from its type and metadata."""
+    __slots__ = (
+        'name', 'optional', 'kind', 'max_length', 'positive', 'non_zero', 'identifier', 'precision', 'enum_values',
+        'fields', 'element',
+    )
+
+    def __init__(self, field: dataclasses.Field, *, optional: bool):
+        self.name = field.name
+        self.optional = optional
+        self.max_length = None
+        self.positive = self.non_zero = self.identifier = False
+        self.precision = None
+        self.enum_values: typing.List[str] = []
+        self.fields: typing.List[_FieldSpec] = []
+        self.element: typing.Optional[_FieldSpec] = None
+
+        for validator in field.metadata.get('validators', []):
+            func = getattr(validator, 'func', validator)
+            if func is validators.max_length:
+                self.max_length = validator.args[0]
+            elif func is validators.decimal_validator:
+                self.precision = validator.args[0]
+            elif func is validators.is_positive:
+                self.positive = True
+            elif func is validators.is_not_zero:
+                self.non_zero = True
+            elif func is validators.is_identifier:
+                self.identifier = True
+
+        encoder = field.metadata.get('encoder')
+        if serializer._is_list(field.type):
+            self.kind = 'list'
+            self.element = _field_spec(serializer._unpack_field(field), optional=False)
+        elif dataclasses.is_dataclass(field.type):
+            self.kind = 'object'
+            self.fields = _compile(field.type)  # type: ignore # mypy doesn't know classes are hashable
+        elif isinstance(encoder, encoders.EnumEncoder):
+            self.kind = 'enum'
+            self.enum_values = [member.value for member in encoder.enum_class]
+        elif isinstance(encoder, encoders.DateTimeEncoder):
+            self.kind = 'datetime'
+        elif field.type in (bool, int, float, str):
+            self.kind = field.type.__name__
+        else:
+            raise ValueError(f"Can't generate values of field '{field.name}' of type '{field.type}'")
+
+
+def _field_spec(field: dataclasses.Field, *, optional: bool) -> _FieldSpec:
+    if not serializer._is_generic(field.type) and issubclass(field.type, types.SimpleType):
+        field = serializer._extract_base_type(field)
+    return _FieldSpec(field, optional=optional)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(dataclass_class) -> typing.List[_FieldSpec]:
+    return [
+        _field_spec(field, optional=serializer._is_optional(field)) for field in dataclasses.fields(dataclass_class)
+    ]
+
+
+_IDENTIFIER_CHARACTERS = string.ascii_letters + string.digits + '*_=:+|@.-'
+_CHARACTERS = string.ascii_letters + string.digits + ' '
+# Generated dates are picked between 2020-01-01 and 2030-01-01
+_MIN_TIMESTAMP = 1577836800
+_MAX_TIMESTAMP = 1893456000
+_EPOCH = datetime.datetime(1970, 1, 1)
+# Limits exceeded by the TOO_DEEP and LIST_TOO_LONG mutations, those enforced when parsing with the default options
+_MAX_DEPTH: int = serializer.DEFAULT_LIMITS.max_depth  # type: ignore # Every default limit is set
+_MAX_LIST_LENGTH: int = serializer.DEFAULT_LIMITS.max_list_length  # type: ignore # Every default limit is set
+
+
+def _nested_dict(depth: int) -> typing.Dict[str, typing.Any]:
+    # A dict nested in 'depth - 1' other dicts
+    nested: typing.Dict[str, typing.Any] = {}
+    for _ in range(depth - 1):
+        nested = {'nested': nested}
+    return nested
+
+
+class Generator:
+    """Generates valid, or deliberately invalid, frames of every implemented action of a protocol.
+
+    Attributes:
+        - protocol: compat.OcppJsonProtocol, the protocol of generated frames
+        - list_length: tuple of int, the minimum and maximum number of elements of lists, capped by the fields
+                       validators
+        - string_length: int, the maximum length of strings, capped by the fields validators
+        - optional_density: float, the probability for each optional field to be set, between 0 and 1
+    """
+
+    def __init__(
+        self,
+        protocol: compat.OcppJsonProtocol,
+        *,
+        seed: typing.Optional[int] = None,
+        list_length: typing.Tuple[int, int] = (1, 3),
+        string_length: int = 20,
+        optional_density: float = 0.5,
+    ):
+        if not 1 <= list_length[0] <= list_length[1]:
+            raise ValueError("'list_length' must be a (minimum, maximum) tuple, with 1 <= minimum <= maximum")
+        if not 0 <= optional_density <= 1:
+            raise ValueError("'optional_density' must be between 0 and 1")
+
+        self.protocol = protocol
+        self.list_length = list_length
+        self.string_length = string_length
+        self.optional_density = optional_density
+        self._random = random.Random(seed)
+        self._actions = compat.get_implemented_messages(protocol)
+        self._unique_id = 0
+
+    ############
+    # Generating
+
+    def payload(self, dataclass_class) -> typing.Dict[str, typing.Any]:
+        """Generates a valid raw payload of a dataclass."""
+        return self._object(_compile(dataclass_class))
+
+    def call(self, action: str) -> typing.List:
+        """Generates a valid raw Call of an action."""
+        payload = self.payload(compat.get_request_payload_dataclass(self._actions[action]))
+        return [structure.MessageTypeEnum.CALL.value, self._next_unique_id(), action, payload]
+
+    def call_result(self, action: str) -> typing.List:
+        """Generates a valid raw CallResult of an action."""
+        payload = self.payload(compat.get_response_payload_dataclass(self._actions[action]))
+        return [structure.MessageTypeEnum.CALLRESULT.value, self._next_unique_id(), payload]
+
+    def frames(
+        self,
+        count: typing.Optional[int] = None,
+        *,
+        actions: typing.Optional[typing.Iterable[str]] = None,
+        message_types: typing.Iterable[structure.MessageTypeEnum] = (
+            structure.MessageTypeEnum.CALL, structure.MessageTypeEnum.CALLRESULT,
+        ),
+        mutations: typing.Iterable[Mutation] = (),
+        mutation_rate: float = 0.0,
+    ) -> typing.Iterator[GeneratedFrame]:
+        """Generates frames of random actions.
+
+        Args:
+            - count: int, the number of frames to generate, endless when None (default: None)
+            - actions: iterable of str, the actions to pick from (default: every implemented action)
+            - message_types: iterable of structure.MessageTypeEnum, the message types to pick from, among CALL and
+                             CALLRESULT (default: both)
+            - mutations: iterable of Mutation, the mutations to pick from to make a frame invalid (default: none)
+            - mutation_rate: float, the probability for each frame to be made invalid, between 0 and 1 (default: 0)
+
+        Returns:
+            iterator of GeneratedFrame, frames made invalid have their 'mutation' set. Frames which can't be made
+            invalid by any of the given mutations are kept valid.
+        """
+        actions = sorted(self._actions if actions is None else actions)
+        message_types = list(message_types)
+        mutations = list(mutations)
+        generated = 0
+        while count is None or generated < count:
+            generated += 1
+            action = self._random.choice(actions)
+            message_type = self._random.choice(message_types)
+            if mutations and self._random.random() < mutation_rate:
+                mutation = self._random.choice(mutations)
+                frame = self.invalid_frame(action, message_type, mutation)
+                if frame is not None:
+                    yield GeneratedFrame(action, message_type, frame, mutation)
+                    continue
+
+            build = self.call if message_type is structure.MessageTypeEnum.CALL else self.call_result
+            yield GeneratedFrame(action, message_type, build(action))
+
+    ##########
+    # Mutating
+
+    def invalid_frame(
+        self, action: str, message_type: structure.MessageTypeEnum, mutation: Mutation,
+    ) -> typing.Optional[typing.Any]:
+        """Generates a frame of an action, made invalid by a mutation.
+
+        Returns:
+            object, the invalid frame, or None when the mutation can't be applied to this action and message type
+        """
+        is_call = message_type is structure.MessageTypeEnum.CALL
+        if mutation is Mutation.UNKNOWN_ACTION and not is_call:
+            return None
+        frame = self.call(action) if is_call else self.call_result(action)
+        payload_class = (
+            compat.get_request_payload_dataclass(self._actions[action])
+            if is_call else compat.get_response_payload_dataclass(self._actions[action])
+        )
+
+        if mutation is Mutation.NOT_A_LIST:
+            return dict(enumerate(frame))
+        if mutation is Mutation.UNKNOWN_MESSAGE_TYPE:
+            frame[0] = 5
+            return frame
+        if mutation is Mutation.TOO_MANY_ELEMENTS:
+            frame.append({})
+            return frame
+        if mutation is Mutation.TOO_DEEP:
+            # The frame's list is at depth 1 and the details at depth 2, nest them one level deeper than allowed
+            details = _nested_dict(_MAX_DEPTH)
+            return [structure.MessageTypeEnum.CALLERROR.value, frame[1], 'GenericError', '', details]
+        if mutation is Mutation.UNKNOWN_ACTION:
+            frame[2] = f'Unknown{action}'
+            return frame
+
+        candidates = list(self._mutation_candidates(_compile(payload_class), frame[-1], mutation))
+        if not candidates:
+            return None
+        container, spec = self._random.choice(candidates)
+        self._mutate(container, spec, mutation)
+        return frame
+
+    def _mutation_candidates(
+        self, specs: typing.List[_FieldSpec], data: typing.Dict[str, typing.Any], mutation: Mutation,
+    ) -> typing.Iterator[typing.Tuple[typing.Dict[str, typing.Any], _FieldSpec]]:
+        # Yields the fields of 'data', and of the objects it holds, the mutation can be applied to
+        for spec in specs:
+            if spec.name not in data:
+                continue
+            value = data[spec.name]
+            if spec.kind == 'object':
+                yield from self._mutation_candidates(spec.fields, value, mutation)
+            elif spec.element is not None and spec.element.kind == 'object':  # Only lists have an element
+                for element in value:
+                    yield from self._mutation_candidates(spec.element.fields, element, mutation)
+
+            if _applies(spec, mutation):
+                yield data, spec
+
+    def _mutate(self, data: typing.Dict[str, typing.Any], spec: _FieldSpec, mutation: Mutation) -> None:
+        if mutation is Mutation.MISSING_REQUIRED_FIELD:
+            del data[spec.name]
+        elif mutation is Mutation.WRONG_TYPE:
+            data[spec.name] = 1 if spec.kind in ('str', 'enum', 'datetime') else 'value'
+        elif mutation is Mutation.TOO_LONG:
+            data[spec.name] = data[spec.name][:1] * (spec.max_length + 1)  # type: ignore # Checked by '_applies'
+        elif mutation is Mutation.NEGATIVE_NUMBER:
+            data[spec.name] = -1 - data[spec.name]
+        elif mutation is Mutation.EXCESS_PRECISION:
+            data[spec.name] = 0.5 + 10 ** -(spec.precision + 1)  # type: ignore # Checked by '_applies'
+        elif mutation is Mutation.INVALID_IDENTIFIER:
+            data[spec.name] = '!'
+        elif mutation is Mutation.INVALID_ENUM:
+            data[spec.name] = 'NotAnEnumMember'
+        elif mutation is Mutation.INVALID_DATETIME:
+            data[spec.name] = '2020-13-32T25:61:00Z'
+        elif mutation is Mutation.LIST_TOO_LONG:
+            data[spec.name] = data[spec.name][:1] * (_MAX_LIST_LENGTH + 1)
+
+    ####################
+    # Generating values
+
+    def _next_unique_id(self) -> str:
+        self._unique_id += 1
+        return str(self._unique_id)
+
+    def _object(self, specs: typing.List[_FieldSpec]) -> typing.Dict[str, typing.Any]:
+        random_value = self._random.random
+        density = self.optional_density
+        return {
+            spec.name: self._value(spec) for spec in specs if not spec.optional or random_value() < density
+        }
+
+    def _value(self, spec: _FieldSpec) -> typing.Any:
+        kind = spec.kind
+        if kind == 'str':
+            length = self.string_length if spec.max_length is None else min(spec.max_length, self.string_length)
+            characters = _IDENTIFIER_CHARACTERS if spec.identifier else _CHARACTERS
+            return ''.join(self._random.choices(characters, k=self._random.randint(1, length)))
+        if kind == 'enum':
+            return self._random.choice(spec.enum_values)
+        if kind == 'int':
+            return self._random.randint(1 if spec.non_zero else 0, 100000)
+        if kind == 'float':
+            return round(self._random.uniform(0, 100000), 3 if spec.precision is None else spec.precision)
+        if kind == 'datetime':
+            timestamp = self._random.randint(_MIN_TIMESTAMP, _MAX_TIMESTAMP)
+            return (_EPOCH + datetime.timedelta(seconds=timestamp)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        if kind == 'bool':
+            return self._random.random() < 0.5
+        if kind == 'object':
+            return self._object(spec.fields)
+        # List
+        maximum = self.list_length[1] if spec.max_length is None else min(spec.max_length, self.list_length[1])
+        length = self._random.randint(min(self.list_length[0], maximum), maximum)
+        return [self._value(spec.element) for _ in range(length)]  # type: ignore # Lists have an element
+
+
+def _applies(spec: _FieldSpec, mutation: Mutation) -> bool:
+    if mutation is Mutation.MISSING_REQUIRED_FIELD:
+        return not spec.optional
+    if mutation is Mutation.WRONG_TYPE:
+        return spec.kind in ('str', 'enum', 'datetime', 'int', 'float')
+    if mutation is Mutation.TOO_LONG:
+        return spec.kind == 'str' and spec.max_length is not None
+    if mutation is Mutation.NEGATIVE_NUMBER:
+        return spec.positive
+    if mutation is Mutation.EXCESS_PRECISION:
+        return spec.precision is not None
+    if mutation is Mutation.INVALID_IDENTIFIER:
+        return spec.identifier
+    if mutation is Mutation.INVALID_ENUM:
+        return spec.kind == 'enum'
+    if mutation is Mutation.INVALID_DATETIME:
+        return spec.kind == 'datetime'
+    if mutation is Mutation.LIST_TOO_LONG:
+        return spec.kind == 'list'
+    return False
+
+
+###################
+# Adversarial input
+
+class AdversarialFrame(typing.NamedTuple):
+    """A frame crafted to be expensive to parse, and what's needed to parse it."""
+    name: str
+    protocol: compat.OcppJsonProtocol
+    frame: typing.Any
+    call_result_action_name: typing.Optional[str] = None
+
+
+def adversarial_frames(*, scale: float = 1) -> typing.Iterator[AdversarialFrame]:
+    """Generates frames a malicious or faulty charge point could send to stall a server parsing them.
+
+    Frames are oversized (e.g.: a 10 MB 'DataTransfer.req' data, a 'SendLocalList.req' with 100k entries) or hold
+    values known to be costly to validate (e.g.: pathological dates and identifiers). Some are valid, most aren't.
+    Frames are built lazily, one at a time, as they can be large.
+
+    Args:
+        - scale: float, factor applied to the size of every frame (default: 1)
+
+    Returns:
+        iterator of AdversarialFrame
+    """
+    large_string = int(10_000_000 * scale)
+    medium_string = int(1_000_000 * scale)
+    entries = int(100_000 * scale)
+    v16, v20 = compat.OcppJsonProtocol.v16, compat.OcppJsonProtocol.v20
+    base_v16 = Generator(v16, seed=0, optional_density=0)
+    base_v20 = Generator(v20, seed=0, optional_density=0)
+
+    def call(frame_generator: Generator, action: str, **payload):
+        frame = frame_generator.call(action)
+        frame[3].update(payload)
+        return frame
+
+    def call_result(frame_generator: Generator, action: str, **payload):
+        frame = frame_generator.call_result(action)
+        frame[2].update(payload)
+        return frame
+
+    # Oversized frames
+    yield AdversarialFrame('v16 DataTransfer.req with a large data', v16, call(
+        base_v16, 'DataTransfer', data='A' * large_string,
+    ))
+    yield AdversarialFrame('v16 SendLocalList.req with many entries', v16, call(
+        base_v16, 'SendLocalList',
+        localAuthorizationList=[
+            {'idTag': f'{index:020d}', 'idTagInfo': {'status': 'Accepted'}} for index in range(entries)
+        ],
+    ))
+    yield AdversarialFrame('v16 MeterValues.req with many sampled values', v16, call(
+        base_v16, 'MeterValues',
+        meterValue=[{'timestamp': '2020-01-01T00:00:00Z', 'sampledValue': [{'value': '1200.5'}] * entries}],
+    ))
+    yield AdversarialFrame('v20 GetVariables.Request with many entries', v20, call(
+        base_v20, 'GetVariables',
+        getVariableData=[{'component': {'name': 'EVSE'}, 'variable': {'name': f'{index}'}} for index in range(entries)],
+    ))
+    yield AdversarialFrame('v20 TransactionEvent.Request with many sampled values', v20, call(
+        base_v20, 'TransactionEvent',
+        meterValue=[{'timestamp': '2020-01-01T00:00:00Z', 'sampledValue': [{'value': 1200.5}] * entries}],
+    ))
+    yield AdversarialFrame('v16 BootNotification.req with many unknown fields', v16, call(
+        base_v16, 'BootNotification', **{f'field{index}': index for index in range(entries)},
+    ))
+    yield AdversarialFrame('v16 Call with many extra elements', v16, base_v16.call('Heartbeat') + [None] * entries)
+    yield AdversarialFrame('v16 Call with a large unique id', v16, [2, 'A' * large_string, 'Heartbeat', {}])
+    yield AdversarialFrame('v16 CallError with deeply nested details', v16, [
+        4, '1', 'GenericError', 'Error', _nested_dict(501),
+    ])
+
+    # Costly values
+    yield AdversarialFrame('v16 BootNotification.req with a large list instead of a string', v16, call(
+        base_v16, 'BootNotification', chargePointModel=list(range(entries)),
+    ))
+    yield AdversarialFrame('v16 StatusNotification.req with a large enum value', v16, call(
+        base_v16, 'StatusNotification', status='A' * large_string,
+    ))
+    yield AdversarialFrame('v16 Authorize.req with a large identifier', v16, call(
+        base_v16, 'Authorize', idTag='A' * large_string,
+    ))
+    frame = base_v20.call('Authorize')
+    frame[3]['idToken']['idToken'] = 'A' * large_string + '!'
+    yield AdversarialFrame('v20 Authorize.Request with a large invalid identifier', v20, frame)
+    frame = base_v20.call('Authorize')
+    frame[3]['idToken']['idToken'] = 'A' * 35 + '!'
+    yield AdversarialFrame('v20 Authorize.Request with an identifier invalid at its last character', v20, frame)
+    for name, date in (
+        ('a long fraction of second', '2020-01-01T00:00:00.' + '1' * medium_string + 'Z'),
+        ('a long time zone', '2020-01-01T00:00:00+' + '0' * medium_string),
+        ('a long run of separators', '2020-01-01T' + ':' * medium_string),
+        ('a long number', '1' * medium_string),
+    ):
+        yield AdversarialFrame(f'v16 Heartbeat.conf with {name}', v16, call_result(
+            base_v16, 'Heartbeat', currentTime=date,
+        ), 'Heartbeat')
+        yield AdversarialFrame(f'v20 BootNotification.Response with {name}', v20, call_result(
+            base_v20, 'BootNotification', currentTime=date,
+        ), 'BootNotification')
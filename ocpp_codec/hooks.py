@@ -0,0 +1,239 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Instrumentation hooks, observing the time spent in each stage of parsing and serializing messages.
+
+Hooks are either callbacks, called with an 'Event' once a stage is done, or context factories, called with an 'Event'
+when a stage starts and returning a context manager entered around it:
+
+    def log_slow_stages(event):
+        if event.elapsed_ns > 1000000:
+            logger.warning("%s %s of %s took %dns", event.direction.value, event.stage.value, event.action, ...)
+
+    hooks.add(log_slow_stages)
+
+Stages are measured by 'serializer.parse', 'serializer.loads', 'serializer.serialize', 'serializer.dumps' and
+'serializer.serialize_broadcast', and by the validators and encoders they run. Asynchronous code calls these
+synchronous functions, they're observed the same way. 'metrics.Registry' aggregates events into counters and
+histograms.
+
+When no hook is installed, 'enabled' is False: messages and frames aren't measured at all, nor are their validators
+and encoders, and other stages only cost a function call returning a no-op context manager.
+
+Hooks are called synchronously, in the thread parsing or serializing the message, exceptions they raise are propagated.
+"""
+import contextlib
+import enum
+import threading
+import time
+import typing
+
+
+# Whether any hook is installed, checked by the codec before measuring stages
+enabled = False
+
+_callbacks: typing.Tuple[typing.Callable[['Event'], None], ...] = ()
+_contexts: typing.Tuple[typing.Callable[['Event'], typing.ContextManager], ...] = ()
+# Action of the payload being parsed or serialized by the current thread, given to validators and encoders events
+_state = threading.local()
+
+try:
+    _now_ns = time.perf_counter_ns
+except AttributeError:  # pragma: no cover
+    # Python < 3.7
+    def _now_ns() -> int:
+        return int(time.perf_counter() * 1000000000)
+
+
+class Stage(enum.Enum):
+    """Measured stages of parsing and serializing messages."""
+    # Decoding or encoding JSON, then parsing or serializing the message ('loads' and 'dumps' only)
+    FRAME = 'frame'
+    # Parsing or serializing a whole message ('parse' and 'serialize'), including its JSON ('loads' and 'dumps')
+    MESSAGE = 'message'
+    # The message type, uniqueId, action and error fields
+    ENVELOPE = 'envelope'
+    # The payload of Call and CallResult messages
+    PAYLOAD = 'payload'
+    # A single validator of a field
+    VALIDATOR = 'validator'
+    # A single encoder of a field
+    ENCODER = 'encoder'
+
+
+class Direction(enum.Enum):
+    INCOMING = 'incoming'  # Parsing
+    OUTGOING = 'outgoing'  # Serializing
+
+
+class Event:
+    """A stage being measured.
+
+    Context factories get the event before the stage runs, callbacks once it's done and every attribute is set.
+
+    Attributes:
+        - stage: Stage, the measured stage
+        - direction: Direction, whether the message is parsed or serialized
+        - action: str, the action name of the message, None when unknown (e.g.: CallError messages, or the envelope of
+                  a Call before it's parsed)
+        - field: str, the name of the field of validators and encoders, None for other stages
+        - name: str, the name of the validator or encoder, None for other stages
+        - size: int, the size of the frame in bytes, only known to 'Stage.FRAME' events
+        - message_type: structure.MessageTypeEnum, the type of the message, only known to 'Stage.MESSAGE' events, once
+                        the envelope is parsed
+        - unique_id: str, the uniqueId of the message, same as 'message_type'
+        - protocol: compat.OcppJsonProtocol, the protocol of the message, only known to 'Stage.MESSAGE' events, unless
+                    serializing a CallError without giving the protocol
+        - elapsed_ns: int, the time spent in the stage, in nanoseconds, None until it's done
+        - error: Exception, the exception raised by the stage, if any
+    """
+    __slots__ = ('stage', 'direction', 'action', 'field', 'name', 'size', 'message_type', 'unique_id', 'protocol',
+                 'elapsed_ns', 'error', '_start', '_entered', '_previous_action')
+
+    def __init__(
+        self,
+        stage: Stage,
+        direction: Direction,
+        action: typing.Optional[str] = None,
+        field: typing.Optional[str] = None,
+        name: typing.Optional[str] = None,
+        size: typing.Optional[int] = None,
+        message_type=None,
+        unique_id: typing.Optional[str] = None,
+        protocol=None,
+    ):
+        self.stage = stage
+        self.direction = direction
+        self.action = action
+        self.field = field
+        self.name = name
+        self.size = size
+        self.message_type = message_type
+        self.unique_id = unique_id
+        self.protocol = protocol
+        self.elapsed_ns = None
+        self.error = None
+
+    def __repr__(self):
+        return (
+            f'Event({self.stage.value}, {self.direction.value}, action={self.action!r}, field={self.field!r}, '
+            f'name={self.name!r}, size={self.size!r}, elapsed_ns={self.elapsed_ns!r})'
+        )
+
+    def __enter__(self):
+        self._entered = [context(self) for context in _contexts]
+        for context in self._entered:
+            context.__enter__()
+        if self.stage is Stage.PAYLOAD:
+            self._previous_action = getattr(_state, 'action', None)
+            _state.action = self.action
+        self._start = _now_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed_ns = _now_ns() - self._start
+        self.error = exc_value
+        if self.stage is Stage.PAYLOAD:
+            _state.action = self._previous_action
+        for context in reversed(self._entered):
+            context.__exit__(exc_type, exc_value, traceback)
+        for callback in _callbacks:
+            callback(self)
+        return False
+
+
+class _NoOp:
+    """Stand-in for 'Event' when no hook is installed."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NO_OP = _NoOp()
+
+
+def measure(
+    stage: Stage,
+    direction: Direction,
+    *,
+    action: typing.Optional[str] = None,
+    field: typing.Optional[str] = None,
+    name: typing.Optional[str] = None,
+    size: typing.Optional[int] = None,
+    message_type=None,
+    unique_id: typing.Optional[str] = None,
+    protocol=None,
+) -> typing.ContextManager[Event]:
+    """Returns a context manager measuring a stage, see 'Event' for arguments.
+
+    The event's attributes can be set while the stage runs (e.g.: the action name, once the envelope is parsed).
+    Validators and encoders events default to the action of the payload being parsed or serialized.
+    """
+    if not enabled:
+        return _NO_OP
+    if action is None and stage in (Stage.VALIDATOR, Stage.ENCODER):
+        action = getattr(_state, 'action', None)
+    return Event(stage, direction, action, field, name, size, message_type, unique_id, protocol)
+
+
+def _update():
+    global enabled
+    enabled = bool(_callbacks or _contexts)
+
+
+def add(
+    callback: typing.Optional[typing.Callable[[Event], None]] = None,
+    *,
+    context: typing.Optional[typing.Callable[[Event], typing.ContextManager]] = None,
+) -> None:
+    """Installs a callback, called with every event once its stage is done, and/or a context factory, called with
+    every event when its stage starts and returning a context manager entered around the stage.
+    """
+    global _callbacks, _contexts
+    # Hooks are replaced rather than modified, so that threads iterating over them aren't disturbed
+    if callback is not None:
+        _callbacks += (callback,)
+    if context is not None:
+        _contexts += (context,)
+    _update()
+
+
+def remove(
+    callback: typing.Optional[typing.Callable[[Event], None]] = None,
+    *,
+    context: typing.Optional[typing.Callable[[Event], typing.ContextManager]] = None,
+) -> None:
+    """Uninstalls hooks installed by 'add'.
+
+    Raises:
+        ValueError: raised when a hook isn't installed
+    """
+    global _callbacks, _contexts
+    if callback is not None:
+        if callback not in _callbacks:
+            raise ValueError(f"Callback {callback!r} isn't installed")
+        _callbacks = tuple(installed for installed in _callbacks if installed != callback)
+    if context is not None:
+        if context not in _contexts:
+            raise ValueError(f"Context factory {context!r} isn't installed")
+        _contexts = tuple(installed for installed in _contexts if installed != context)
+    _update()
+
+
+@contextlib.contextmanager
+def installed(
+    callback: typing.Optional[typing.Callable[[Event], None]] = None,
+    *,
+    context: typing.Optional[typing.Callable[[Event], typing.ContextManager]] = None,
+) -> typing.Iterator[None]:
+    """Installs hooks for the duration of a 'with' block, see 'add'."""
+    add(callback, context=context)
+    try:
+        yield
+    finally:
+        remove(callback, context=context)
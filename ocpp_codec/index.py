@@ -0,0 +1,337 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Memory-mapped index over archived OCPP traffic.
+
+Indexes map the charge point id, action, unique id and timestamp of archived frames (see 'archive') to their location:
+archive file, block offset and position in the block. They're made of immutable segments, each holding fixed-size
+entries sorted in two orders: by charge point then timestamp, and by unique id. Segments are memory-mapped and
+searched with a binary search, without loading them in memory.
+
+    builder = index.IndexBuilder('traffic.index')
+    builder.add('traffic.ocpplog')  # Only indexes blocks appended since the last call
+
+    with index.Index('traffic.index') as traffic_index:
+        for record in traffic_index.find(charge_point_id='CP-1', action='StopTransaction', start=start, end=end):
+            message = serializer.parse(record.frame, protocol=compat.OcppJsonProtocol.v16)
+
+Strings are stored as 8 bytes hashes, matching entries are checked against the archived record before being
+returned. The action of CallResult and CallError frames is the action of their Call, sent in the other direction.
+
+Every call to 'IndexBuilder.add' writes a new segment. 'IndexBuilder.compact' merges them into a single one.
+"""
+import bisect
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import struct
+import typing
+
+from ocpp_codec import archive
+from ocpp_codec import cache
+from ocpp_codec import structure
+
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Charge point hash, action hash, unique id hash, timestamp, file id, block offset, position in the block
+_ENTRY = struct.Struct('>QQQqIQI')
+# Sort orders of segments, used as the file extension of segments
+_BY_CHARGE_POINT = 'by_charge_point'
+_BY_UNIQUE_ID = 'by_unique_id'
+_SORT_KEYS = {
+    # Charge point, then timestamp
+    _BY_CHARGE_POINT: lambda entry: (entry[0], entry[3]),
+    # Unique id, then timestamp
+    _BY_UNIQUE_ID: lambda entry: (entry[2], entry[3]),
+}
+
+# Maximum number of Calls still waiting for a result remembered between two builds
+_MAX_PENDING_CALLS = 10000
+
+
+def _hash(string: typing.Optional[str]) -> int:
+    if not string:
+        return 0
+    return int.from_bytes(hashlib.blake2b(string.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _to_microseconds(timestamp: datetime.datetime) -> int:
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+
+def _unique_id_and_action(frame: typing.Any) -> typing.Tuple[typing.Optional[str], typing.Optional[str]]:
+    if not isinstance(frame, list) or len(frame) < 2 or not isinstance(frame[1], str):
+        return None, None
+    action = frame[2] if frame[0] == structure.MessageTypeEnum.CALL.value and len(frame) > 2 else None
+    return frame[1], action if isinstance(action, str) else None
+
+
+def _load_manifest(directory: str) -> typing.Dict[str, typing.Any]:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return {'version': FORMAT_VERSION, 'files': {}, 'segments': [], 'next_segment': 0}
+
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format version {manifest.get('version')}")
+    return manifest
+
+
+class IndexBuilder:
+    """Indexes archive files, incrementally."""
+
+    def __init__(self, directory: typing.Union[str, os.PathLike]):
+        """Opens an index, creating its directory if needed."""
+        self.directory = os.fspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self._manifest = _load_manifest(self.directory)
+
+    def add(self, path: typing.Union[str, os.PathLike]) -> int:
+        """Indexes the blocks of an archive file which weren't indexed yet.
+
+        Args:
+            - path: str or path-like, the path of the archive file
+
+        Returns:
+            int, the number of indexed records
+        """
+        path = os.path.abspath(os.fspath(path))
+        files = self._manifest['files']
+        file_state = files.setdefault(path, {'id': len(files), 'indexed_blocks': 0, 'pending_calls': []})
+        # Action of Calls waiting for a result, by charge point, direction and unique id. Both ends pick their own
+        # unique ids, a Call sent to the charge point may use the unique id of a Call received from it.
+        pending_calls = {
+            (cp_id, archive.Direction(direction), unique_id): action
+            for cp_id, direction, unique_id, action in file_state['pending_calls']
+        }
+
+        entries = []
+        with archive.ArchiveReader(path) as reader:
+            new_blocks = reader.block_offsets[file_state['indexed_blocks']:]
+            for block_offset in new_blocks:
+                for record in reader.read_block(block_offset):
+                    unique_id, action = _unique_id_and_action(record.frame)
+                    if unique_id is not None:
+                        if action is not None:
+                            pending_calls[record.charge_point_id, record.direction, unique_id] = action
+                        else:
+                            call_direction = (
+                                archive.Direction.SENT if record.direction is archive.Direction.RECEIVED
+                                else archive.Direction.RECEIVED
+                            )
+                            action = pending_calls.pop((record.charge_point_id, call_direction, unique_id), None)
+                    entries.append((
+                        _hash(record.charge_point_id),
+                        _hash(action),
+                        _hash(unique_id),
+                        _to_microseconds(record.timestamp),
+                        file_state['id'],
+                        block_offset,
+                        record.index,
+                    ))
+
+        file_state['indexed_blocks'] += len(new_blocks)
+        file_state['pending_calls'] = [
+            [cp_id, direction.value, unique_id, action]
+            for (cp_id, direction, unique_id), action in list(pending_calls.items())[-_MAX_PENDING_CALLS:]
+        ]
+        if entries:
+            self._write_segment(entries)
+        self._save_manifest()
+        return len(entries)
+
+    def compact(self) -> None:
+        """Merges every segment of the index into a single one."""
+        segments = self._manifest['segments']
+        if len(segments) < 2:
+            return
+
+        entries: typing.List[typing.Tuple] = []
+        for segment in segments:
+            with open(self._segment_path(segment, _BY_CHARGE_POINT), 'rb') as segment_file:
+                entries.extend(_ENTRY.iter_unpack(segment_file.read()))
+
+        self._manifest['segments'] = []
+        self._write_segment(entries)
+        self._save_manifest()
+        for segment in segments:
+            for order in _SORT_KEYS:
+                os.remove(self._segment_path(segment, order))
+
+    def _segment_path(self, segment: str, order: str) -> str:
+        return os.path.join(self.directory, f'{segment}.{order}')
+
+    def _write_segment(self, entries: typing.Iterable[typing.Tuple]) -> None:
+        segment = f"segment-{self._manifest['next_segment']:06d}"
+        self._manifest['next_segment'] += 1
+
+        for order, key in _SORT_KEYS.items():
+            with open(self._segment_path(segment, order), 'wb') as segment_file:
+                segment_file.write(b''.join(_ENTRY.pack(*entry) for entry in sorted(entries, key=key)))
+        self._manifest['segments'].append(segment)
+
+    def _save_manifest(self) -> None:
+        # Write then rename, so that readers never see a partially written manifest
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + '.tmp', 'w') as manifest_file:
+            json.dump(self._manifest, manifest_file)
+        os.replace(path + '.tmp', path)
+
+
+class _Segment:
+    """Memory-mapped entries of a segment, sorted in a given order."""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._data: typing.Union[mmap.mmap, bytes] = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        )
+        self._length = size // _ENTRY.size
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> typing.Tuple:
+        return _ENTRY.unpack_from(self._data, index * _ENTRY.size)
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple]:
+        return _ENTRY.iter_unpack(self._data)
+
+    def range(self, low: typing.Tuple, high: typing.Tuple, key: typing.Callable) -> typing.Iterator[typing.Tuple]:
+        """Yields the entries whose key is between 'low' and 'high', inclusive."""
+        keys = _KeyView(self, key)
+        for index in range(bisect.bisect_left(keys, low), bisect.bisect_right(keys, high)):
+            yield self[index]
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+class _KeyView(typing.Sequence):
+    # Sequence of the keys of a segment's entries, for bisect
+    def __init__(self, segment: _Segment, key: typing.Callable):
+        self._segment = segment
+        self._key = key
+
+    def __len__(self) -> int:
+        return len(self._segment)
+
+    def __getitem__(self, index):
+        return self._key(self._segment[index])
+
+
+_MIN_TIMESTAMP = -(1 << 63)
+_MAX_TIMESTAMP = (1 << 63) - 1
+
+
+class Index:
+    """Queries an index built by 'IndexBuilder'.
+
+    Matching records are read from the archive files with random access, only the blocks holding them are
+    decompressed.
+    """
+
+    def __init__(self, directory: typing.Union[str, os.PathLike]):
+        self.directory = os.fspath(directory)
+        manifest = _load_manifest(self.directory)
+        self._paths = {file_state['id']: path for path, file_state in manifest['files'].items()}
+        self._segments = {
+            order: [_Segment(os.path.join(self.directory, f'{segment}.{order}')) for segment in manifest['segments']]
+            for order in _SORT_KEYS
+        }
+        self._readers: typing.Dict[int, archive.ArchiveReader] = {}
+        # Records of the last decompressed blocks, by file id and block offset
+        self._blocks = cache.LRUCache(maxsize=16)
+
+    def find(
+        self,
+        *,
+        charge_point_id: typing.Optional[str] = None,
+        action: typing.Optional[str] = None,
+        unique_id: typing.Optional[str] = None,
+        start: typing.Optional[datetime.datetime] = None,
+        end: typing.Optional[datetime.datetime] = None,
+    ) -> typing.List[archive.Record]:
+        """Finds the archived records matching every given criteria.
+
+        Args:
+            - charge_point_id: str, identifier of the charge point which sent or received the frame (default: None)
+            - action: str, action of the frame, or of the Call of CallResult and CallError frames (default: None)
+            - unique_id: str, unique id of the frame (default: None)
+            - start: datetime.datetime, only return records recorded at or after this time (default: None)
+            - end: datetime.datetime, only return records recorded at or before this time (default: None)
+
+        Returns:
+            list of archive.Record, the matching records, ordered by timestamp
+        """
+        start_us = _MIN_TIMESTAMP if start is None else _to_microseconds(start)
+        end_us = _MAX_TIMESTAMP if end is None else _to_microseconds(end)
+        action_hash = _hash(action)
+        charge_point_hash = _hash(charge_point_id)
+
+        if unique_id is not None:
+            unique_id_hash = _hash(unique_id)
+            candidates = self._range(_BY_UNIQUE_ID, (unique_id_hash, start_us), (unique_id_hash, end_us))
+        elif charge_point_id is not None:
+            candidates = self._range(_BY_CHARGE_POINT, (charge_point_hash, start_us), (charge_point_hash, end_us))
+        else:
+            candidates = (entry for segment in self._segments[_BY_CHARGE_POINT] for entry in segment)
+
+        matches = []
+        for entry in candidates:
+            if not start_us <= entry[3] <= end_us:
+                continue
+            if charge_point_id is not None and entry[0] != charge_point_hash:
+                continue
+            if action is not None and entry[1] != action_hash:
+                continue
+            matches.append(entry)
+        matches.sort(key=lambda entry: (entry[3], entry[4], entry[5], entry[6]))
+
+        records = []
+        for entry in matches:
+            record = self._read_record(entry[4], entry[5], entry[6])
+            # Make sure it isn't a hash collision
+            record_unique_id, _ = _unique_id_and_action(record.frame)
+            if charge_point_id is not None and record.charge_point_id != charge_point_id:
+                continue
+            if unique_id is not None and record_unique_id != unique_id:
+                continue
+            records.append(record)
+        return records
+
+    def _range(self, order: str, low: typing.Tuple, high: typing.Tuple) -> typing.Iterator[typing.Tuple]:
+        for segment in self._segments[order]:
+            yield from segment.range(low, high, _SORT_KEYS[order])
+
+    def _read_record(self, file_id: int, block_offset: int, index: int) -> archive.Record:
+        records = self._blocks.get((file_id, block_offset))
+        if records is None:
+            reader = self._readers.get(file_id)
+            if reader is None:
+                reader = self._readers[file_id] = archive.ArchiveReader(self._paths[file_id])
+            records = reader.read_block(block_offset)
+            self._blocks.put((file_id, block_offset), records)
+        return records[index]
+
+    def close(self) -> None:
+        for segments in self._segments.values():
+            for segment in segments:
+                segment.close()
+        for reader in self._readers.values():
+            reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
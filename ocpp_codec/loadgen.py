@@ -0,0 +1,484 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Load generator simulating a fleet of charge points talking to a central system, both using the codec.
+
+Usage:
+
+    python -m ocpp_codec.loadgen [--protocol v16] [--charge-points 1000] [--duration 10] [--interval 1]
+                                 [--mix Heartbeat=4,StatusNotification=2,transaction=1] [--transport queue]
+
+Every charge point sends a BootNotification, then picks Calls from the message mix, weighted, and waits for their
+response before sleeping '--interval' seconds on average (0 sends as fast as possible). The 'transaction' entry of the
+mix sends a whole transaction: StartTransaction, MeterValues and StopTransaction in OCPP 1.6, TransactionEvents in
+OCPP 2.0. The central system replies to every Call, and sends its own Calls to every charge point every
+'--server-interval' seconds on average (0 disables them), which charge points reply to.
+
+Both ends serialize their messages with 'serializer.serialize' then 'json.dumps', and decode received frames with
+'json.loads' then 'serializer.parse'. Payloads are generated once by 'generator.Generator' and reused. Charge points and
+the central system run in the same event loop, exchanging frames through in-process queues ('--transport queue') or
+loopback websockets ('--transport websocket', requires the 'websockets' package, installed with the 'loadgen' extra:
+pip install ocpp-codec[loadgen]).
+
+The report gives the achieved rate and latencies of every action, measured by its sender from serializing the Call to
+parsing its response, so that they include the codec's work on both ends.
+"""
+import argparse
+import asyncio
+import dataclasses
+import itertools
+import json
+import random
+import sys
+import time
+import typing
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover
+    websockets = None
+
+from ocpp_codec import compat
+from ocpp_codec import exceptions
+from ocpp_codec import generator
+from ocpp_codec import serializer
+from ocpp_codec import structure
+
+
+# Calls sent by charge points during a transaction, in order
+TRANSACTIONS = {
+    compat.OcppJsonProtocol.v16: ('StartTransaction', 'MeterValues', 'MeterValues', 'MeterValues', 'StopTransaction'),
+    compat.OcppJsonProtocol.v20: ('TransactionEvent',) * 5,
+}
+# Calls sent by the central system to charge points
+SERVER_ACTIONS = {
+    compat.OcppJsonProtocol.v16: (
+        'ChangeAvailability', 'ChangeConfiguration', 'DataTransfer', 'GetLocalListVersion', 'RemoteStartTransaction',
+        'RemoteStopTransaction', 'ReserveNow', 'SendLocalList', 'UnlockConnector',
+    ),
+    compat.OcppJsonProtocol.v20: ('ChangeAvailability', 'GetVariables', 'SetVariables'),
+}
+# Weights of the Calls sent by charge points, 'transaction' sends a whole transaction
+DEFAULT_MIX = {'Heartbeat': 4, 'StatusNotification': 2, 'Authorize': 1, 'transaction': 1}
+TRANSPORTS = ('queue', 'websocket')
+
+# Number of distinct payloads generated for each action and message type
+_POOL_SIZE = 16
+_SUBPROTOCOLS = {compat.OcppJsonProtocol.v16: 'ocpp1.6', compat.OcppJsonProtocol.v20: 'ocpp2.0'}
+
+
+@dataclasses.dataclass
+class FleetConfig:
+    """Settings of a simulation.
+
+    Attributes:
+        - protocol: compat.OcppJsonProtocol, the protocol spoken by the fleet
+        - charge_points: int, number of simulated charge points
+        - duration: float, duration of the simulation, in seconds
+        - interval: float, average time charge points wait between two Calls, in seconds
+        - mix: dict, weights of the Calls sent by charge points, by action name or 'transaction'
+        - server_interval: float, average time the central system waits between two Calls to a charge point, in
+                           seconds. Disabled when 0.
+        - transport: str, one of 'TRANSPORTS'
+        - timeout: float, time a sender waits for a response before counting a timeout, in seconds
+        - seed: int, seed of generated payloads and timings
+    """
+    protocol: compat.OcppJsonProtocol = compat.OcppJsonProtocol.v16
+    charge_points: int = 100
+    duration: float = 10.0
+    interval: float = 1.0
+    mix: typing.Dict[str, float] = dataclasses.field(default_factory=lambda: dict(DEFAULT_MIX))
+    server_interval: float = 10.0
+    transport: str = 'queue'
+    timeout: float = 10.0
+    seed: int = 0
+
+    def __post_init__(self):
+        actions = compat.get_implemented_messages(self.protocol)
+        unknown = [name for name in self.mix if name != 'transaction' and name not in actions]
+        if unknown:
+            raise ValueError(f"Unknown actions in the message mix: {', '.join(sorted(unknown))}")
+        if not self.mix or any(weight < 0 for weight in self.mix.values()) or not sum(self.mix.values()):
+            raise ValueError("The message mix needs positive weights")
+        if self.transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport '{self.transport}', expected one of {', '.join(TRANSPORTS)}")
+
+
+def _percentile(sorted_values: typing.Sequence[float], percentile: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percentile / 100))]
+
+
+class Stats:
+    """Calls sent by one end of the simulation, their latencies and errors, by action."""
+
+    def __init__(self):
+        self.latencies: typing.Dict[str, typing.List[float]] = {}
+        self.errors: typing.Dict[str, int] = {}
+
+    def record(self, action: str, latency: typing.Optional[float]) -> None:
+        """Records a Call, with its latency in seconds, or None when it failed."""
+        if latency is None:
+            self.errors[action] = self.errors.get(action, 0) + 1
+        else:
+            self.latencies.setdefault(action, []).append(latency)
+
+    def summary(self, duration: float) -> typing.Dict[str, typing.Dict[str, float]]:
+        """Returns the rate and latencies, in milliseconds, of every action."""
+        summary = {}
+        for action in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies.get(action, ()))
+            summary[action] = {
+                'calls': len(latencies),
+                'errors': self.errors.get(action, 0),
+                'rate': len(latencies) / duration,
+            }
+            if latencies:
+                summary[action].update({
+                    f'p{percentile}': _percentile(latencies, percentile) * 1000 for percentile in (50, 95, 99)
+                })
+                summary[action]['max'] = latencies[-1] * 1000
+        return summary
+
+
+@dataclasses.dataclass
+class Report:
+    """Results of a simulation.
+
+    Attributes:
+        - config: FleetConfig, the settings of the simulation
+        - duration: float, the actual duration of the simulation, in seconds
+        - charge_points: dict, the summary of the Calls sent by charge points, see 'Stats.summary'
+        - central_system: dict, the summary of the Calls sent by the central system, see 'Stats.summary'
+    """
+    config: FleetConfig
+    duration: float
+    charge_points: typing.Dict[str, typing.Dict[str, float]]
+    central_system: typing.Dict[str, typing.Dict[str, float]]
+
+    @property
+    def rate(self) -> float:
+        """Calls completed per second, by both ends."""
+        summaries = itertools.chain(self.charge_points.values(), self.central_system.values())
+        return sum(summary['rate'] for summary in summaries)
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        config = dataclasses.asdict(self.config)
+        config['protocol'] = self.config.protocol.name
+        return {
+            'config': config,
+            'duration': self.duration,
+            'rate': self.rate,
+            'charge_points': self.charge_points,
+            'central_system': self.central_system,
+        }
+
+
+###########
+# Transport
+
+class _QueueConnection:
+    """One end of an in-process connection."""
+
+    def __init__(self, incoming: asyncio.Queue, outgoing: asyncio.Queue):
+        self._incoming = incoming
+        self._outgoing = outgoing
+
+    async def send(self, frame: str) -> None:
+        await self._outgoing.put(frame)
+
+    async def recv(self) -> typing.Optional[str]:
+        """Returns the next frame, or None once the connection is closed."""
+        return await self._incoming.get()
+
+    async def close(self) -> None:
+        await self._outgoing.put(None)
+        await self._incoming.put(None)
+
+
+def _queue_pair() -> typing.Tuple[_QueueConnection, _QueueConnection]:
+    client_to_server: asyncio.Queue = asyncio.Queue()
+    server_to_client: asyncio.Queue = asyncio.Queue()
+    return _QueueConnection(server_to_client, client_to_server), _QueueConnection(client_to_server, server_to_client)
+
+
+class _WebsocketConnection:
+    """A websocket, with the interface of '_QueueConnection'."""
+
+    def __init__(self, websocket):
+        self._websocket = websocket
+
+    async def send(self, frame: str) -> None:
+        try:
+            await self._websocket.send(frame)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def recv(self) -> typing.Optional[str]:
+        try:
+            return await self._websocket.recv()
+        except websockets.ConnectionClosed:
+            return None
+
+    async def close(self) -> None:
+        await self._websocket.close()
+
+
+_Connection = typing.Union[_QueueConnection, _WebsocketConnection]
+
+
+##########
+# Messages
+
+class _Endpoint:
+    """Shared behaviour of charge points and the central system: sending Calls and answering them."""
+
+    def __init__(self, name: str, config: FleetConfig, payloads: '_Payloads', stats: Stats, seed: int):
+        self.name = name
+        self.config = config
+        self.payloads = payloads
+        self.stats = stats
+        self.random = random.Random(seed)
+        self._unique_ids = itertools.count()
+        self._pending: typing.Dict[str, typing.Tuple[str, asyncio.Future]] = {}
+
+    async def call(self, connection, action: str) -> None:
+        """Sends a Call and waits for its response, recording its latency."""
+        unique_id = f'{self.name}-{next(self._unique_ids)}'
+        future = asyncio.get_event_loop().create_future()
+        self._pending[unique_id] = (action, future)
+        start = time.perf_counter()
+        message = structure.Call(uniqueId=unique_id, action=action, payload=self.payloads.request(action, self.random))
+        await connection.send(json.dumps(serializer.serialize(message)))
+        try:
+            succeeded = await asyncio.wait_for(future, self.config.timeout)
+        except asyncio.TimeoutError:
+            succeeded = False
+        finally:
+            self._pending.pop(unique_id, None)
+        self.stats.record(action, time.perf_counter() - start if succeeded else None)
+
+    async def receive(self, connection) -> None:
+        """Answers Calls and resolves responses received on a connection, until it's closed."""
+        while True:
+            frame = await connection.recv()
+            if frame is None:
+                break
+            raw_data = json.loads(frame)
+            # Responses are parsed knowing the action of their Call
+            action, future = (None, None) if raw_data[0] == 2 else self._pending.get(raw_data[1], (None, None))
+            try:
+                message = serializer.parse(raw_data, action, protocol=self.config.protocol)
+            except exceptions.OCPPException as exc:
+                if future is not None:
+                    future.set_result(False)
+                elif raw_data[0] == 2:
+                    await connection.send(json.dumps(serializer.serialize(exc.as_call_error)))
+                continue
+
+            if isinstance(message, structure.Call):
+                response = structure.CallResult(
+                    uniqueId=message.uniqueId, payload=self.payloads.response(message.action, self.random),
+                )
+                await connection.send(json.dumps(serializer.serialize(response)))
+            elif future is not None and not future.done():
+                future.set_result(isinstance(message, structure.CallResult))
+
+        # Calls still waiting for a response won't get any
+        for _, future in self._pending.values():
+            if not future.done():
+                future.set_result(False)
+
+    async def sleep(self, interval: float, deadline: float) -> None:
+        # Exponentially distributed waits, so that a fleet's Calls aren't synchronized
+        wait = self.random.expovariate(1 / interval) if interval else 0
+        await asyncio.sleep(max(0, min(wait, deadline - asyncio.get_event_loop().time())))
+
+
+class _Payloads:
+    """Parsed payloads of every action, generated once and reused by every message."""
+
+    def __init__(self, protocol: compat.OcppJsonProtocol, seed: int):
+        frame_generator = generator.Generator(protocol, seed=seed)
+        # Payloads of each action
+        self._requests: typing.Dict[str, typing.List[typing.Any]] = {}
+        self._responses: typing.Dict[str, typing.List[typing.Any]] = {}
+        for action_name, action in compat.get_implemented_messages(protocol).items():
+            for pool, payload_dataclass in (
+                (self._requests, compat.get_request_payload_dataclass(action)),
+                (self._responses, compat.get_response_payload_dataclass(action)),
+            ):
+                pool[action_name] = [
+                    serializer.parse_data(payload_dataclass, frame_generator.payload(payload_dataclass))
+                    for _ in range(_POOL_SIZE)
+                ]
+
+    def request(self, action: str, random_generator: random.Random):
+        return random_generator.choice(self._requests[action])
+
+    def response(self, action: str, random_generator: random.Random):
+        return random_generator.choice(self._responses[action])
+
+
+async def _run_charge_point(charge_point: _Endpoint, connection, deadline: float) -> None:
+    loop = asyncio.get_event_loop()
+    config = charge_point.config
+    choices = list(config.mix)
+    weights = list(itertools.accumulate(config.mix[choice] for choice in choices))
+
+    receiver = asyncio.ensure_future(charge_point.receive(connection))
+    # Stagger boots over the first interval
+    await asyncio.sleep(charge_point.random.uniform(0, min(config.interval, config.duration)))
+    await charge_point.call(connection, 'BootNotification')
+    while loop.time() < deadline:
+        choice = charge_point.random.choices(choices, cum_weights=weights)[0]
+        for action in TRANSACTIONS[config.protocol] if choice == 'transaction' else (choice,):
+            await charge_point.call(connection, action)
+        await charge_point.sleep(config.interval, deadline)
+    await connection.close()
+    await receiver
+
+
+async def _serve_charge_point(central_system: _Endpoint, connection, deadline: float) -> None:
+    loop = asyncio.get_event_loop()
+    config = central_system.config
+    receiver = asyncio.ensure_future(central_system.receive(connection))
+    if config.server_interval:
+        await central_system.sleep(config.server_interval, deadline)
+        while loop.time() < deadline and not receiver.done():
+            await central_system.call(connection, central_system.random.choice(SERVER_ACTIONS[config.protocol]))
+            await central_system.sleep(config.server_interval, deadline)
+    await receiver
+
+
+async def run_fleet(config: FleetConfig) -> Report:
+    """Runs a simulation, returning its report once every charge point is done."""
+    payloads = _Payloads(config.protocol, config.seed)
+    charge_point_stats, central_system_stats = Stats(), Stats()
+    central_system = _Endpoint('CS', config, payloads, central_system_stats, config.seed)
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    deadline = start + config.duration
+    tasks = []
+
+    server = None
+    if config.transport == 'websocket':
+        if websockets is None:
+            raise ImportError("websockets is required to use the websocket transport, install ocpp-codec[loadgen]")
+
+        async def handler(websocket, *args):
+            await _serve_charge_point(central_system, _WebsocketConnection(websocket), deadline)
+
+        subprotocol = _SUBPROTOCOLS[config.protocol]
+        server = await websockets.serve(handler, '127.0.0.1', 0, subprotocols=[subprotocol], max_queue=None)
+        port = server.sockets[0].getsockname()[1]
+
+    try:
+        for index in range(config.charge_points):
+            name = f'CP{index:06d}'
+            charge_point = _Endpoint(name, config, payloads, charge_point_stats, config.seed + index + 1)
+            client_connection: _Connection
+            if server is None:
+                client_connection, server_connection = _queue_pair()
+                tasks.append(_serve_charge_point(central_system, server_connection, deadline))
+            else:
+                websocket = await websockets.connect(
+                    f'ws://127.0.0.1:{port}/{name}', subprotocols=[subprotocol], max_queue=None,
+                )
+                client_connection = _WebsocketConnection(websocket)
+            tasks.append(_run_charge_point(charge_point, client_connection, deadline))
+        await asyncio.gather(*tasks)
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+    duration = loop.time() - start
+    return Report(
+        config, duration, charge_point_stats.summary(duration), central_system_stats.summary(duration),
+    )
+
+
+def run(config: FleetConfig) -> Report:
+    """Runs a simulation in a new event loop, see 'run_fleet'."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(run_fleet(config))
+    finally:
+        loop.close()
+
+
+def _format_report(report: Report) -> str:
+    lines = [
+        f"{report.config.charge_points} charge points, {report.config.protocol.name}, {report.config.transport} "
+        f"transport, {report.duration:.1f}s: {report.rate:.0f} calls/s",
+    ]
+    for title, summary in (('Charge points', report.charge_points), ('Central system', report.central_system)):
+        lines.append('')
+        lines.append(
+            f"{title:<28} {'calls':>8} {'errors':>7} {'calls/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'max ms':>8}"
+        )
+        for action, measures in summary.items():
+            latencies = ' '.join(f"{measures.get(key, float('nan')):>8.2f}" for key in ('p50', 'p95', 'p99', 'max'))
+            lines.append(
+                f"{action:<28} {measures['calls']:>8} {measures['errors']:>7} {measures['rate']:>9.1f} {latencies}"
+            )
+    return '\n'.join(lines)
+
+
+def _parse_mix(value: str) -> typing.Dict[str, float]:
+    try:
+        return {name.strip(): float(weight) for name, weight in (item.split('=') for item in value.split(','))}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid message mix '{value}', expected 'Action=weight,...'")
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m ocpp_codec.loadgen', description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--protocol', choices=[protocol.name for protocol in compat.OcppJsonProtocol], default='v16',
+        help="protocol spoken by the fleet (default: v16)",
+    )
+    parser.add_argument('--charge-points', type=int, default=100, help="number of charge points (default: 100)")
+    parser.add_argument('--duration', type=float, default=10.0, help="duration in seconds (default: 10)")
+    parser.add_argument(
+        '--interval', type=float, default=1.0, help="average seconds between Calls of a charge point (default: 1)",
+    )
+    default_mix = ','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items())
+    parser.add_argument(
+        '--mix', type=_parse_mix, default=dict(DEFAULT_MIX),
+        help=f"weights of Calls sent by charge points, as 'Action=weight,...' (default: {default_mix})",
+    )
+    parser.add_argument(
+        '--server-interval', type=float, default=10.0,
+        help="average seconds between Calls of the central system to a charge point, 0 disables them (default: 10)",
+    )
+    parser.add_argument('--transport', choices=TRANSPORTS, default='queue', help="(default: queue)")
+    parser.add_argument('--timeout', type=float, default=10.0, help="seconds to wait for responses (default: 10)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of payloads and timings (default: 0)")
+    parser.add_argument('--json', help="path of a file to write the report to, as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        config = FleetConfig(
+            protocol=compat.OcppJsonProtocol[args.protocol],
+            charge_points=args.charge_points,
+            duration=args.duration,
+            interval=args.interval,
+            mix=args.mix,
+            server_interval=args.server_interval,
+            transport=args.transport,
+            timeout=args.timeout,
+            seed=args.seed,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    report = run(config)
+    print(_format_report(report))
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(report.as_dict(), json_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Counters and histograms of parsed and serialized messages, aggregated from 'hooks' events.
+
+    registry = metrics.Registry()
+    registry.install()
+    ...
+    exposition = registry.to_prometheus()
+
+A registry counts:
+
+- frames, by action, message type, protocol and direction. Actions come from the network connection, those that aren't
+  implemented are all counted under the 'UNKNOWN_ACTION' label, so that peers can't create any number of series.
+- errors, by error code, failing field (when known), protocol and direction
+- the time spent parsing or serializing messages, by action and direction, in a histogram of 'DURATION_BUCKETS'
+- the size of frames decoded by 'serializer.loads' and encoded by 'serializer.dumps', by action and direction, in a
+  histogram of 'SIZE_BUCKETS'. 'serializer.parse' and 'serializer.serialize' don't see frames, only Python objects.
+
+Each thread accumulates its own values, without any lock, values of every thread are only summed when exporting them.
+Values of finished threads are kept.
+"""
+import bisect
+import threading
+import typing
+
+from ocpp_codec import compat
+from ocpp_codec import errors
+from ocpp_codec import hooks
+
+
+# Upper bounds of the duration histogram buckets, in seconds
+DURATION_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+)
+# Upper bounds of the frame size histogram buckets, in bytes
+SIZE_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536, 262144, 1048576)
+
+# Label of actions that aren't implemented by the protocol of the message
+UNKNOWN_ACTION = 'unknown'
+
+_KNOWN_ACTIONS = frozenset(
+    action for protocol in compat.OcppJsonProtocol for action in compat.get_implemented_messages(protocol)
+)
+_FRAME_LABELS = ('action', 'message_type', 'protocol', 'direction')
+_ERROR_LABELS = ('code', 'field', 'protocol', 'direction')
+_HISTOGRAM_LABELS = ('action', 'direction')
+
+
+class _Shard:
+    """Values accumulated by a single thread.
+
+    Histograms are lists holding the count of values in each bucket (the last one being +Inf), then their sum.
+    """
+    __slots__ = ('frames', 'errors', 'durations', 'sizes')
+
+    def __init__(self):
+        self.frames: typing.Dict[typing.Tuple[str, ...], int] = {}
+        self.errors: typing.Dict[typing.Tuple[str, ...], int] = {}
+        self.durations: typing.Dict[typing.Tuple[str, ...], typing.List[float]] = {}
+        self.sizes: typing.Dict[typing.Tuple[str, ...], typing.List[float]] = {}
+
+
+def _observe(histograms: typing.Dict, key: typing.Tuple[str, ...], buckets: typing.Sequence[float], value: float):
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = [0] * (len(buckets) + 2)
+    histogram[bisect.bisect_left(buckets, value)] += 1
+    histogram[-1] += value
+
+
+def _action_label(action: typing.Optional[str], protocol: typing.Optional[compat.OcppJsonProtocol]) -> str:
+    if action is None:
+        return ''
+    # Frames don't know their protocol
+    known_actions = compat.get_implemented_messages(protocol) if protocol is not None else _KNOWN_ACTIONS
+    return action if action in known_actions else UNKNOWN_ACTION
+
+
+def _format_bound(bound: float) -> str:
+    return repr(bound)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: typing.Dict[str, str]) -> str:
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class Registry:
+    """Aggregates events of 'hooks' into counters and histograms, see the module's documentation.
+
+    Attributes:
+        - duration_buckets: tuple of float, upper bounds of the duration histogram buckets, in seconds
+        - size_buckets: tuple of int, upper bounds of the frame size histogram buckets, in bytes
+    """
+
+    def __init__(
+        self,
+        *,
+        duration_buckets: typing.Sequence[float] = DURATION_BUCKETS,
+        size_buckets: typing.Sequence[int] = SIZE_BUCKETS,
+    ):
+        self.duration_buckets = tuple(sorted(duration_buckets))
+        self.size_buckets = tuple(sorted(size_buckets))
+        self._local = threading.local()
+        self._shards: typing.List[_Shard] = []
+        # Only taken when a thread records its first event, and when exporting values
+        self._lock = threading.Lock()
+
+    def install(self) -> None:
+        """Starts recording events of 'hooks'."""
+        hooks.add(self.record)
+
+    def uninstall(self) -> None:
+        """Stops recording events of 'hooks'."""
+        hooks.remove(self.record)
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def record(self, event: hooks.Event) -> None:
+        """Records an event, only whole messages and frames are recorded."""
+        if event.stage is hooks.Stage.MESSAGE:
+            shard = self._shard()
+            action = _action_label(event.action, event.protocol)
+            protocol = event.protocol.name if event.protocol is not None else ''
+            direction = event.direction.value
+            key: typing.Tuple[str, ...] = (
+                action, event.message_type.name if event.message_type is not None else '', protocol, direction,
+            )
+            shard.frames[key] = shard.frames.get(key, 0) + 1
+            elapsed_ns: int = event.elapsed_ns  # type: ignore # Callbacks get events once their stage is done
+            _observe(shard.durations, (action, direction), self.duration_buckets, elapsed_ns / 1000000000)
+
+            # Parsing errors are wrapped in an 'OCPPException'
+            error = getattr(event.error, 'ocpp_error', event.error)
+            if isinstance(error, errors.BaseOCPPError):
+                key = (error.code.value, str(error.details.get('field', '')), protocol, direction)
+                shard.errors[key] = shard.errors.get(key, 0) + 1
+        elif event.stage is hooks.Stage.FRAME and event.size is not None:
+            key = (_action_label(event.action, event.protocol), event.direction.value)
+            _observe(self._shard().sizes, key, self.size_buckets, event.size)
+
+    def reset(self) -> None:
+        """Drops every recorded value."""
+        with self._lock:
+            for shard in self._shards:
+                for attribute in _Shard.__slots__:
+                    getattr(shard, attribute).clear()
+
+    def _merge(self, attribute: str) -> typing.Dict[typing.Tuple[str, ...], typing.Any]:
+        merged: typing.Dict[typing.Tuple[str, ...], typing.Any] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # Copying a dict is atomic, other threads may keep recording meanwhile
+            for key, value in getattr(shard, attribute).copy().items():
+                if isinstance(value, list):
+                    current = merged.setdefault(key, [0] * len(value))
+                    merged[key] = [total + count for total, count in zip(current, value)]
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return dict(sorted(merged.items()))
+
+    def _histograms(self, attribute: str, buckets: typing.Sequence[float]) -> typing.List[typing.Dict[str, typing.Any]]:
+        histograms = []
+        for key, histogram in self._merge(attribute).items():
+            cumulative, counts = 0, {}
+            for bound, count in zip((*map(_format_bound, buckets), '+Inf'), histogram[:-1]):
+                cumulative += count
+                counts[bound] = cumulative
+            histograms.append({
+                **dict(zip(_HISTOGRAM_LABELS, key)), 'buckets': counts, 'count': cumulative, 'sum': histogram[-1],
+            })
+        return histograms
+
+    def snapshot(self) -> typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]]:
+        """Returns the recorded values, summed over every thread.
+
+        Returns:
+            dict, holding:
+                - frames: list of dicts, the labels and 'value' of each frame counter
+                - errors: list of dicts, the labels and 'value' of each error counter
+                - duration_seconds: list of dicts, the labels, cumulative 'buckets' counts by upper bound, 'count' and
+                                    'sum' of each duration histogram
+                - frame_bytes: list of dicts, same as 'duration_seconds', for frame size histograms
+        """
+        return {
+            'frames': [
+                {**dict(zip(_FRAME_LABELS, key)), 'value': value} for key, value in self._merge('frames').items()
+            ],
+            'errors': [
+                {**dict(zip(_ERROR_LABELS, key)), 'value': value} for key, value in self._merge('errors').items()
+            ],
+            'duration_seconds': self._histograms('durations', self.duration_buckets),
+            'frame_bytes': self._histograms('sizes', self.size_buckets),
+        }
+
+    def to_prometheus(self, prefix: str = 'ocpp_codec') -> str:
+        """Returns the recorded values in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, help_text in (
+            ('frames', "Messages parsed or serialized."),
+            ('errors', "Errors raised while parsing or serializing messages."),
+        ):
+            lines.extend([f'# HELP {prefix}_{name}_total {help_text}', f'# TYPE {prefix}_{name}_total counter'])
+            for counter in snapshot[name]:
+                labels = {label: value for label, value in counter.items() if label != 'value'}
+                lines.append(f"{prefix}_{name}_total{{{_format_labels(labels)}}} {counter['value']}")
+
+        for name, help_text in (
+            ('duration_seconds', "Time spent parsing or serializing messages."),
+            ('frame_bytes', "Size of decoded or encoded frames."),
+        ):
+            lines.extend([f'# HELP {prefix}_{name} {help_text}', f'# TYPE {prefix}_{name} histogram'])
+            for histogram in snapshot[name]:
+                labels = {label: histogram[label] for label in _HISTOGRAM_LABELS}
+                for bound, count in histogram['buckets'].items():
+                    lines.append(f"{prefix}_{name}_bucket{{{_format_labels({**labels, 'le': bound})}}} {count}")
+                lines.append(f"{prefix}_{name}_sum{{{_format_labels(labels)}}} {histogram['sum']}")
+                lines.append(f"{prefix}_{name}_count{{{_format_labels(labels)}}} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
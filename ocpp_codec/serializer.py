@@ -5,14 +5,18 @@ import dataclasses
 from dataclasses import fields
 from dataclasses import is_dataclass
 import functools
+import json
 import logging
 import sys
+from types import MappingProxyType
 import typing
 
+from ocpp_codec import cache as cache_module
 from ocpp_codec import compat
 from ocpp_codec import encoders
 from ocpp_codec import errors
 from ocpp_codec import exceptions
+from ocpp_codec import hooks
 from ocpp_codec import structure
 from ocpp_codec import types
 from ocpp_codec import validators
@@ -35,6 +39,9 @@ def _required_fields(dataclass_class) -> typing.List[dataclasses.Field]:
 
 
 def _clean_data(field: dataclasses.Field, data: typing.Any, *, parsing: bool) -> typing.Any:
+    if hooks.enabled:
+        return _clean_data_measured(field, data, parsing=parsing)
+
     # Fetch the validators to run
     validator_list = field.metadata.get('validators', [])
 
@@ -61,6 +68,31 @@ def _clean_data(field: dataclasses.Field, data: typing.Any, *, parsing: bool) ->
     return cleaned_data
 
 
+def _callable_name(func) -> str:
+    if isinstance(func, functools.partial):
+        return f"{func.func.__name__}({', '.join(map(repr, func.args))})"
+    return getattr(func, '__name__', type(func).__name__)
+
+
+def _clean_data_measured(field: dataclasses.Field, data: typing.Any, *, parsing: bool) -> typing.Any:
+    # Same as _clean_data, measuring each validator and the encoder for hooks
+    direction = hooks.Direction.INCOMING if parsing else hooks.Direction.OUTGOING
+    for validator in field.metadata.get('validators', []):
+        try:
+            with hooks.measure(hooks.Stage.VALIDATOR, direction, field=field.name, name=_callable_name(validator)):
+                validator(data)
+        except errors.BaseOCPPError as exc:
+            exc.details.setdefault('field', field.name)
+            raise exc
+
+    encoder = field.metadata.get('encoder')
+    if not encoder:
+        return data
+
+    with hooks.measure(hooks.Stage.ENCODER, direction, field=field.name, name=type(encoder).__name__):
+        return encoder.from_json(data) if parsing else encoder.to_json(data)
+
+
 # Both _is_list and _is_generic use some private API, beware. There exists a third-party library
 # https://github.com/ilevkivskyi/typing_inspect to inspect these types, but it uses just as much private API. Something
 # will most likely be added to the typing module at some point to handle this kind of manipulation, keep it simple for
@@ -76,6 +108,11 @@ def _is_generic(type_):
     return isinstance(type_, typing._GenericAlias)
 
 
+# Fields derived by '_unpack_field' and '_extract_base_type' only depend on the class definition, they're memoized so
+# that parsing and serializing don't copy fields over and over. The returned fields are shared, they must not be
+# modified.
+
+@functools.lru_cache(maxsize=None)
 def _unpack_field(field: dataclasses.Field) -> dataclasses.Field:
     """Extract the type contained inside the generic definition.
 
@@ -89,22 +126,165 @@ def _unpack_field(field: dataclasses.Field) -> dataclasses.Field:
     return new_field
 
 
+@functools.lru_cache(maxsize=None)
 def _extract_base_type(field: dataclasses.Field) -> dataclasses.Field:
     """Extract the real type out of a SimpleType instance.
 
     The returned field is a copy of the original, as the original resides in the class definition. Modifying it would be
-    destructive.
+    destructive. Metadata of the original field is merged into the SimpleType's field metadata.
 
     The SimpleType instance is expected to have only a single field.
     """
     new_field = copy.copy(fields(field.type)[0])
     new_field.name = field.name
+    if field.metadata:
+        new_field.metadata = MappingProxyType({**new_field.metadata, **field.metadata})
     return new_field
 
 
 #########
 # Parsing
 
+# Default maximum number of elements of list fields, a safeguard rather than a limit set by the specifications. Lists
+# either have their cardinality bounded by their field's validators (e.g.: 'ListCard4Field'), or are left unbounded
+# ('1..*') by the specifications, which expect the charge point to advertise its own limits through configuration keys
+# (e.g.: 'SendLocalListMaxLength' and 'ItemsPerMessageGetVariables'): raise it for charge points advertising more.
+DEFAULT_MAX_LIST_LENGTH = 1024
+
+
+@dataclasses.dataclass(frozen=True)
+class Limits:
+    """Resource limits enforced while parsing, rejecting oversized input before doing the work of parsing it.
+
+    Lists whose cardinality is bounded by the specification are limited by their field's validators (e.g.:
+    'ListCard4Field'), lists the specification leaves unbounded by 'max_list_length', unless overridden in
+    'list_lengths'. Any limit can be disabled
+    by setting it to None.
+
+    Attributes:
+        - max_frame_bytes: int, maximum size of a frame before decoding it, only known to 'loads'. Larger frames raise
+                           a 'FormationViolationError'.
+        - max_depth: int, maximum nesting depth of a frame, the frame's list itself being at depth 1. Deeper frames
+                     raise a 'FormationViolationError'.
+        - max_list_length: int, maximum number of elements of list fields, defaults to 'DEFAULT_MAX_LIST_LENGTH'. Longer
+                           lists raise an 'OccurenceConstraintViolationError'.
+        - list_lengths: dict, maximum number of elements of specific list fields, indexed by the dataclass then by the
+                        name of the field, overriding 'max_list_length'
+        - max_string_length: int, maximum length of string fields. Longer strings raise a
+                             'PropertyConstraintViolationError'.
+
+    OCPP v20 messages use the OCPP v20 equivalent of errors, see 'compat.get_protocol_error'.
+    """
+    max_frame_bytes: typing.Optional[int] = 1024 * 1024
+    max_depth: typing.Optional[int] = 32
+    max_list_length: typing.Optional[int] = DEFAULT_MAX_LIST_LENGTH
+    list_lengths: typing.Mapping[typing.Type, typing.Mapping[str, int]] = dataclasses.field(
+        default_factory=lambda: MappingProxyType({}),
+    )
+    max_string_length: typing.Optional[int] = 100000
+
+
+# Limits enforced unless others are set in 'ParseOptions'
+DEFAULT_LIMITS = Limits()
+
+
+def _check_depth(depth: int, limits: typing.Optional[Limits]) -> None:
+    if limits is not None and limits.max_depth is not None and depth > limits.max_depth:
+        raise errors.FormationViolationError("Message is nested too deeply", max_depth=limits.max_depth)
+
+
+def _check_raw_depth(raw_data: typing.Any, depth: int, limits: typing.Optional[Limits]) -> None:
+    # Checks the depth of raw data the parser doesn't walk itself, 'raw_data' being at 'depth' in the frame. Iterative,
+    # so that the check itself can't hit the recursion limit.
+    if limits is None or limits.max_depth is None:
+        return
+    containers = [(raw_data, depth)]
+    while containers:
+        container, depth = containers.pop()
+        if not isinstance(container, (dict, list)):
+            continue
+        _check_depth(depth, limits)
+        children = container.values() if isinstance(container, dict) else container
+        containers.extend((child, depth + 1) for child in children)
+
+
+def _check_list_length(parsed_class, field: dataclasses.Field, data: typing.List, limits: Limits) -> None:
+    max_length = limits.list_lengths.get(parsed_class, {}).get(field.name, limits.max_list_length)
+    if max_length is not None and len(data) > max_length:
+        raise errors.OccurenceConstraintViolationError(
+            f"Field '{field.name}' holds too many elements", max_length=max_length, actual_length=len(data),
+            field=field.name,
+        )
+
+
+def _check_string_length(field: dataclasses.Field, data: typing.Any, limits: Limits) -> None:
+    if limits.max_string_length is not None and isinstance(data, str) and len(data) > limits.max_string_length:
+        raise errors.PropertyConstraintViolationError(
+            "Input is too long", max_length=limits.max_string_length, actual_length=len(data), field=field.name,
+        )
+
+
+@dataclasses.dataclass
+class ParseOptions:
+    """Options altering how messages are parsed.
+
+    Attributes:
+        - field_parsers: dict, functions parsing specific fields instead of the default parsing logic, indexed by the
+                         dataclass then by the name of the field. They're called with the field, its raw value and the
+                         parse options, and must return the cleaned value or raise an appropriate 'BaseOCPPError'. They
+                         are responsible for enforcing 'limits' on the values they parse.
+        - intern_table: cache.InternTable, table interning the values of fields whose metadata sets 'intern' to True,
+                        so that parsed messages share a single object for equal values. Values aren't interned when
+                        None.
+        - flyweights: cache.LRUCache, cache of parsed nested ComplexType instances by raw content. Nested ComplexTypes
+                      are parsed into frozen instances (see 'types.frozen_variant') shared by every message holding
+                      the same raw content and parsed with the same limits, field parsers and intern table. Instances
+                      aren't shared when None.
+        - limits: Limits, resource limits enforced while parsing, disabled when None (default: DEFAULT_LIMITS)
+    """
+    field_parsers: typing.Mapping[typing.Type, typing.Mapping[str, typing.Callable[
+        [dataclasses.Field, typing.Any, typing.Optional['ParseOptions']], typing.Any,
+    ]]] = dataclasses.field(default_factory=dict)
+    intern_table: typing.Optional[cache_module.InternTable] = None
+    flyweights: typing.Optional[cache_module.LRUCache] = None
+    limits: typing.Optional[Limits] = DEFAULT_LIMITS
+
+
+def _canonical(data: typing.Any, depth: int, limits: typing.Optional[Limits]) -> typing.Hashable:
+    # Hashable representation of raw JSON data, keeping types apart as 1, 1.0 and True are equal but parse differently.
+    # 'data' is at 'depth' in the frame, and isn't parsed yet: its depth is checked along the way.
+    if isinstance(data, dict):
+        _check_depth(depth, limits)
+        return dict, tuple(sorted((key, _canonical(value, depth + 1, limits)) for key, value in data.items()))
+    if isinstance(data, list):
+        _check_depth(depth, limits)
+        return list, tuple(_canonical(value, depth + 1, limits) for value in data)
+    return type(data), data
+
+
+def _parse_nested_data(dataclass_class, data, options: typing.Optional[ParseOptions], into: str, depth: int):
+    if (
+        options is None or options.flyweights is None or into != 'dataclass'
+        or not issubclass(dataclass_class, types.ComplexType)
+    ):
+        return _parse_data(dataclass_class, data, options, into, depth)
+    flyweights = options.flyweights
+
+    # Instances depend on the options they're parsed with, as a cache may be shared by several options. Options aren't
+    # hashable, the key holds their identity, and entries reference them so that their identities can't be reused.
+    scope = (options.limits, options.field_parsers, options.intern_table)
+    try:
+        key = (dataclass_class, *map(id, scope), _canonical(data, depth, options.limits))
+        entry = flyweights.get(key)
+    except TypeError:  # Unhashable or unorderable data, let parse_data reject it
+        return _parse_data(dataclass_class, data, options, into, depth)
+
+    if entry is None:
+        entry = scope, _parse_data(types.frozen_variant(dataclass_class), data, options, into, depth)
+        flyweights.put(key, entry)
+    return entry[1]
+
+
 def parse_field(field: dataclasses.Field, data: typing.Any) -> typing.Any:
     """Tries to fit a JSON object into a dataclass field.
 
@@ -134,26 +314,17 @@ def parse_field(field: dataclasses.Field, data: typing.Any) -> typing.Any:
     return _clean_data(field, data, parsing=True)
 
 
-def parse_data(dataclass_class, data):
-    """Tries to match every elements from a dict into a dataclass' fields.
-
-    The 'data' dict shall at least contain the fields required by the dataclass, or an error will be raised.
+def check_fields(dataclass_class, data: typing.Mapping) -> None:
+    """Makes sure a dict provides every required field of a dataclass, and no unknown field.
 
     Args:
         - dataclass_class: dataclasses.dataclass, the dataclass to match the data against
-        - data: dict, the data to fit into the dataclass, keys must match the dataclass' fields names
-
-    Returns:
-        dataclass, an instance of 'dataclass_class' populated with the data found in 'data'
+        - data: dict, the data to check, keys must match the dataclass' fields names
 
     Raises:
         - errors.ProtocolError
-        - errors.TypeConstraintViolationError
-        - errors.PropertyConstraintViolationError
     """
-    dataclass_fields = fields(dataclass_class)
-
-    if len(data) > len(dataclass_fields):
+    if len(data) > len(fields(dataclass_class)):
         logger.warning(
             "Data has more fields than expected. Got: '%s' for message '%s'",
             ', '.join(data.keys()),
@@ -175,37 +346,105 @@ def parse_data(dataclass_class, data):
             required_fields=sorted(req_fields_names), provided_fields=sorted(provided_fields_names),
         )
 
+
+# Types 'parse_data' and 'parse' can build out of the parsed data
+_PARSE_INTO = ('dataclass', 'dict')
+
+
+def parse_data(dataclass_class, data, *, options: typing.Optional[ParseOptions] = None, into: str = 'dataclass'):
+    """Tries to match every elements from a dict into a dataclass' fields.
+
+    The 'data' dict shall at least contain the fields required by the dataclass, or an error will be raised.
+
+    When 'into' is 'dict', the same checks, validators and encoders are run, but the cleaned data is returned as plain
+    dicts instead of dataclass instances, nested complex types included. Optional fields left undefined are omitted.
+
+    Args:
+        - dataclass_class: dataclasses.dataclass, the dataclass to match the data against
+        - data: dict, the data to fit into the dataclass, keys must match the dataclass' fields names
+        - options: ParseOptions, options altering how data is parsed (default: None)
+        - into: str, either 'dataclass' or 'dict', the type of the returned object (default: 'dataclass')
+
+    Returns:
+        dataclass or dict, an instance of 'dataclass_class' populated with the data found in 'data', or the cleaned
+        data itself
+
+    Raises:
+        - errors.ProtocolError
+        - errors.TypeConstraintViolationError
+        - errors.PropertyConstraintViolationError
+        - ValueError: raised when 'into' isn't supported
+    """
+    if into not in _PARSE_INTO:
+        raise ValueError(f"Can't parse into '{into}', expected one of {', '.join(_PARSE_INTO)}")
+    return _parse_data(dataclass_class, data, options, into, 1)
+
+
+def _parse_data(dataclass_class, data, options: typing.Optional[ParseOptions], into: str, depth: int):
+    # Same as parse_data, 'data' being at 'depth' in the frame. Depth is checked while walking the frame, rather than
+    # upfront, as the parser goes through every container anyway.
+    limits = options.limits if options else DEFAULT_LIMITS
+    _check_depth(depth, limits)
+
+    check_fields(dataclass_class, data)
+    # Frozen variants are parsed like the dataclass they derive from
+    parsed_class = getattr(dataclass_class, '_variant_of', dataclass_class)
+    field_parsers = options.field_parsers.get(parsed_class) if options else None
+    intern_table = options.intern_table if options else None
+
     # Match every piece of data against the dataclass fields
     cleaned_data = {}
-    for field in dataclass_fields:
+    for field in fields(dataclass_class):
         # Skip optional undefined or non-provided fields
         if _is_optional(field) and (field.name not in data or _is_undefined(field, data[field.name])):
             continue
 
+        data_item = data[field.name]
+        # Reject oversized lists before any work is done on their elements
+        if limits is not None and _is_list(field.type) and isinstance(data_item, list):
+            _check_list_length(parsed_class, field, data_item, limits)
+
+        if field_parsers and field.name in field_parsers:
+            _check_raw_depth(data_item, depth + 1, limits)
+            cleaned_data[field.name] = field_parsers[field.name](field, data_item, options)
+            continue
+
         # Simple types wrap a base Python types, get it. Generics cannot be used with issubclass and would crash, we
         # must be careful
         if not _is_generic(field.type) and issubclass(field.type, types.SimpleType):
             field = _extract_base_type(field)
 
-        data_item = data[field.name]
         if is_dataclass(field.type):
-            cleaned_data[field.name] = parse_data(field.type, data_item)
+            cleaned_data[field.name] = _parse_nested_data(field.type, data_item, options, into, depth + 1)
         elif _is_list(field.type):
             if not isinstance(data_item, list):
                 raise errors.TypeConstraintViolationError(
                     f"Field '{field.name}' is not a list (type is {type(data_item).__name__}",
                 )
+            _check_depth(depth + 1, limits)
             # Run validators and encoder on the list attribute itself, before iterating over its elements
             data_item = _clean_data(field, data_item, parsing=True)
             # Parse the list's elements
             field = _unpack_field(field)
             if is_dataclass(field.type):
-                parse_func = functools.partial(parse_data, field.type)
+                parse_func = functools.partial(
+                    _parse_nested_data, field.type, options=options, into=into, depth=depth + 2,
+                )
             else:
+                if limits is not None:
+                    for element in data_item:
+                        _check_string_length(field, element, limits)
                 parse_func = functools.partial(parse_field, field)
             cleaned_data[field.name] = [parse_func(element) for element in data_item]
         else:
+            if limits is not None:
+                _check_string_length(field, data_item, limits)
             cleaned_data[field.name] = parse_field(field, data_item)
+            if intern_table is not None and field.metadata.get('intern'):
+                cleaned_data[field.name] = intern_table.intern(cleaned_data[field.name])
+
+    if into == 'dict':
+        return cleaned_data
 
     if issubclass(dataclass_class, structure.OCPPMessage):
         # OCPPMessage subclasses already know their messageTypeId and will not accept it as a kwarg.
@@ -224,7 +463,12 @@ _MSGTYPEID_TO_DATACLASS = {
 _DEFAULT_CALLERROR_UNIQUEID = "-1"
 
 
-def parse_structure(raw_data: typing.Any, *, protocol: compat.OcppJsonProtocol) -> structure.OCPPMessage:
+def parse_structure(
+    raw_data: typing.Any,
+    *,
+    protocol: compat.OcppJsonProtocol,
+    options: typing.Optional[ParseOptions] = None,
+) -> structure.OCPPMessage:
     """Tries to parse the general structure of an OCPP message, without parsing its payload.
 
     This is the first step required to parse an OCPP message: determine whether it's a Call, CallResult or CallError
@@ -234,6 +478,7 @@ def parse_structure(raw_data: typing.Any, *, protocol: compat.OcppJsonProtocol)
         - raw_data: object, Python representation of an OCPPMessage, using only simple types
         - protocol: OcppJsonProtocol, which version of the OCPP Json protocol are we using (mostly defines which error
                     codes to use)
+        - options: ParseOptions, options altering how the message is parsed, only its limits are used (default: None)
 
     Returns:
         OCPPMessage, a type-checked dataclass instance, using more complex types as defined by the OCPP specification
@@ -248,6 +493,8 @@ def parse_structure(raw_data: typing.Any, *, protocol: compat.OcppJsonProtocol)
             _DEFAULT_CALLERROR_UNIQUEID,
         )
 
+    limits = options.limits if options else DEFAULT_LIMITS
+
     msg_type_id = raw_data[0]
     if msg_type_id not in _MSGTYPEID_TO_DATACLASS:
         raise exceptions.OCPPException(
@@ -275,34 +522,72 @@ def parse_structure(raw_data: typing.Any, *, protocol: compat.OcppJsonProtocol)
         ocpp_dict['payload'] = {}
 
     try:
-        ocpp_msg = parse_data(msgtype_dataclass, ocpp_dict)
+        ocpp_msg = _parse_data(msgtype_dataclass, ocpp_dict, ParseOptions(limits=limits), 'dataclass', 1)
+        # Payloads are parsed, and their depth checked, by 'parse', CallError details aren't parsed any further
+        if msgtype_dataclass is structure.CallError:
+            _check_raw_depth(ocpp_msg.errorDetails, 2, limits)
     except errors.BaseOCPPError as exc:
-        raise exceptions.OCPPException(exc, _DEFAULT_CALLERROR_UNIQUEID)
+        raise exceptions.OCPPException(compat.get_protocol_error(exc, protocol), _DEFAULT_CALLERROR_UNIQUEID)
 
     return ocpp_msg
 
 
 def parse(
-    raw_data: typing.Any, call_result_action_name: typing.Optional[str] = None, *, protocol: compat.OcppJsonProtocol
+    raw_data: typing.Any,
+    call_result_action_name: typing.Optional[str] = None,
+    *,
+    protocol: compat.OcppJsonProtocol,
+    options: typing.Optional[ParseOptions] = None,
+    into: str = 'dataclass',
 ) -> structure.OCPPMessage:
     """Fits 'raw_data' based on Python simple types into an 'OCPPMessage' dataclass.
 
+    With 'into' set to 'dict', the payload of Call and CallResult messages is parsed into a plain dict instead of the
+    action's dataclass, see 'parse_data'. Such messages can be serialized back with 'serialize'.
+
     Args:
         - raw_data: object, Python representation of an OCPPMessage, using only simple types
         - call_result_action_name: str, name of the 'Action' class to use to parse 'CallResult' payloads, only useful
           when parsing such a message, it's ignored otherwise (default: None)
         - protocol: OcppJsonProtocol, which version of the OCPP Json protocol are we using (mostly defines which error
                     codes to use)
+        - options: ParseOptions, options altering how the payload is parsed (default: None)
+        - into: str, either 'dataclass' or 'dict', the type of the parsed payload (default: 'dataclass')
 
     Returns:
         OCPPMessage, a type-checked dataclass instance, using more complex types as defined by the OCPP specification
 
     Raises:
         exceptions.OCPPException: raised when the OCPP message contains an error, can be converted a CallError message
-        ValueError: raised when call_result_action_name isn't provided but we're parsing a CallResult message
+        ValueError: raised when call_result_action_name isn't provided but we're parsing a CallResult message, or when
+                    'into' isn't supported
     """
+    if into not in _PARSE_INTO:
+        raise ValueError(f"Can't parse into '{into}', expected one of {', '.join(_PARSE_INTO)}")
+
+    # Don't even build the message's event when no hook would get it
+    if not hooks.enabled:
+        return _parse(raw_data, call_result_action_name, protocol, options, into, None)
+    with hooks.measure(hooks.Stage.MESSAGE, hooks.Direction.INCOMING, protocol=protocol) as message_event:
+        return _parse(raw_data, call_result_action_name, protocol, options, into, message_event)
+
+
+def _parse(
+    raw_data: typing.Any,
+    call_result_action_name: typing.Optional[str],
+    protocol: compat.OcppJsonProtocol,
+    options: typing.Optional[ParseOptions],
+    into: str,
+    message_event: typing.Optional[hooks.Event],
+) -> structure.OCPPMessage:
     # First, parse the global message structure (Call, CallResult, CallError)
-    ocpp_msg = parse_structure(raw_data, protocol=protocol)
+    with hooks.measure(hooks.Stage.ENVELOPE, hooks.Direction.INCOMING) as event:
+        ocpp_msg = parse_structure(raw_data, protocol=protocol, options=options)
+        if message_event is not None:
+            event.action = message_event.action = getattr(ocpp_msg, 'action', call_result_action_name)
+    if message_event is not None:
+        message_event.message_type = ocpp_msg.messageTypeId
+        message_event.unique_id = ocpp_msg.uniqueId
 
     # Then, extra parsing required for messages with a payload (i.e.: CALL and CALLRESULT)
     if ocpp_msg.messageTypeId in (structure.MessageTypeEnum.CALL, structure.MessageTypeEnum.CALLRESULT):
@@ -330,14 +615,81 @@ def parse(
             payload_dataclass = compat.get_response_payload_dataclass(action_dataclass)
 
         try:
-            ocpp_msg.payload = parse_data(payload_dataclass, ocpp_msg.payload)
+            with hooks.measure(hooks.Stage.PAYLOAD, hooks.Direction.INCOMING, action=action_name):
+                # The payload is at depth 2 in the frame
+                ocpp_msg.payload = _parse_data(payload_dataclass, ocpp_msg.payload, options, into, 2)
         except errors.BaseOCPPError as exc:
             # Convert to an exception that can be used to form a CallError message
-            raise exceptions.OCPPException(exc, ocpp_msg.uniqueId) from exc
+            raise exceptions.OCPPException(compat.get_protocol_error(exc, protocol), ocpp_msg.uniqueId) from exc
 
     return ocpp_msg
 
 
+def loads(
+    data: typing.Union[str, bytes],
+    call_result_action_name: typing.Optional[str] = None,
+    *,
+    protocol: compat.OcppJsonProtocol,
+    options: typing.Optional[ParseOptions] = None,
+    into: str = 'dataclass',
+) -> structure.OCPPMessage:
+    """Decodes then parses an OCPP-JSON frame, as received from the network connection.
+
+    The frame's size is checked against 'Limits.max_frame_bytes' before it's decoded. Its size is given to hooks as
+    the number of characters of str frames, and bytes of bytes frames.
+
+    Args:
+        - data: str or bytes, the OCPP-JSON frame
+        - call_result_action_name: str, see 'parse' (default: None)
+        - protocol: OcppJsonProtocol, see 'parse'
+        - options: ParseOptions, see 'parse' (default: None)
+        - into: str, see 'parse' (default: 'dataclass')
+
+    Returns:
+        OCPPMessage, see 'parse'
+
+    Raises:
+        exceptions.OCPPException: raised when the frame is too large, isn't valid JSON, or when 'parse' raises it
+        ValueError: see 'parse'
+    """
+    if into not in _PARSE_INTO:
+        raise ValueError(f"Can't parse into '{into}', expected one of {', '.join(_PARSE_INTO)}")
+
+    if not hooks.enabled:
+        return _parse(_decode(data, protocol, options), call_result_action_name, protocol, options, into, None)
+    with hooks.measure(hooks.Stage.FRAME, hooks.Direction.INCOMING, size=len(data)) as event:
+        # Decoding is part of the message, so that frames rejected before parsing are reported like invalid messages
+        with hooks.measure(hooks.Stage.MESSAGE, hooks.Direction.INCOMING, protocol=protocol) as message_event:
+            message = _parse(
+                _decode(data, protocol, options), call_result_action_name, protocol, options, into, message_event,
+            )
+        event.action = message_event.action
+    return message
+
+
+def _decode(data: typing.Union[str, bytes], protocol: compat.OcppJsonProtocol, options: typing.Optional[ParseOptions]):
+    limits = options.limits if options else DEFAULT_LIMITS
+    max_frame_bytes = limits.max_frame_bytes if limits is not None else None
+    if max_frame_bytes is not None:
+        # A str holds at most as many characters as its UTF-8 encoding holds bytes, only encode frames that may fit
+        if len(data) > max_frame_bytes or (isinstance(data, str) and len(data.encode('utf-8')) > max_frame_bytes):
+            error = errors.FormationViolationError(
+                "Message is too large", max_frame_bytes=max_frame_bytes, actual_frame_bytes=len(data),
+            )
+            raise exceptions.OCPPException(compat.get_protocol_error(error, protocol), _DEFAULT_CALLERROR_UNIQUEID)
+
+    try:
+        return json.loads(data)
+    except RecursionError:
+        error = errors.FormationViolationError("Message is nested too deeply")
+        raise exceptions.OCPPException(compat.get_protocol_error(error, protocol), _DEFAULT_CALLERROR_UNIQUEID)
+    except ValueError as exc:
+        raise exceptions.OCPPException(
+            compat.get_rpc_framework_error(f"Message isn't valid JSON: {exc}", protocol=protocol),
+            _DEFAULT_CALLERROR_UNIQUEID,
+        )
+
+
 #############
 # Serializing
 
@@ -378,7 +730,11 @@ def serialize_field(field: dataclasses.Field, data: typing.Any) -> typing.Any:
     return cleaned_data
 
 
-def serialize_fields(message):
+# Marks optional fields left undefined in the serialized fields of tracked messages
+_UNDEFINED_FIELD = object()
+
+
+def serialize_fields(message, *, cache: typing.Optional[cache_module.LRUCache] = None):
     """Serializes a whole OCPP 'Action.req' or 'Action.conf' based on the dataclass fields.
 
     Basically serializes every field in order, and return a dict of it all. Can be seen as an equivalent to
@@ -386,8 +742,16 @@ def serialize_fields(message):
 
     Recursively serializes nested dataclasses.
 
+    Tracked messages and nested types (see 'types.tracked_variant') only serialize again the fields reassigned since the
+    last call.
+
+    When a cache is provided, frozen messages and nested types (see 'types.frozen_variant') are looked up in the cache
+    before being serialized, and stored in it afterwards. The cache holds JSON encoded dicts, shared caches never hand
+    out the same dict twice, callers may modify it.
+
     Args:
         - message: 'Action.req' or 'Action.conf', the message to serialize
+        - cache: cache.LRUCache, cache of serialized frozen messages (default: None)
 
     Returns:
         dict, an equivalent to the message, based only on JSON compatible types (string, integer, list, dict, etc.)
@@ -396,11 +760,29 @@ def serialize_fields(message):
         - errors.TypeConstraintViolationError
         - errors.PropertyConstraintViolationError
     """
+    cacheable = cache is not None and isinstance(message, types.FrozenType)
+    if cacheable:
+        cached = cache.get(message)  # type: ignore # mypy doesn't understand 'cacheable' implies a cache
+        if cached is not None:
+            return json.loads(cached)
+
+    # Tracked messages keep the serialized value of their fields until they're reassigned
+    serialized_fields = message._serialized_fields if isinstance(message, types.TrackedType) else None
+
     serialized_dict = {}
     for field in fields(message):
+        if serialized_fields is not None and field.name in serialized_fields:
+            serialized_value = serialized_fields[field.name]
+            if serialized_value is not _UNDEFINED_FIELD:
+                serialized_dict[field.name] = serialized_value
+            continue
+
         field_value = getattr(message, field.name)
 
         if _is_undefined(field, field_value) and _is_optional(field):
+            # An empty list could be filled in place, only remember fields set to None
+            if serialized_fields is not None and field_value is None:
+                serialized_fields[field.name] = _UNDEFINED_FIELD
             continue
         # This provides a more helpful error than letting the serializing code hit a None field value and yield a
         # cleaning error. However, this is highly unlikely we'll ever run into this case when using this module
@@ -416,38 +798,333 @@ def serialize_fields(message):
             # Serialize the list's elements
             field = _unpack_field(field)
             if issubclass(field.type, types.ComplexType):
-                serialize_func = serialize_fields
+                serialize_func = functools.partial(serialize_fields, cache=cache)
+            else:
+                serialize_func = functools.partial(serialize_field, field)
+            serialized_dict[field.name] = [serialize_func(element) for element in field_value]
+        elif issubclass(field.type, types.ComplexType):
+            serialized_dict[field.name] = serialize_fields(field_value, cache=cache)
+        else:
+            serialized_dict[field.name] = serialize_field(field, field_value)
+            # Only keep values that cannot be modified in place
+            if serialized_fields is not None:
+                serialized_fields[field.name] = serialized_dict[field.name]
+
+    if cacheable:
+        cache.put(message, json.dumps(serialized_dict))  # type: ignore # 'cacheable' implies a cache
+
+    return serialized_dict
+
+
+def _serialize_complex(dataclass_class, value: typing.Any) -> typing.Dict:
+    # Complex values held by a dict can be either dicts or dataclass instances
+    if isinstance(value, dict):
+        return serialize_data(dataclass_class, value)
+    return serialize_fields(value)
+
+
+def serialize_data(dataclass_class, data: typing.Mapping) -> typing.Dict:
+    """Serializes a dict against a dataclass' fields, e.g.: a payload parsed with 'into' set to 'dict'.
+
+    Equivalent to 'serialize_fields', without building a dataclass instance first. The dict must provide every
+    required field of the dataclass, and no unknown field. Nested complex types can be either dicts or dataclass
+    instances.
+
+    Args:
+        - dataclass_class: dataclasses.dataclass, the dataclass whose layout the dict must match
+        - data: dict, the data to serialize, keys must match the dataclass' fields names
+
+    Returns:
+        dict, an equivalent to the data, based only on JSON compatible types (string, integer, list, dict, etc.)
+
+    Raises:
+        - errors.ProtocolError
+        - errors.TypeConstraintViolationError
+        - errors.PropertyConstraintViolationError
+    """
+    if not isinstance(data, dict):
+        raise errors.TypeConstraintViolationError(
+            f"Item '{data}' is not a dict (type is '{type(data).__name__}')", item=data,
+        )
+    unknown_fields = data.keys() - {field.name for field in fields(dataclass_class)}
+    if unknown_fields:
+        raise errors.ProtocolError(
+            f"Unknown fields for '{dataclass_class.__name__}'", unknown_fields=sorted(unknown_fields),
+        )
+    check_fields(dataclass_class, data)
+
+    serialized_dict: typing.Dict[str, typing.Any] = {}
+    for field in fields(dataclass_class):
+        field_value = data.get(field.name)
+        if _is_undefined(field, field_value):
+            continue
+
+        if _is_list(field.type):
+            field_value = _clean_data(field, field_value, parsing=False)
+            field = _unpack_field(field)
+            if issubclass(field.type, types.ComplexType):
+                serialize_func = functools.partial(_serialize_complex, field.type)
             else:
                 serialize_func = functools.partial(serialize_field, field)
             serialized_dict[field.name] = [serialize_func(element) for element in field_value]
         elif issubclass(field.type, types.ComplexType):
-            serialized_dict[field.name] = serialize_fields(field_value)
+            serialized_dict[field.name] = _serialize_complex(field.type, field_value)
         else:
             serialized_dict[field.name] = serialize_field(field, field_value)
 
     return serialized_dict
 
 
-def serialize(message: typing.Union[structure.Call, structure.CallResult, structure.CallError]) -> typing.List:
+def serialize(
+    message: typing.Union[structure.Call, structure.CallResult, structure.CallError],
+    call_result_action_name: typing.Optional[str] = None,
+    *,
+    cache: typing.Optional[cache_module.LRUCache] = None,
+    protocol: typing.Optional[compat.OcppJsonProtocol] = None,
+) -> typing.List:
     """Serializes an 'OCPPMessage'.
 
+    'Call' and 'CallResult' messages with a frozen payload (see 'types.frozen_variant') memoize their JSON frame, so
+    that sending them again (e.g.: retrying a 'Call' with 'dumps') neither serializes nor encodes them again. Each call
+    returns new lists and dicts, decoded from the memoized frame. Reassigning any of the message's fields drops the
+    memoized frame.
+
+    The payload of 'Call' and 'CallResult' messages can also be a plain dict, e.g.: when parsed with 'into' set to
+    'dict'. It's then validated against the layout of the action's dataclass, found from 'protocol' and either
+    'Call.action' or 'call_result_action_name', see 'serialize_data'.
+
     Args:
         - message: 'OCPPMessage', the message to serialize
+        - call_result_action_name: str, name of the 'Action' class of 'CallResult' dict payloads, ignored otherwise
+                                   (default: None)
+        - cache: cache.LRUCache, cache of serialized frozen payloads, see 'serialize_fields' (default: None)
+        - protocol: OcppJsonProtocol, protocol of the action of dict payloads, ignored otherwise (default: None)
 
     Returns:
         list, an equivalent to the message, based only on JSON compatible types (string, integer, list, dict, etc.)
 
     Raises:
+        - errors.ProtocolError
         - errors.TypeConstraintViolationError
         - errors.PropertyConstraintViolationError
+        - ValueError: raised when the payload is a dict, and the action's dataclass can't be found
     """
+    return _measure_message(_serialize, message, call_result_action_name, cache, protocol)
+
+
+def _measure_message(serialize_func, message, call_result_action_name, cache, protocol):
+    # Runs '_serialize' or '_serialize_frame', measuring the message when hooks are installed
+    if not hooks.enabled:
+        return serialize_func(message, call_result_action_name, cache, protocol, None)
+    action_name = _get_action_name(message, call_result_action_name)
+    message_type = message.messageTypeId  # type: ignore # mypy can't infer the class attribute shadowing the field
+    with hooks.measure(
+        hooks.Stage.MESSAGE, hooks.Direction.OUTGOING, action=action_name, message_type=message_type,
+        unique_id=message.uniqueId, protocol=_get_protocol(message, protocol),
+    ):
+        return serialize_func(message, call_result_action_name, cache, protocol, action_name)
+
+
+def _serialize(
+    message: typing.Union[structure.Call, structure.CallResult, structure.CallError],
+    call_result_action_name: typing.Optional[str],
+    cache: typing.Optional[cache_module.LRUCache],
+    protocol: typing.Optional[compat.OcppJsonProtocol],
+    action_name: typing.Optional[str],
+) -> typing.List:
+    # Decode the memoized frame, so that callers never share the lists and dicts they get
+    memoized = getattr(message, '_serialized', None)
+    if memoized is not None:
+        return json.loads(memoized)
+
+    ocpp_msg = _serialize_message(message, call_result_action_name, cache, protocol, action_name)
+    if _is_memoizable(message):
+        message._serialized = json.dumps(ocpp_msg)
+    return ocpp_msg
+
+
+def _serialize_frame(
+    message: typing.Union[structure.Call, structure.CallResult, structure.CallError],
+    call_result_action_name: typing.Optional[str],
+    cache: typing.Optional[cache_module.LRUCache],
+    protocol: typing.Optional[compat.OcppJsonProtocol],
+    action_name: typing.Optional[str],
+) -> str:
+    # Same as '_serialize', encoding the message into a JSON frame
+    memoized = getattr(message, '_serialized', None)
+    if memoized is not None:
+        return memoized
+
+    frame = json.dumps(_serialize_message(message, call_result_action_name, cache, protocol, action_name))
+    if _is_memoizable(message):
+        message._serialized = frame
+    return frame
+
+
+def _is_memoizable(message: structure.OCPPMessage) -> bool:
+    # A mutable payload could be modified in place without the message knowing, only memoize frozen ones
+    return isinstance(getattr(message, 'payload', None), types.FrozenType)
+
+
+def _serialize_message(
+    message: typing.Union[structure.Call, structure.CallResult, structure.CallError],
+    call_result_action_name: typing.Optional[str],
+    cache: typing.Optional[cache_module.LRUCache],
+    protocol: typing.Optional[compat.OcppJsonProtocol],
+    action_name: typing.Optional[str],
+) -> typing.List:
     # Build the base of the message to serialize. Iterate over the dataclass' fields to get them in order, ignore
     # 'payload' field that needs to be serialized recursively
-    ocpp_msg = [
-        serialize_field(field, getattr(message, field.name))
-        for field in fields(message) if field.name != 'payload'
-    ]
-    if isinstance(message, (structure.Call, structure.CallResult)):
-        ocpp_msg.append(serialize_fields(message.payload))
-
+    with hooks.measure(hooks.Stage.ENVELOPE, hooks.Direction.OUTGOING, action=action_name):
+        ocpp_msg = [
+            serialize_field(field, getattr(message, field.name))
+            for field in fields(message) if field.name != 'payload'
+        ]
+    if isinstance(message, (structure.Call, structure.CallResult)) and isinstance(message.payload, dict):
+        payload_dataclass = _get_payload_dataclass(message, call_result_action_name, protocol)
+        with hooks.measure(hooks.Stage.PAYLOAD, hooks.Direction.OUTGOING, action=action_name):
+            ocpp_msg.append(serialize_data(payload_dataclass, message.payload))
+    elif isinstance(message, (structure.Call, structure.CallResult)):
+        with hooks.measure(hooks.Stage.PAYLOAD, hooks.Direction.OUTGOING, action=action_name):
+            ocpp_msg.append(serialize_fields(message.payload, cache=cache))
     return ocpp_msg
+
+
+def _get_protocol(message: structure.OCPPMessage, protocol: typing.Optional[compat.OcppJsonProtocol]):
+    action_class = getattr(getattr(message, 'payload', None), '_action_class', None)
+    if protocol is None and action_class is not None:
+        return compat.get_action_protocol(action_class)
+    return protocol
+
+
+def _get_action_name(message: structure.OCPPMessage, call_result_action_name: typing.Optional[str]):
+    if isinstance(message, structure.Call):
+        return message.action
+    if isinstance(message, structure.CallResult) and not call_result_action_name:
+        action_class = getattr(message.payload, '_action_class', None)
+        return action_class.__name__ if action_class is not None else None
+    return call_result_action_name
+
+
+def dumps(
+    message: typing.Union[structure.Call, structure.CallResult, structure.CallError],
+    call_result_action_name: typing.Optional[str] = None,
+    *,
+    cache: typing.Optional[cache_module.LRUCache] = None,
+    protocol: typing.Optional[compat.OcppJsonProtocol] = None,
+) -> str:
+    """Serializes an 'OCPPMessage' into an OCPP-JSON frame, ready to be sent on the network connection.
+
+    Args:
+        - message: 'OCPPMessage', the message to serialize
+        - call_result_action_name: str, see 'serialize' (default: None)
+        - cache: cache.LRUCache, see 'serialize' (default: None)
+        - protocol: OcppJsonProtocol, see 'serialize' (default: None)
+
+    Returns:
+        str, the JSON frame
+
+    Raises:
+        see 'serialize'
+    """
+    if not hooks.enabled:
+        return _serialize_frame(message, call_result_action_name, cache, protocol, None)
+    action_name = _get_action_name(message, call_result_action_name)
+    with hooks.measure(hooks.Stage.FRAME, hooks.Direction.OUTGOING, action=action_name) as event:
+        frame = _measure_message(_serialize_frame, message, call_result_action_name, cache, protocol)
+        event.size = len(frame)
+    return frame
+
+
+def _get_payload_dataclass(
+    message: typing.Union[structure.Call, structure.CallResult],
+    call_result_action_name: typing.Optional[str],
+    protocol: typing.Optional[compat.OcppJsonProtocol],
+):
+    is_call = isinstance(message, structure.Call)
+    action_name = message.action if isinstance(message, structure.Call) else call_result_action_name
+    if protocol is None or not action_name:
+        raise ValueError(
+            "'protocol', and 'call_result_action_name' for CallResult messages, must be provided to serialize dict "
+            "payloads"
+        )
+
+    try:
+        action_dataclass = compat.get_implemented_messages(protocol)[action_name]
+    except KeyError:
+        raise ValueError(f"Action '{action_name}' is not implemented") from None
+
+    if is_call:
+        return compat.get_request_payload_dataclass(action_dataclass)
+    return compat.get_response_payload_dataclass(action_dataclass)
+
+
+def serialize_broadcast(
+    action_payload,
+    unique_ids: typing.Iterable[str],
+    *,
+    binary: bool = False,
+) -> typing.Iterator[typing.Union[str, bytes]]:
+    """Serializes the same 'Action.req' payload into one 'Call' frame per destination.
+
+    The payload is validated, serialized and encoded into JSON only once, every yielded frame then only differs by its
+    'uniqueId'. Frames are the same as the ones 'dumps' would return.
+
+    'unique_ids' is consumed lazily, one element per yielded frame: providing a generator keeps memory usage bounded
+    regardless of the number of destinations.
+
+    Args:
+        - action_payload: 'Action.req', the message to send to every destination
+        - unique_ids: iterable of str, the uniqueId to use for each destination's 'Call' message
+        - binary: bool, whether to yield UTF-8 encoded bytes frames instead of str frames (default: False)
+
+    Returns:
+        iterator of str or bytes, the JSON frames of each destination's 'Call' message
+
+    Raises:
+        - errors.TypeConstraintViolationError
+        - errors.PropertyConstraintViolationError
+        - ValueError: raised when 'action_payload' isn't tied to any 'Action' class
+    """
+    if not hasattr(action_payload, '_action_class'):
+        raise ValueError(f"'{type(action_payload).__name__}' payload isn't tied to an 'Action' class")
+
+    # Serialize and encode everything but the uniqueId upfront, so that errors are raised before yielding the first
+    # frame. Frames are then built like 'json.dumps' builds them.
+    call_fields = {field.name: field for field in fields(structure.Call)}
+    action_name = action_payload._action_class.__name__
+    message_type_id = serialize_field(call_fields['messageTypeId'], structure.MessageTypeEnum.CALL)
+    action = serialize_field(call_fields['action'], action_name)
+    with hooks.measure(hooks.Stage.PAYLOAD, hooks.Direction.OUTGOING, action=action_name):
+        payload = serialize_fields(action_payload)
+    head = f'[{json.dumps(message_type_id)}, '
+    tail = f', {json.dumps(action)}, {json.dumps(payload)}]'
+
+    return _broadcast_frames(
+        head.encode('utf-8') if binary else head,
+        tail.encode('utf-8') if binary else tail,
+        unique_ids,
+        unique_id_field=call_fields['uniqueId'],
+        action_name=action_name,
+        protocol=compat.get_action_protocol(action_payload._action_class),
+    )
+
+
+def _broadcast_frames(head, tail, unique_ids, *, unique_id_field, action_name, protocol):
+    binary = isinstance(head, bytes)
+    for unique_id in unique_ids:
+        if not hooks.enabled:
+            encoded_unique_id = json.dumps(serialize_field(unique_id_field, unique_id))
+            yield head + (encoded_unique_id.encode('utf-8') if binary else encoded_unique_id) + tail
+            continue
+
+        # Measured as if each frame went through 'dumps'
+        with hooks.measure(hooks.Stage.FRAME, hooks.Direction.OUTGOING, action=action_name) as event:
+            with hooks.measure(
+                hooks.Stage.MESSAGE, hooks.Direction.OUTGOING, action=action_name,
+                message_type=structure.MessageTypeEnum.CALL, unique_id=unique_id, protocol=protocol,
+            ):
+                encoded_unique_id = json.dumps(serialize_field(unique_id_field, unique_id))
+                frame = head + (encoded_unique_id.encode('utf-8') if binary else encoded_unique_id) + tail
+            event.size = len(frame)
+        yield frame
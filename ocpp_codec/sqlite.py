@@ -0,0 +1,204 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Bulk persistence of parsed messages to SQLite.
+
+Each payload dataclass gets its own table, named after its protocol, action and direction, e.g.
+'v16_BootNotification_req' or 'v20_TransactionEvent_Request'. Tables have an 'id' primary key, a 'unique_id' column
+holding the message's unique id, and a column per field. Fields of nested complex types are flattened into
+'parent__child' columns, lists are stored in child tables named '<table>__<field>', with 'parent_id' and 'position'
+columns.
+
+Messages are buffered and written in 'executemany' batches, one transaction per batch:
+
+    with sqlite.SQLiteSink(sqlite3.connect('messages.db')) as sink:
+        sink.create_schema()
+        for message in messages:
+            sink.write(message)
+
+Ids are assigned by the sink, so that child rows can reference their parent without waiting for it to be inserted.
+A single sink should write to a given database at a time.
+"""
+import dataclasses
+import datetime
+import enum
+import json
+import sqlite3
+import typing
+
+from ocpp_codec import compat
+from ocpp_codec import serializer
+from ocpp_codec import structure
+from ocpp_codec import types
+
+
+_SQL_TYPES = {int: 'INTEGER', bool: 'INTEGER', float: 'REAL', str: 'TEXT'}
+
+
+def _to_sql(value: typing.Any) -> typing.Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _getter(getter: typing.Callable, name: str) -> typing.Callable:
+    def get(instance):
+        parent = getter(instance)
+        return None if parent is None else getattr(parent, name)
+    return get
+
+
+class _Table:
+    """Layout of a table storing a dataclass, and of its child tables."""
+
+    def __init__(self, name: str, dataclass_class, *, child: bool = False):
+        self.name = name
+        # Name, SQL type and getter of each column holding a field value
+        self.columns: typing.List[typing.Tuple[str, str, typing.Callable]] = []
+        # Child tables and the getter of the list they hold
+        self.children: typing.List[typing.Tuple['_Table', typing.Callable]] = []
+        self.child = child
+
+        if dataclasses.is_dataclass(dataclass_class):
+            self._add_fields(dataclass_class, '', lambda instance: instance)
+        else:
+            # List of non-dataclass values
+            self.columns.append(('value', _SQL_TYPES.get(dataclass_class, ''), lambda value: value))
+
+    def _add_fields(self, dataclass_class, prefix: str, getter: typing.Callable) -> None:
+        for field in dataclasses.fields(dataclass_class):
+            if not serializer._is_generic(field.type) and issubclass(field.type, types.SimpleType):
+                field = serializer._extract_base_type(field)
+
+            name = prefix + field.name
+            field_getter = _getter(getter, field.name)
+            if serializer._is_list(field.type):
+                element_type = serializer._unpack_field(field).type
+                if not serializer._is_generic(element_type) and issubclass(element_type, types.SimpleType):
+                    element_type = dataclasses.fields(element_type)[0].type
+                self.children.append((_Table(f'{self.name}__{name}', element_type, child=True), field_getter))
+            elif dataclasses.is_dataclass(field.type):
+                self._add_fields(field.type, name + '__', field_getter)
+            else:
+                self.columns.append((name, _SQL_TYPES.get(field.type, ''), field_getter))
+
+    def tables(self) -> typing.Iterator['_Table']:
+        yield self
+        for table, _ in self.children:
+            yield from table.tables()
+
+    def create_statement(self) -> str:
+        columns = ['id INTEGER PRIMARY KEY']
+        if self.child:
+            columns += ['parent_id INTEGER NOT NULL', 'position INTEGER NOT NULL']
+        else:
+            columns.append('unique_id TEXT NOT NULL')
+        columns += [f'"{name}" {sql_type}'.rstrip() for name, sql_type, _ in self.columns]
+        return f'CREATE TABLE IF NOT EXISTS "{self.name}" ({", ".join(columns)})'
+
+    def insert_statement(self) -> str:
+        names = ['id'] + (['parent_id', 'position'] if self.child else ['unique_id'])
+        names += [f'"{name}"' for name, _, _ in self.columns]
+        return f'INSERT INTO "{self.name}" ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})'
+
+
+def _build_tables() -> typing.Dict[typing.Type, _Table]:
+    tables = {}
+    for protocol in compat.OcppJsonProtocol:
+        for action_name, action_class in compat.get_implemented_messages(protocol).items():
+            for payload_class in (
+                compat.get_request_payload_dataclass(action_class),
+                compat.get_response_payload_dataclass(action_class),
+            ):
+                name = f'{protocol.name}_{action_name}_{payload_class.__name__}'
+                tables[payload_class] = _Table(name, payload_class)
+    return tables
+
+
+# Table of each payload dataclass of every implemented message
+_TABLES = _build_tables()
+# Insert statement of every table, including child tables, by table name
+_INSERT_STATEMENTS = {
+    table.name: table.insert_statement() for payload_table in _TABLES.values() for table in payload_table.tables()
+}
+
+
+class SQLiteSink:
+    """Writes parsed Call and CallResult messages to SQLite, in batches.
+
+    Attributes:
+        - batch_size: int, the number of buffered messages after which they're written to the database
+    """
+
+    def __init__(self, connection: sqlite3.Connection, *, batch_size: int = 1000):
+        self.connection = connection
+        self.batch_size = batch_size
+        self._pending_messages = 0
+        # Rows waiting to be inserted, by table name
+        self._rows: typing.Dict[str, typing.List[typing.Tuple]] = {}
+        # Last id assigned, by table name
+        self._last_ids: typing.Dict[str, int] = {}
+
+    def create_schema(self) -> None:
+        """Creates the tables of every implemented message, of every protocol version, if they don't exist yet."""
+        with self.connection:
+            for payload_table in _TABLES.values():
+                for table in payload_table.tables():
+                    self.connection.execute(table.create_statement())
+
+    def write(self, message: typing.Union[structure.Call, structure.CallResult]) -> None:
+        """Buffers a parsed message, writing buffered messages once 'batch_size' are buffered.
+
+        Raises:
+            - ValueError: raised when the message's payload isn't the dataclass of an implemented message
+        """
+        payload_class = type(message.payload)
+        table = _TABLES.get(getattr(payload_class, '_variant_of', payload_class))
+        if table is None:
+            raise ValueError(f"Can't write '{payload_class.__name__}' payloads, it's not an implemented message")
+
+        self._add_rows(table, message.payload, (message.uniqueId,))
+        self._pending_messages += 1
+        if self._pending_messages >= self.batch_size:
+            self.flush()
+
+    def _next_id(self, table: _Table) -> int:
+        try:
+            last_id = self._last_ids[table.name]
+        except KeyError:
+            row = self.connection.execute(f'SELECT MAX(id) FROM "{table.name}"').fetchone()
+            last_id = row[0] or 0
+        self._last_ids[table.name] = last_id + 1
+        return last_id + 1
+
+    def _add_rows(self, table: _Table, instance: typing.Any, extra_values: typing.Tuple) -> None:
+        row_id = self._next_id(table)
+        row = (row_id,) + extra_values + tuple(_to_sql(getter(instance)) for _, _, getter in table.columns)
+        self._rows.setdefault(table.name, []).append(row)
+
+        for child_table, getter in table.children:
+            for position, element in enumerate(getter(instance) or ()):
+                self._add_rows(child_table, element, (row_id, position))
+
+    def flush(self) -> None:
+        """Writes buffered messages to the database, in a single transaction."""
+        if not self._rows:
+            return
+
+        with self.connection:
+            for table_name, rows in self._rows.items():
+                self.connection.executemany(_INSERT_STATEMENTS[table_name], rows)
+        self._rows = {}
+        self._pending_messages = 0
+
+    def close(self) -> None:
+        """Writes buffered messages."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
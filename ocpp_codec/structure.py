@@ -3,13 +3,13 @@
 
 This module implements elements specified in OCPP 1.6 JSON specification, section 4.
 """
-from dataclasses import dataclass
 from dataclasses import field
 import enum
 
 from ocpp_codec import encoders
 from ocpp_codec import types
 from ocpp_codec import validators
+from ocpp_codec.utils import slotted_dataclass
 
 
 class MessageTypeEnum(enum.Enum):
@@ -18,26 +18,36 @@ class MessageTypeEnum(enum.Enum):
     CALLERROR = 4
 
 
-@dataclass
+@slotted_dataclass
 class MessageType(types.SimpleType):
     """Field type coercing an integer to a MessageTypeEnum."""
     value: int = field(metadata={'encoder': encoders.EnumEncoder(MessageTypeEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ErrorCode(types.SimpleType):
     """Field type coercing a string to a ErrorCodeEnum."""
     value: str = field(metadata={'encoder': encoders.EnumEncoder(types.ErrorCodeEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class OCPPMessage:
-    """Base class every OCPP message should inherit from."""
+    """Base class every OCPP message should inherit from.
+
+    Messages may memoize their JSON frame, see 'serializer.serialize'. Reassigning any field drops it.
+    """
+    __slots__ = ('_serialized',)
+
     messageTypeId: MessageType = field(init=False)  # Let subclasses define that field
     uniqueId: str = field(metadata={'validators': [validators.max_length_36]})
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name != '_serialized':
+            super().__setattr__('_serialized', None)
+
 
-@dataclass
+@slotted_dataclass
 class Call(OCPPMessage):
     """Representation of a Call message.
 
@@ -48,7 +58,7 @@ class Call(OCPPMessage):
     payload: dict
 
 
-@dataclass
+@slotted_dataclass
 class CallResult(OCPPMessage):
     """Representation of a CallResult message.
 
@@ -59,7 +69,7 @@ class CallResult(OCPPMessage):
     payload: dict
 
 
-@dataclass
+@slotted_dataclass
 class CallError(OCPPMessage):
     """Representation of a CallResult message."""
     messageTypeId = MessageTypeEnum.CALLERROR
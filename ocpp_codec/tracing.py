@@ -0,0 +1,229 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+"""Tracing spans around parsing and serializing messages, for distributed traces.
+
+Once a tracer is installed, every 'serializer.parse' and 'serializer.serialize' call (including through
+'serializer.loads' and 'serializer.dumps') opens a span, 'ocpp.parse' or 'ocpp.serialize', with a child span around
+the validation and encoding of the payload of Call and CallResult messages, 'ocpp.parse.payload' or
+'ocpp.serialize.payload'. Spans carry the attributes of 'ATTRIBUTES' known once their stage is done, and record the
+error raised, if any, along with its OCPP error code.
+
+Use OpenTelemetry, installed with the 'opentelemetry' extra (pip install ocpp-codec[opentelemetry]), with:
+
+    tracing.install(tracing.OpenTelemetryTracer(opentelemetry.trace.get_tracer(__name__)))
+
+Spans are opened through 'hooks', no span is created when no tracer is installed.
+"""
+import abc
+import contextlib
+import threading
+import time
+import typing
+
+try:
+    from opentelemetry.trace import Status
+    from opentelemetry.trace import StatusCode
+except ImportError:  # pragma: no cover
+    Status = StatusCode = None
+
+from ocpp_codec import errors
+from ocpp_codec import hooks
+
+
+# Attributes set on spans, and the 'hooks.Event' attribute they come from
+ATTRIBUTES = {
+    'ocpp.action': 'action',
+    'ocpp.unique_id': 'unique_id',
+    'ocpp.protocol': 'protocol',
+    'ocpp.message_type': 'message_type',
+}
+# Attribute holding the OCPP error code of failed spans
+ERROR_CODE_ATTRIBUTE = 'ocpp.error_code'
+
+_SPAN_NAMES = {
+    (hooks.Stage.MESSAGE, hooks.Direction.INCOMING): 'ocpp.parse',
+    (hooks.Stage.MESSAGE, hooks.Direction.OUTGOING): 'ocpp.serialize',
+    (hooks.Stage.PAYLOAD, hooks.Direction.INCOMING): 'ocpp.parse.payload',
+    (hooks.Stage.PAYLOAD, hooks.Direction.OUTGOING): 'ocpp.serialize.payload',
+}
+
+
+class Span(abc.ABC):
+    """A span opened by a 'Tracer'."""
+
+    @abc.abstractmethod
+    def set_attribute(self, key: str, value: typing.Union[str, int, float, bool]) -> None:
+        """Sets an attribute of the span."""
+
+    @abc.abstractmethod
+    def record_error(self, error: BaseException) -> None:
+        """Marks the span as failed because of an error."""
+
+
+class Tracer(abc.ABC):
+    """Opens spans, nested in the span currently opened, if any."""
+
+    @abc.abstractmethod
+    def start_span(self, name: str) -> typing.ContextManager[Span]:
+        """Returns a context manager opening a span, and closing it on exit."""
+
+
+############
+# In memory
+
+class InMemorySpan(Span):
+    """A span recorded by 'InMemoryTracer'.
+
+    Attributes:
+        - name: str, the name of the span
+        - parent: InMemorySpan, the span this one is nested in, if any
+        - attributes: dict, the attributes of the span
+        - error: Exception, the error recorded by the span, if any
+        - start_time: float, when the span was opened, from 'time.perf_counter'
+        - end_time: float, when the span was closed, from 'time.perf_counter', None while it's open
+    """
+
+    def __init__(self, name: str, parent: typing.Optional['InMemorySpan']):
+        self.name = name
+        self.parent = parent
+        self.attributes: typing.Dict[str, typing.Any] = {}
+        self.error: typing.Optional[BaseException] = None
+        self.start_time = time.perf_counter()
+        self.end_time: typing.Optional[float] = None
+
+    def __repr__(self):
+        return f'InMemorySpan({self.name!r}, {self.attributes!r})'
+
+    def set_attribute(self, key: str, value: typing.Union[str, int, float, bool]) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.error = error
+
+
+class InMemoryTracer(Tracer):
+    """Records spans in memory, e.g.: for tests.
+
+    Attributes:
+        - spans: list of InMemorySpan, closed spans, in the order they were closed
+    """
+
+    def __init__(self):
+        self.spans: typing.List[InMemorySpan] = []
+        # Spans currently opened by each thread, the last one being the innermost
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def start_span(self, name: str) -> typing.Iterator[InMemorySpan]:
+        opened = self._local.__dict__.setdefault('opened', [])
+        span = InMemorySpan(name, opened[-1] if opened else None)
+        opened.append(span)
+        try:
+            yield span
+        finally:
+            opened.pop()
+            span.end_time = time.perf_counter()
+            self.spans.append(span)
+
+    def clear(self) -> None:
+        """Drops recorded spans."""
+        self.spans = []
+
+
+###############
+# OpenTelemetry
+
+class _OpenTelemetrySpan(Span):
+
+    def __init__(self, span):
+        self._span = span
+
+    def set_attribute(self, key: str, value: typing.Union[str, int, float, bool]) -> None:
+        self._span.set_attribute(key, value)
+
+    def record_error(self, error: BaseException) -> None:
+        self._span.record_exception(error)
+        self._span.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+class OpenTelemetryTracer(Tracer):
+    """Opens spans with an OpenTelemetry tracer, as current spans, so that they're nested in the caller's span.
+
+    Args:
+        - tracer: opentelemetry.trace.Tracer, the tracer opening spans
+    """
+
+    def __init__(self, tracer):
+        if Status is None:
+            raise ImportError(
+                "opentelemetry-api is required to use OpenTelemetryTracer, install ocpp-codec[opentelemetry]",
+            )
+        self._tracer = tracer
+
+    @contextlib.contextmanager
+    def start_span(self, name: str) -> typing.Iterator[Span]:
+        # Errors are recorded by '_TracedStage', with their OCPP error code
+        with self._tracer.start_as_current_span(name, record_exception=False, set_status_on_exception=False) as span:
+            yield _OpenTelemetrySpan(span)
+
+
+##############
+# Installation
+
+def _attribute_value(value: typing.Any) -> typing.Any:
+    # Enums (protocol, message type) are exported by name
+    return getattr(value, 'name', value)
+
+
+class _TracedStage:
+    """Context manager opening a span around a stage measured by 'hooks'."""
+    __slots__ = ('_tracer', '_event', '_context', '_span')
+
+    def __init__(self, tracer: Tracer, event: hooks.Event):
+        self._tracer = tracer
+        self._event = event
+
+    def __enter__(self):
+        self._context = self._tracer.start_span(_SPAN_NAMES[self._event.stage, self._event.direction])
+        self._span = self._context.__enter__()
+        return self._span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Set attributes once the stage is done, e.g.: a Call's action is only known once its envelope is parsed
+        for key, event_attribute in ATTRIBUTES.items():
+            value = getattr(self._event, event_attribute)
+            if value is not None:
+                self._span.set_attribute(key, _attribute_value(value))
+        if exc_value is not None:
+            # Parsing errors are wrapped in an 'OCPPException'
+            error = getattr(exc_value, 'ocpp_error', exc_value)
+            if isinstance(error, errors.BaseOCPPError):
+                self._span.set_attribute(ERROR_CODE_ATTRIBUTE, error.code.value)
+            self._span.record_error(exc_value)
+        return self._context.__exit__(exc_type, exc_value, traceback)
+
+
+# Context manager of stages without spans, doing nothing
+_NOT_TRACED = contextlib.suppress()
+_installed: typing.Optional[typing.Callable[[hooks.Event], typing.ContextManager]] = None
+
+
+def install(tracer: Tracer) -> None:
+    """Opens spans with a tracer, replacing the tracer previously installed, if any."""
+    global _installed
+    uninstall()
+
+    def context(event: hooks.Event) -> typing.ContextManager:
+        if (event.stage, event.direction) not in _SPAN_NAMES:
+            return _NOT_TRACED
+        return _TracedStage(tracer, event)
+
+    hooks.add(context=context)
+    _installed = context
+
+
+def uninstall() -> None:
+    """Stops opening spans, if a tracer is installed."""
+    global _installed
+    if _installed is not None:
+        hooks.remove(context=_installed)
+        _installed = None
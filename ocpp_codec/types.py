@@ -1,6 +1,8 @@
 # Copyright (c) Polyconseil SAS. All rights reserved.
 """OCPP base typing elements common to all versions of the protocol."""
+import dataclasses
 import enum
+import typing
 
 from ocpp_codec import utils
 
@@ -13,6 +15,7 @@ class OCPPType:
     The type is used to check we received the correct type from the remote connection, and that the associated validator
     returned the correct type before sending back a message.
     """
+    __slots__ = ()
 
 
 class SimpleType(OCPPType):
@@ -34,6 +37,7 @@ class SimpleType(OCPPType):
 
         When used as part of another type, CiString20Type is expected to be a string of length 20.
     """
+    __slots__ = ()
 
 
 class ComplexType(OCPPType):
@@ -49,6 +53,172 @@ class ComplexType(OCPPType):
             parentIdTag: IdToken
             status: AuthorizationStatus
     """
+    __slots__ = ()
+
+
+class FrozenType:
+    """Mixin making a dataclass immutable and hashable once initialized.
+
+    Don't inherit from this class directly, use 'frozen_variant' to build the frozen variant of an existing dataclass.
+    Frozen variants are subclasses of the original dataclass, and instances of both compare equal when their fields do.
+
+    Nested dataclasses and lists given to a frozen variant are respectively converted to their frozen variant and to
+    tuples, so that the whole instance can be hashed.
+    """
+    __slots__ = ()
+    # Attributes of the variant's instances
+    _variant_slots = ('_frozen', '_hash')
+    # The dataclass this class is a variant of, set when building the variant
+    _variant_of: typing.Type
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)  # type: ignore # FrozenType is always mixed with a dataclass
+
+        for field in dataclasses.fields(self):
+            object.__setattr__(self, field.name, _freeze(getattr(self, field.name)))
+        object.__setattr__(self, '_frozen', True)
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise dataclasses.FrozenInstanceError(f"cannot assign to field '{name}'")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise dataclasses.FrozenInstanceError(f"cannot delete field '{name}'")
+
+    def __eq__(self, other):
+        if not isinstance(other, self._variant_of):
+            return NotImplemented
+        return _field_values(self) == tuple(_freeze(value) for value in _field_values(other))
+
+    def __hash__(self):
+        # Nested frozen instances are hashed every time their parent is, compute it only once
+        try:
+            return self._hash
+        except AttributeError:
+            object.__setattr__(self, '_hash', hash((self._variant_of, _field_values(self))))
+            return self._hash
+
+    def __reduce__(self):
+        # Variants can't be pickled by reference, rebuild them from the dataclass they're a variant of
+        return _new_variant_instance, (frozen_variant, self._variant_of), _field_dict(self)
+
+    def __setstate__(self, state):
+        # Used by 'pickle' and 'copy', bypassing '__setattr__'
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_frozen', True)
+
+
+class TrackedType:
+    """Mixin recording which fields of a dataclass were reassigned since it was last serialized.
+
+    Don't inherit from this class directly, use 'tracked_variant' to build the tracked variant of an existing dataclass.
+    Tracked variants are subclasses of the original dataclass.
+
+    'serializer.serialize_fields' keeps the serialized value of the fields of tracked instances, and only serializes
+    again the fields reassigned since. Nested types and lists are always serialized again as they may be modified in
+    place, but nested tracked instances reuse their own serialized fields.
+    """
+    __slots__ = ()
+    _variant_slots = ('_serialized_fields',)
+    _variant_of: typing.Type
+    _serialized_fields: typing.Dict[str, typing.Any]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)  # type: ignore # TrackedType is always mixed with a dataclass
+
+        # Serialized value of clean fields, filled by 'serializer.serialize_fields'
+        object.__setattr__(self, '_serialized_fields', {})
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+
+        serialized_fields = getattr(self, '_serialized_fields', None)
+        if serialized_fields:
+            serialized_fields.pop(name, None)
+
+    def __eq__(self, other):
+        if not isinstance(other, self._variant_of):
+            return NotImplemented
+        return _field_values(self) == _field_values(other)
+
+    def __reduce__(self):
+        # Serialized fields aren't kept, copies are serialized again
+        return _new_variant_instance, (tracked_variant, self._variant_of), _field_dict(self)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_serialized_fields', {})
+
+    @property
+    def dirty_fields(self) -> typing.FrozenSet[str]:
+        """Names of the fields that will be serialized again by the next 'serializer.serialize_fields' call."""
+        return frozenset(
+            field.name for field in dataclasses.fields(self) if field.name not in self._serialized_fields
+        )
+
+
+_FROZEN_VARIANTS: typing.Dict[typing.Type, typing.Type] = {}
+_TRACKED_VARIANTS: typing.Dict[typing.Type, typing.Type] = {}
+
+
+def frozen_variant(dataclass_class: typing.Type) -> typing.Type:
+    """Returns the frozen variant of 'dataclass_class', see 'FrozenType'.
+
+    The variant is only built once, subsequent calls return the same class.
+    """
+    return _build_variant(FrozenType, dataclass_class, _FROZEN_VARIANTS)
+
+
+def tracked_variant(dataclass_class: typing.Type) -> typing.Type:
+    """Returns the tracked variant of 'dataclass_class', see 'TrackedType'.
+
+    The variant is only built once, subsequent calls return the same class.
+    """
+    return _build_variant(TrackedType, dataclass_class, _TRACKED_VARIANTS)
+
+
+def _build_variant(mixin: typing.Type, dataclass_class: typing.Type, variants: typing.Dict) -> typing.Type:
+    if issubclass(dataclass_class, mixin):
+        return dataclass_class
+
+    try:
+        return variants[dataclass_class]
+    except KeyError:
+        variant = type(dataclass_class.__name__, (mixin, dataclass_class), {
+            '__module__': dataclass_class.__module__,
+            '__qualname__': dataclass_class.__qualname__,
+            '__doc__': dataclass_class.__doc__,
+            '_variant_of': dataclass_class,
+            '__slots__': mixin._variant_slots,
+        })
+        return variants.setdefault(dataclass_class, variant)
+
+
+def _new_variant_instance(build_variant: typing.Callable, dataclass_class: typing.Type) -> typing.Any:
+    # Uninitialized instance of a variant, whose fields are then set by '__setstate__'
+    variant = build_variant(dataclass_class)
+    return variant.__new__(variant)
+
+
+def _field_values(instance) -> typing.Tuple:
+    return tuple(getattr(instance, field.name) for field in dataclasses.fields(instance))
+
+
+def _field_dict(instance) -> typing.Dict[str, typing.Any]:
+    return {field.name: getattr(instance, field.name) for field in dataclasses.fields(instance)}
+
+
+def _freeze(value: typing.Any) -> typing.Any:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(element) for element in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, FrozenType):
+        return frozen_variant(type(value))(**{
+            field.name: getattr(value, field.name) for field in dataclasses.fields(value) if field.init
+        })
+    return value
 
 
 class ErrorCodeEnum(utils.AutoNameEnum):
@@ -75,3 +245,4 @@ class ErrorCodeEnum(utils.AutoNameEnum):
     FormatViolation = enum.auto()  # slight change in meaning from FormationViolation
     MessageTypeNotSupported = enum.auto()
     RpcFrameworkError = enum.auto()
+    OccurrenceConstraintViolation = enum.auto()  # fixed spelling of OccurenceConstraintViolation
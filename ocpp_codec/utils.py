@@ -1,5 +1,8 @@
 # Copyright (c) Polyconseil SAS. All rights reserved.
+import dataclasses
 import enum
+import types
+import typing
 
 
 class AutoNameEnum(enum.Enum):
@@ -17,3 +20,108 @@ class AutoNameEnum(enum.Enum):
     # pylint: disable=no-self-argument
     def _generate_next_value_(name, start, count, last_values):
         return name
+
+
+def _slotted_dataclass(cls=None, **kwargs):
+    """Drop-in replacement for 'dataclasses.dataclass' building classes that use '__slots__' instead of a '__dict__'.
+
+    This is what 'dataclass(slots=True)' does starting from Python 3.10. Instances are much more compact, which matters
+    when keeping a lot of parsed messages around. Only fields defined by the class itself become slots, inherited fields
+    use the slots of the parent class, which should be slotted too. '__slots__' may also be defined in the class body to
+    add slots for non-field attributes.
+
+    Example:
+
+        @slotted_dataclass
+        class IdTagInfo(ComplexType):
+            status: AuthorizationStatus
+    """
+    def wrap(cls):
+        return _add_slots(dataclasses.dataclass(cls, **kwargs))
+
+    return wrap if cls is None else wrap(cls)
+
+
+if typing.TYPE_CHECKING:
+    # mypy only knows the classes built by 'dataclasses.dataclass' are dataclasses, slots don't matter to type checking
+    from dataclasses import dataclass as slotted_dataclass
+else:
+    slotted_dataclass = _slotted_dataclass
+
+
+def _add_slots(cls):
+    cls_dict = dict(cls.__dict__)
+    declared_slots = tuple(cls_dict.pop('__slots__', ()))
+    inherited_slots = {slot for base in cls.__mro__[1:] for slot in getattr(base, '__slots__', ())}
+    own_fields = [
+        field.name for field in dataclasses.fields(cls)
+        if field.name in cls_dict.get('__annotations__', {}) and field.name not in inherited_slots
+    ]
+
+    # Keep instances weak-referenceable, unless a parent class already provides it
+    weakref_slot = () if any(hasattr(base, '__weakref__') for base in cls.__bases__) else ('__weakref__',)
+    cls_dict['__slots__'] = declared_slots + tuple(own_fields) + weakref_slot
+    # Field defaults are already handled by '__init__', class attributes would conflict with slots. Declared slots
+    # descriptors belong to the original class and must go as well.
+    for name in cls_dict['__slots__']:
+        cls_dict.pop(name, None)
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+    # The default state of slotted instances holds slots shadowed by class attributes, which can't be restored
+    cls_dict.setdefault('__getstate__', _getstate)
+    cls_dict.setdefault('__setstate__', _setstate)
+
+    slotted_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    slotted_cls.__qualname__ = cls.__qualname__
+
+    # Methods using 'super()' without arguments reference the original class through their '__class__' cell. Cells
+    # aren't writable before Python 3.7, rebuild these methods with a new cell instead.
+    for name, value in cls_dict.items():
+        if isinstance(value, types.FunctionType) and value.__closure__ and any(
+            _cell_contents(cell) is cls for cell in value.__closure__
+        ):
+            setattr(slotted_cls, name, _replace_closure(value, cls, slotted_cls))
+
+    return slotted_cls
+
+
+def _getstate(self) -> typing.Dict[str, typing.Any]:
+    cls = type(self)
+    state = {}
+    for klass in cls.__mro__:
+        for name in klass.__dict__.get('__slots__', ()):
+            # Skip slots shadowed by a class attribute (e.g.: 'messageTypeId' of messages), they can't be assigned
+            if isinstance(getattr(cls, name, None), types.MemberDescriptorType) and hasattr(self, name):
+                state[name] = getattr(self, name)
+    return state
+
+
+def _setstate(self, state: typing.Dict[str, typing.Any]) -> None:
+    for name, value in state.items():
+        object.__setattr__(self, name, value)
+
+
+_EMPTY_CELL = object()
+
+
+def _cell_contents(cell) -> typing.Any:
+    try:
+        return cell.cell_contents
+    except ValueError:  # Empty cell
+        return _EMPTY_CELL
+
+
+def _make_cell(value) -> typing.Any:
+    return (lambda: value).__closure__[0]  # type: ignore
+
+
+def _replace_closure(func: types.FunctionType, old, new) -> types.FunctionType:
+    closure = tuple(_make_cell(new) if _cell_contents(cell) is old else cell for cell in func.__closure__ or ())
+    new_func = types.FunctionType(func.__code__, func.__globals__, func.__name__, func.__defaults__, closure)
+    new_func.__kwdefaults__ = func.__kwdefaults__
+    new_func.__dict__.update(func.__dict__)
+    new_func.__qualname__ = func.__qualname__
+    new_func.__doc__ = func.__doc__
+    new_func.__module__ = func.__module__
+    new_func.__annotations__ = func.__annotations__
+    return new_func
@@ -6,11 +6,13 @@ This module implements elements specified in OCPP 1.6 specification, section 6.
 Attributes:
     - IMPLEMENTED: dict, a mapping from action name to action classes for every implemented OCPP actions.
 """
-from dataclasses import dataclass
+from dataclasses import field
 import inspect
 import sys
 import typing
 
+from ocpp_codec.utils import slotted_dataclass
+
 from . import types
 
 
@@ -37,40 +39,40 @@ class Action(metaclass=ActionMetaClass):
     system.
     """
 
-    @dataclass
+    @slotted_dataclass
     class req:
         """Base class representing the request part of the message."""
 
-    @dataclass
+    @slotted_dataclass
     class conf:
         """Base class representing the response part of the message."""
 
 
 class Authorize(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         idTag: types.IdToken
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         idTagInfo: types.IdTagInfo
 
 
 class BootNotification(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
-        chargePointModel: types.CiString20Type
-        chargePointVendor: types.CiString20Type
+        chargePointModel: types.CiString20Type = field(metadata={'intern': True})
+        chargePointVendor: types.CiString20Type = field(metadata={'intern': True})
 
         chargeBoxSerialNumber: types.CiString25Type = None
         chargePointSerialNumber: types.CiString25Type = None
-        firmwareVersion: types.CiString50Type = None
+        firmwareVersion: types.CiString50Type = field(default=None, metadata={'intern': True})
         iccid: types.CiString20Type = None
         imsi: types.CiString20Type = None
         meterSerialNumber: types.CiString25Type = None
-        meterType: types.CiString25Type = None
+        meterType: types.CiString25Type = field(default=None, metadata={'intern': True})
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         currentTime: types.DateTime
         interval: int
@@ -78,117 +80,117 @@ class BootNotification(Action):
 
 
 class ChangeAvailability(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         connectorId: types.PositiveInteger
         type: types.AvailabilityType
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         status: types.AvailabilityStatus
 
 
 class ChangeConfiguration(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         key: types.CiString50Type
         value: types.CiString500Type
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         status: types.ConfigurationStatus
 
 
 class DataTransfer(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         vendorId: types.CiString255Type
         messageId: types.CiString50Type = None
         data: str = None
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         status: types.DataTransferStatus
         data: str = None
 
 
 class DiagnosticsStatusNotification(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         status: types.DiagnosticsStatus
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         pass
 
 
 class FirmwareStatusNotification(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         status: types.FirmwareStatus
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         pass
 
 
 class GetLocalListVersion(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         pass
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         listVersion: int
 
 
 class Heartbeat(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         pass
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         currentTime: types.DateTime
 
 
 class MeterValues(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         connectorId: types.PositiveInteger
         meterValue: typing.List[types.MeterValue]
         transactionId: int = None
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         pass
 
 
 class RemoteStartTransaction(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         idTag: types.IdToken
 
         connectorId: types.PositiveIntegerNonNull = None
         chargingProfile: types.ChargingProfile = None
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         status: types.RemoteStartStopStatus
 
 
 class RemoteStopTransaction(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         transactionId: int
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         status: types.RemoteStartStopStatus
 
 
 class ReserveNow(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         connectorId: types.PositiveInteger
         expiryDate: types.DateTime
@@ -197,26 +199,26 @@ class ReserveNow(Action):
 
         parentIdTag: types.IdToken = None
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         status: types.ReservationStatus
 
 
 class SendLocalList(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         listVersion: types.PositiveInteger
         updateType: types.UpdateType
 
         localAuthorizationList: typing.List[types.AuthorizationData] = None
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         status: types.UpdateStatus
 
 
 class StartTransaction(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         connectorId: types.PositiveIntegerNonNull
         idTag: types.IdToken
@@ -225,14 +227,14 @@ class StartTransaction(Action):
 
         reservationId: int = None
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         idTagInfo: types.IdTagInfo
         transactionId: int
 
 
 class StatusNotification(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         connectorId: types.PositiveInteger
         errorCode: types.ChargePointErrorCode
@@ -243,13 +245,13 @@ class StatusNotification(Action):
         vendorId: types.CiString255Type = None
         vendorErrorCode: types.CiString50Type = None
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         pass
 
 
 class StopTransaction(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         meterStop: int
         timestamp: types.DateTime
@@ -259,17 +261,17 @@ class StopTransaction(Action):
         reason: types.Reason = None
         transactionData: typing.List[types.MeterValue] = None
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         idTagInfo: types.IdTagInfo = None
 
 
 class UnlockConnector(Action):
-    @dataclass
+    @slotted_dataclass
     class req(Action.req):
         connectorId: types.PositiveIntegerNonNull
 
-    @dataclass
+    @slotted_dataclass
     class conf(Action.conf):
         status: types.UnlockStatus
 
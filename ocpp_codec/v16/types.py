@@ -1,6 +1,5 @@
 # Copyright (c) Polyconseil SAS. All rights reserved.
 """OCPP types as defined in OCPP 1.6 specification, section 7."""
-from dataclasses import dataclass
 from dataclasses import field
 import enum
 import typing
@@ -9,6 +8,7 @@ from ocpp_codec import encoders
 from ocpp_codec import types
 from ocpp_codec import utils
 from ocpp_codec import validators
+from ocpp_codec.utils import slotted_dataclass
 
 
 # Enums
@@ -254,182 +254,182 @@ class ValueFormatEnum(utils.AutoNameEnum):
 # Simple types
 ##############
 
-@dataclass
+@slotted_dataclass
 class AuthorizationStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(AuthorizationStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class AvailabilityStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(AvailabilityStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class AvailabilityType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(AvailabilityTypeEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ConfigurationStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ConfigurationStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ChargePointErrorCode(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ChargePointErrorCodeEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ChargePointStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ChargePointStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ChargingProfileKindType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ChargingProfileKindTypeEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ChargingProfilePurposeType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ChargingProfilePurposeTypeEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ChargingRateUnitType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ChargingRateUnitTypeEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class CiString20Type(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_20]})
 
 
-@dataclass
+@slotted_dataclass
 class CiString25Type(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_25]})
 
 
-@dataclass
+@slotted_dataclass
 class CiString50Type(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_50]})
 
 
-@dataclass
+@slotted_dataclass
 class CiString255Type(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_255]})
 
 
-@dataclass
+@slotted_dataclass
 class CiString500Type(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_500]})
 
 
-@dataclass
+@slotted_dataclass
 class DataTransferStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(DataTransferStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class DiagnosticsStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(DiagnosticsStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class DateTime(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.DateTimeEncoder()})
 
 
-@dataclass
+@slotted_dataclass
 class Decimal(types.SimpleType):
     value: float = field(metadata={'validators': [validators.decimal_precision_1]})
 
 
-@dataclass
+@slotted_dataclass
 class FirmwareStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(FirmwareStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class IdToken(CiString20Type):
     """A simple renaming of CiString20Type."""
 
 
-@dataclass
+@slotted_dataclass
 class Location(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(LocationEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class Measurand(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(MeasurandEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class PositiveInteger(types.SimpleType):
     value: int = field(metadata={'validators': [validators.is_positive]})
 
 
-@dataclass
+@slotted_dataclass
 class PositiveIntegerNonNull(types.SimpleType):
     value: int = field(metadata={'validators': [validators.is_positive, validators.is_not_zero]})
 
 
-@dataclass
+@slotted_dataclass
 class Phase(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(PhaseEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ReadingContext(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ReadingContextEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class Reason(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ReasonEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class RecurrencyKindType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(RecurrencyKindTypeEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class RegistrationStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(RegistrationStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class RemoteStartStopStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(RemoteStartStopStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ReservationStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ReservationStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class UnitOfMeasure(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(UnitOfMeasureEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class UnlockStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(UnlockStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class UpdateStatus(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(UpdateStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class UpdateType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(UpdateTypeEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ValueFormat(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ValueFormatEnum)})
 
@@ -438,7 +438,7 @@ class ValueFormat(types.SimpleType):
 ###############
 
 
-@dataclass
+@slotted_dataclass
 class ChargingSchedulePeriod(types.ComplexType):
     startPeriod: int
     limit: Decimal
@@ -446,7 +446,7 @@ class ChargingSchedulePeriod(types.ComplexType):
     numberPhases: int = None
 
 
-@dataclass
+@slotted_dataclass
 class ChargingSchedule(types.ComplexType):
     chargingRateUnit: ChargingRateUnitType
     chargingSchedulePeriod: typing.List[ChargingSchedulePeriod]
@@ -456,7 +456,7 @@ class ChargingSchedule(types.ComplexType):
     minChargingRate: Decimal = None
 
 
-@dataclass
+@slotted_dataclass
 class ChargingProfile(types.ComplexType):
     chargingProfileId: int
     stackLevel: PositiveInteger
@@ -470,7 +470,7 @@ class ChargingProfile(types.ComplexType):
     validTo: DateTime = None
 
 
-@dataclass
+@slotted_dataclass
 class IdTagInfo(types.ComplexType):
     status: AuthorizationStatus
 
@@ -478,13 +478,13 @@ class IdTagInfo(types.ComplexType):
     parentIdTag: IdToken = None
 
 
-@dataclass
+@slotted_dataclass
 class AuthorizationData(types.ComplexType):
     idTag: IdToken
     idTagInfo: IdTagInfo = None
 
 
-@dataclass
+@slotted_dataclass
 class SampledValue(types.ComplexType):
     value: str
 
@@ -496,7 +496,20 @@ class SampledValue(types.ComplexType):
     unit: UnitOfMeasure = None
 
 
-@dataclass
+@slotted_dataclass
 class MeterValue(types.ComplexType):
     timestamp: DateTime
     sampledValue: typing.List[SampledValue]
+
+
+# Frozen complex types
+######################
+
+# Hashable variants of the complex types above, e.g. to be used as 'serializer.serialize_fields' cache keys.
+FrozenChargingSchedulePeriod = types.frozen_variant(ChargingSchedulePeriod)
+FrozenChargingSchedule = types.frozen_variant(ChargingSchedule)
+FrozenChargingProfile = types.frozen_variant(ChargingProfile)
+FrozenIdTagInfo = types.frozen_variant(IdTagInfo)
+FrozenAuthorizationData = types.frozen_variant(AuthorizationData)
+FrozenSampledValue = types.frozen_variant(SampledValue)
+FrozenMeterValue = types.frozen_variant(MeterValue)
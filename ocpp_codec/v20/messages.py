@@ -6,11 +6,12 @@ This module implements elements specified in OCPP 2.0 specification, section Mes
 Attributes:
     - IMPLEMENTED: dict, a mapping from action name to action classes for every implemented OCPP actions.
 """
-from dataclasses import dataclass
 import inspect
 import sys
 import typing
 
+from ocpp_codec.utils import slotted_dataclass
+
 from . import types
 
 
@@ -37,25 +38,25 @@ class Action(metaclass=ActionMetaClass):
     system.
     """
 
-    @dataclass
+    @slotted_dataclass
     class Request:
         """Base class representing the request part of the message."""
 
-    @dataclass
+    @slotted_dataclass
     class Response:
         """Base class representing the response part of the message."""
 
 
 
 class Authorize(Action):
-    @dataclass
+    @slotted_dataclass
     class Request:
         idToken: types.IdTokenType
 
         evseId: typing.List[int] = None
         certificateHashData: typing.List[types.OCSPRequestDataType] = types.ListCard4Field(default=None)
 
-    @dataclass
+    @slotted_dataclass
     class Response:
         idTokenInfo: types.IdTokenInfoType
 
@@ -64,12 +65,12 @@ class Authorize(Action):
 
 
 class BootNotification(Action):
-    @dataclass
+    @slotted_dataclass
     class Request:
         reason: types.BootReasonEnumType
         chargingStation: types.ChargingStationType
 
-    @dataclass
+    @slotted_dataclass
     class Response:
         currentTime: types.DateTime
         interval: int
@@ -77,61 +78,61 @@ class BootNotification(Action):
 
 
 class ChangeAvailability(Action):
-    @dataclass
+    @slotted_dataclass
     class Request:
         evseId: int
         operationalStatus: types.OperationalStatusEnumType
 
-    @dataclass
+    @slotted_dataclass
     class Response:
         status: types.ChangeAvailabilityStatusEnumType
 
 
 class GetVariables(Action):
-    @dataclass
+    @slotted_dataclass
     class Request:
         getVariableData: typing.List[types.GetVariableDataType]
 
-    @dataclass
+    @slotted_dataclass
     class Response:
         getVariableResult: typing.List[types.GetVariableResultType]
 
 
 class Heartbeat(Action):
-    @dataclass
+    @slotted_dataclass
     class Request:
         pass
 
-    @dataclass
+    @slotted_dataclass
     class Response:
         currentTime: types.DateTime
 
 
 class SetVariables(Action):
-    @dataclass
+    @slotted_dataclass
     class Request:
         setVariableData: typing.List[types.SetVariableDataType]
 
-    @dataclass
+    @slotted_dataclass
     class Response:
         setVariableResult: typing.List[types.SetVariableResultType]
 
 
 class StatusNotification(Action):
-    @dataclass
+    @slotted_dataclass
     class Request:
         timestamp: types.DateTime
         connectorStatus: types.ConnectorStatusEnumType
         evseId: int
         connectorId: int
 
-    @dataclass
+    @slotted_dataclass
     class Response:
         pass
 
 
 class TransactionEvent(Action):
-    @dataclass
+    @slotted_dataclass
     class Request:
         eventType: types.TransactionEventEnumType
         timestamp: types.DateTime
@@ -147,7 +148,7 @@ class TransactionEvent(Action):
         evse: types.EVSEType = None
         meterValue: typing.List[types.MeterValueType] = None
 
-    @dataclass
+    @slotted_dataclass
     class Response:
         pass
 
@@ -1,6 +1,5 @@
 # Copyright (c) Polyconseil SAS. All rights reserved.
 """OCPP types as defined in OCPP 2.0 specification, section Datatypes."""
-from dataclasses import dataclass
 from dataclasses import field
 import enum
 import functools
@@ -10,6 +9,7 @@ from ocpp_codec import encoders
 from ocpp_codec import types
 from ocpp_codec import utils
 from ocpp_codec import validators
+from ocpp_codec.utils import slotted_dataclass
 
 
 # Enums
@@ -260,58 +260,58 @@ class TriggerReasonEnum(utils.AutoNameEnum):
 # Commonly used primitive types aliases
 #######################################
 
-@dataclass
+@slotted_dataclass
 class _IdentifierString20(types.SimpleType):
     value: str = field(metadata={
         'validators': [validators.max_length_20, validators.is_identifier],
     })
 
 
-@dataclass
+@slotted_dataclass
 class _IdentifierString36(types.SimpleType):
     value: str = field(metadata={
         'validators': [validators.max_length_36, validators.is_identifier],
     })
 
 
-@dataclass
+@slotted_dataclass
 class _IdentifierString128(types.SimpleType):
     value: str = field(metadata={
         'validators': [validators.max_length_128, validators.is_identifier],
     })
 
 
-@dataclass
+@slotted_dataclass
 class _String8(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_8]})
 
 
-@dataclass
+@slotted_dataclass
 class _String20(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_20]})
 
 
-@dataclass
+@slotted_dataclass
 class _String50(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_50]})
 
 
-@dataclass
+@slotted_dataclass
 class _String128(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_128]})
 
 
-@dataclass
+@slotted_dataclass
 class _String512(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_512]})
 
 
-@dataclass
+@slotted_dataclass
 class _String1000(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_1000]})
 
 
-@dataclass
+@slotted_dataclass
 class _String2500(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_2500]})
 
@@ -335,132 +335,132 @@ ListCard4Field = functools.partial(field, metadata={'validators': [validators.ma
 # Simple types
 ##############
 
-@dataclass
+@slotted_dataclass
 class AuthorizationStatusEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(AuthorizationStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class AttributeEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(AttributeEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class BootReasonEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(BootReasonEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class CertificateStatusEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(CertificateStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ChangeAvailabilityStatusEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ChangeAvailabilityStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ChargingStateEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ChargingStateEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ConnectorStatusEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ConnectorStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class Decimal(types.SimpleType):
     value: float = field(metadata={'encoder': encoders.OutgoingMessageDecimalEncoder()})
 
 
-@dataclass
+@slotted_dataclass
 class DateTime(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.DateTimeEncoder()})
 
 
-@dataclass
+@slotted_dataclass
 class EncodingMethodEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(EncodingMethodEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class GetVariableStatusEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(GetVariableStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class HashAlgorithmEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(HashAlgorithmEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class IdTokenEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(IdTokenEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class LocationEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(LocationEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class MeasurandEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(MeasurandEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class MessageFormatEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(MessageFormatEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class OperationalStatusEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(OperationalStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class PhaseEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(PhaseEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ReadingContextEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ReadingContextEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class ReasonEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(ReasonEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class RegistrationStatusEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(RegistrationStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class SetVariableStatusEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(SetVariableStatusEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class SignatureMethodEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(SignatureMethodEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class TransactionEventEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(TransactionEventEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class TriggerReasonEnumType(types.SimpleType):
     value: str = field(metadata={'encoder': encoders.EnumEncoder(TriggerReasonEnum)})
 
 
-@dataclass
+@slotted_dataclass
 class UnitOfMeasureType(types.SimpleType):
     value: str = field(metadata={'validators': [validators.max_length_20]})
 
@@ -468,29 +468,29 @@ class UnitOfMeasureType(types.SimpleType):
 # Complex types
 ###############
 
-@dataclass
+@slotted_dataclass
 class ModemType(types.ComplexType):
     iccid: _IdentifierString20 = None
     imsi: _IdentifierString20 = None
 
 
-@dataclass
+@slotted_dataclass
 class ChargingStationType(types.ComplexType):
-    model: _String20
-    vendorName: _String50
+    model: _String20 = field(metadata={'intern': True})
+    vendorName: _String50 = field(metadata={'intern': True})
 
     serialNumber: _String20 = None
-    firmwareVersion: _String50 = None
+    firmwareVersion: _String50 = field(default=None, metadata={'intern': True})
     modem: ModemType = None
 
 
-@dataclass
+@slotted_dataclass
 class AdditionalInfoType(types.ComplexType):
     additionalIdToken: _IdentifierString36
     type_: _String50
 
 
-@dataclass
+@slotted_dataclass
 class IdTokenType(types.ComplexType):
     idToken: _IdentifierString36
     type_: IdTokenEnumType
@@ -498,13 +498,13 @@ class IdTokenType(types.ComplexType):
     additionalInfo: typing.List[AdditionalInfoType] = None
 
 
-@dataclass
+@slotted_dataclass
 class GroupIdTokenType(types.ComplexType):
     idToken: _IdentifierString36
     type_: IdTokenEnumType
 
 
-@dataclass
+@slotted_dataclass
 class MessageContentType(types.ComplexType):
     format_: MessageFormatEnumType
     content: _String512
@@ -512,7 +512,7 @@ class MessageContentType(types.ComplexType):
     language: _String8 = None
 
 
-@dataclass
+@slotted_dataclass
 class IdTokenInfoType(types.ComplexType):
     status: AuthorizationStatusEnumType
 
@@ -524,7 +524,7 @@ class IdTokenInfoType(types.ComplexType):
     personalMessage: MessageContentType = None
 
 
-@dataclass
+@slotted_dataclass
 class OCSPRequestDataType(types.ComplexType):
     hashAlgorithm: HashAlgorithmEnumType
     issuerNameHash: _IdentifierString128
@@ -534,29 +534,29 @@ class OCSPRequestDataType(types.ComplexType):
     responderUrl: _String512 = None
 
 
-@dataclass
+@slotted_dataclass
 class EVSEType(types.ComplexType):
     id: int
 
     connectorId: int = None
 
 
-@dataclass
+@slotted_dataclass
 class ComponentType(types.ComplexType):
-    name: _String50
+    name: _String50 = field(metadata={'intern': True})
 
     instance: _String50 = None
     evse: EVSEType = None
 
 
-@dataclass
+@slotted_dataclass
 class VariableType(types.ComplexType):
-    name: _String50
+    name: _String50 = field(metadata={'intern': True})
 
     instance: _String50 = None
 
 
-@dataclass
+@slotted_dataclass
 class GetVariableDataType(types.ComplexType):
     component: ComponentType
     variable: VariableType
@@ -564,7 +564,7 @@ class GetVariableDataType(types.ComplexType):
     attributeType: AttributeEnumType = None
 
 
-@dataclass
+@slotted_dataclass
 class GetVariableResultType(types.ComplexType):
     attributeStatus: GetVariableStatusEnumType
     component: ComponentType
@@ -574,7 +574,7 @@ class GetVariableResultType(types.ComplexType):
     attributeValue: _String1000 = None
 
 
-@dataclass
+@slotted_dataclass
 class SignedMeterValueType(types.ComplexType):
     meterValueSignature: _String2500
     signatureMethod: SignatureMethodEnumType
@@ -582,7 +582,7 @@ class SignedMeterValueType(types.ComplexType):
     encodedMeterValue: _String512
 
 
-@dataclass
+@slotted_dataclass
 class SampledValueType(types.ComplexType):
     value: Decimal
 
@@ -594,13 +594,13 @@ class SampledValueType(types.ComplexType):
     unitOfMeasure: UnitOfMeasureType = None
 
 
-@dataclass
+@slotted_dataclass
 class MeterValueType(types.ComplexType):
     timestamp: DateTime
     sampledValue: typing.List[SampledValueType]
 
 
-@dataclass
+@slotted_dataclass
 class SetVariableDataType(types.ComplexType):
     attributeValue: _String1000
     component: ComponentType
@@ -609,7 +609,7 @@ class SetVariableDataType(types.ComplexType):
     attributeType: AttributeEnumType = None
 
 
-@dataclass
+@slotted_dataclass
 class SetVariableResultType(types.ComplexType):
     attributeStatus: SetVariableStatusEnumType
     component: ComponentType
@@ -618,7 +618,7 @@ class SetVariableResultType(types.ComplexType):
     attributeType: AttributeEnumType = None
 
 
-@dataclass
+@slotted_dataclass
 class TransactionType(types.ComplexType):
     id: _IdentifierString36
 
@@ -626,3 +626,28 @@ class TransactionType(types.ComplexType):
     timeSpentCharging: int = None
     stoppedReason: ReasonEnumType = None
     remoteStartId: int = None
+
+
+# Frozen complex types
+######################
+
+# Hashable variants of the complex types above, e.g. to be used as 'serializer.serialize_fields' cache keys.
+FrozenModemType = types.frozen_variant(ModemType)
+FrozenChargingStationType = types.frozen_variant(ChargingStationType)
+FrozenAdditionalInfoType = types.frozen_variant(AdditionalInfoType)
+FrozenIdTokenType = types.frozen_variant(IdTokenType)
+FrozenGroupIdTokenType = types.frozen_variant(GroupIdTokenType)
+FrozenMessageContentType = types.frozen_variant(MessageContentType)
+FrozenIdTokenInfoType = types.frozen_variant(IdTokenInfoType)
+FrozenOCSPRequestDataType = types.frozen_variant(OCSPRequestDataType)
+FrozenEVSEType = types.frozen_variant(EVSEType)
+FrozenComponentType = types.frozen_variant(ComponentType)
+FrozenVariableType = types.frozen_variant(VariableType)
+FrozenGetVariableDataType = types.frozen_variant(GetVariableDataType)
+FrozenGetVariableResultType = types.frozen_variant(GetVariableResultType)
+FrozenSignedMeterValueType = types.frozen_variant(SignedMeterValueType)
+FrozenSampledValueType = types.frozen_variant(SampledValueType)
+FrozenMeterValueType = types.frozen_variant(MeterValueType)
+FrozenSetVariableDataType = types.frozen_variant(SetVariableDataType)
+FrozenSetVariableResultType = types.frozen_variant(SetVariableResultType)
+FrozenTransactionType = types.frozen_variant(TransactionType)
@@ -0,0 +1,38 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import json
+import time
+
+import pytest
+
+from ocpp_codec import exceptions
+from ocpp_codec import generator
+from ocpp_codec import serializer
+
+
+# CPU time any frame may cost to parse: a fixed overhead, plus a cost per byte of its JSON representation, up to a cap.
+# The costliest frames measured take under 2ms, or 30ns per byte: budgets are 3 to 5 times higher.
+TIME_BUDGET = 0.002
+TIME_BUDGET_PER_BYTE = 1e-7
+TIME_BUDGET_MAX = 0.01
+
+# Frames are scaled down to keep the test suite fast, parsing time is linear in their size
+SCALE = 0.1
+
+
+@pytest.mark.parametrize(
+    'adversarial_frame', list(generator.adversarial_frames(scale=SCALE)), ids=lambda frame: frame.name,
+)
+def test_parse_time_budget(adversarial_frame):
+    size = len(json.dumps(adversarial_frame.frame))
+
+    start = time.process_time()
+    try:
+        serializer.parse(
+            adversarial_frame.frame, adversarial_frame.call_result_action_name, protocol=adversarial_frame.protocol,
+        )
+    except exceptions.OCPPException:
+        pass
+    elapsed = time.process_time() - start
+
+    budget = min(TIME_BUDGET + size * TIME_BUDGET_PER_BYTE, TIME_BUDGET_MAX)
+    assert elapsed <= budget, f"Parsing {size} bytes took {elapsed:.4f}s, over its budget of {budget:.4f}s"
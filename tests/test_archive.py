@@ -0,0 +1,174 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import datetime
+import json
+
+import pytest
+
+from ocpp_codec import archive
+from ocpp_codec import compat
+from ocpp_codec import exceptions
+from ocpp_codec import structure
+
+
+START = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _write_traffic(path, count, **kwargs):
+    frames = []
+    with archive.ArchiveWriter(path, **kwargs) as writer:
+        for i in range(count):
+            call = json.dumps([2, f'uid-{i}', 'Heartbeat', {}])
+            result = [3, f'uid-{i}', {'currentTime': '2020-01-01T00:00:00Z'}]
+            writer.write(
+                call, charge_point_id=f'CP-{i % 3}', direction=archive.Direction.RECEIVED,
+                timestamp=START + datetime.timedelta(seconds=i),
+            )
+            writer.write(
+                result, charge_point_id=f'CP-{i % 3}', direction=archive.Direction.SENT,
+                timestamp=START + datetime.timedelta(seconds=i, milliseconds=10),
+            )
+            frames.extend([json.loads(call), result])
+    return frames
+
+
+def test_write_read(tmp_path):
+    path = tmp_path / 'traffic.ocpplog'
+    frames = _write_traffic(path, 100, block_size=512)
+
+    reader = archive.ArchiveReader(path)
+    records = list(reader)
+    assert [record.frame for record in records] == frames
+    assert records[3].charge_point_id == 'CP-1'
+    assert records[3].direction is archive.Direction.SENT
+    assert records[3].timestamp == START + datetime.timedelta(seconds=1, milliseconds=10)
+    # Records can be read block by block
+    assert len(reader.block_offsets) > 1
+    assert reader.read_block(records[-1].block_offset)[records[-1].index] == records[-1]
+
+    # Repeated strings are stored in the dictionary, unique ids and timestamps of the first frame aren't
+    assert {'Heartbeat', 'currentTime', 'CP-0', '2020-01-01T00:00:00Z'} <= set(reader.dictionary)
+    assert not any(string.startswith('uid-') for string in reader.dictionary)
+    reader.close()
+
+
+def test_append(tmp_path):
+    path = tmp_path / 'traffic.ocpplog'
+    frames = _write_traffic(path, 10)
+
+    with archive.ArchiveWriter(path) as writer:
+        writer.write('not json', charge_point_id='CP-0', direction=archive.Direction.RECEIVED, timestamp=START)
+        writer.write([2, 'uid', 'Heartbeat', {}], charge_point_id='CP-0', direction=archive.Direction.RECEIVED)
+
+    with archive.ArchiveReader(path) as reader:
+        assert [record.frame for record in reader] == frames + [b'not json', [2, 'uid', 'Heartbeat', {}]]
+        # The dictionary of the existing file was reused
+        assert reader.dictionary.count('Heartbeat') == 1
+
+
+def test_messages(tmp_path):
+    path = tmp_path / 'traffic.ocpplog'
+    _write_traffic(path, 3)
+    with archive.ArchiveWriter(path) as writer:
+        writer.write('not json', charge_point_id='CP-0', direction=archive.Direction.RECEIVED)
+        writer.write(b'\xff\xfe', charge_point_id='CP-0', direction=archive.Direction.RECEIVED)
+
+    with archive.ArchiveReader(path) as reader:
+        # Frames which aren't valid JSON are read back as bytes, even when they aren't valid UTF-8
+        assert [record.frame for record in reader][-2:] == [b'not json', b'\xff\xfe']
+        messages = [message for _, message in reader.messages(protocol=compat.OcppJsonProtocol.v16)]
+
+    assert isinstance(messages[0], structure.Call)
+    # CallResult messages are parsed using the action of their Call
+    assert isinstance(messages[1], structure.CallResult)
+    assert messages[1].payload.currentTime == START
+    assert isinstance(messages[-2], exceptions.OCPPException)
+    assert isinstance(messages[-1], exceptions.OCPPException)
+
+
+def test_messages_directions(tmp_path):
+    path = tmp_path / 'traffic.ocpplog'
+    with archive.ArchiveWriter(path) as writer:
+        # Both ends use the same unique id for their own Call
+        for frame, direction in (
+            ([2, 'uid', 'Heartbeat', {}], archive.Direction.RECEIVED),
+            ([2, 'uid', 'GetLocalListVersion', {}], archive.Direction.SENT),
+            ([3, 'uid', {'currentTime': '2020-01-01T00:00:00Z'}], archive.Direction.SENT),
+            ([3, 'uid', {'listVersion': 3}], archive.Direction.RECEIVED),
+        ):
+            writer.write(frame, charge_point_id='CP-0', direction=direction)
+
+    with archive.ArchiveReader(path) as reader:
+        messages = [message for _, message in reader.messages(protocol=compat.OcppJsonProtocol.v16)]
+
+    assert messages[2].payload.currentTime == START
+    assert messages[3].payload.listVersion == 3
+
+
+def test_replay(tmp_path):
+    path = tmp_path / 'traffic.ocpplog'
+    _write_traffic(path, 3)
+
+    now = [0.0]
+    sleeps = []
+
+    def sleep(delay):
+        sleeps.append(delay)
+        now[0] += delay
+
+    with archive.ArchiveReader(path) as reader:
+        records = list(reader.replay(speed=2, sleep=sleep, timer=lambda: now[0]))
+
+    assert len(records) == 6
+    assert sleeps == pytest.approx([0.005, 0.495, 0.005, 0.495, 0.005])
+
+
+def test_compression(tmp_path):
+    path = tmp_path / 'traffic.ocpplog'
+    _write_traffic(path, 1000)
+    raw_size = sum(len(json.dumps(record.frame)) for record in archive.ArchiveReader(path))
+    assert path.stat().st_size < raw_size / 10
+
+    pytest.importorskip('zstandard')
+    zstd_path = tmp_path / 'traffic_zstd.ocpplog'
+    frames = _write_traffic(zstd_path, 10, compression=archive.Compression.ZSTD)
+    with archive.ArchiveReader(zstd_path) as reader:
+        assert reader.compression is archive.Compression.ZSTD
+        assert [record.frame for record in reader] == frames
+
+
+def test_invalid_archive(tmp_path):
+    path = tmp_path / 'traffic.ocpplog'
+    path.write_bytes(b'[2, "uid", "Heartbeat", {}]')
+    with pytest.raises(ValueError):
+        archive.ArchiveReader(path)
+    # Writers don't append to files which aren't archives either
+    with pytest.raises(ValueError):
+        archive.ArchiveWriter(path)
+
+    truncated_path = tmp_path / 'truncated.ocpplog'
+    _write_traffic(truncated_path, 10)
+    truncated_path.write_bytes(truncated_path.read_bytes()[:-10])
+    with pytest.raises(ValueError):
+        archive.ArchiveReader(truncated_path)
+
+
+def test_write_errors(tmp_path):
+    path = tmp_path / 'traffic.ocpplog'
+    with archive.ArchiveWriter(path) as writer:
+        writer.write([2, 'uid-0', 'Heartbeat', {}], charge_point_id='CP-0', direction=archive.Direction.RECEIVED)
+        with pytest.raises(ValueError):
+            writer.write(
+                [2, 'uid-1', 'DataTransfer', {'vendorId': 'vendor', 'data': object()}],
+                charge_point_id='CP-1', direction=archive.Direction.RECEIVED,
+            )
+        with pytest.raises(ValueError):
+            writer.write(
+                [2, 'uid-2', 'Heartbeat', {}], charge_point_id='CP-0', direction=archive.Direction.RECEIVED,
+                timestamp=datetime.datetime(2020, 1, 1),
+            )
+        writer.write([2, 'uid-3', 'Heartbeat', {}], charge_point_id='CP-0', direction=archive.Direction.RECEIVED)
+
+    # Failed writes left nothing behind
+    with archive.ArchiveReader(path) as reader:
+        assert [record.frame[1] for record in reader] == ['uid-0', 'uid-3']
+        assert 'CP-1' not in reader.dictionary
@@ -0,0 +1,45 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import json
+import os
+
+import pytest
+
+from ocpp_codec import bench
+
+
+def test_confidence_interval():
+    assert bench.confidence_interval([10.0, 10.0, 10.0]) == (10.0, 0.0)
+    mean, half_width = bench.confidence_interval([9.0, 10.0, 11.0])
+    assert mean == 10.0
+    assert half_width == pytest.approx(4.303 / 3 ** 0.5)
+
+
+def test_compare():
+    package_root = os.path.dirname(os.path.dirname(bench.__file__))
+    results, regressions = bench.compare(package_root, package_root, processes=2, frames_per_action=2, threshold=1)
+
+    assert not regressions
+    measure = results['v16 BootNotification CALL parse']
+    assert measure.keys() == {'baseline', 'candidate'}
+    assert measure['baseline']['ops'] > 0
+    assert measure['baseline']['p50'] <= measure['baseline']['p99']
+    assert measure['baseline']['allocations'] > 0
+    assert 'v20 TransactionEvent CALLRESULT serialize' in results
+
+    with pytest.raises(ValueError):
+        bench.compare(package_root, os.path.join(package_root, 'tests'))
+
+
+def test_main(mocker, tmp_path, capsys):
+    measure = {'ops': 1000.0, 'ops_interval': 10.0, 'p50': 900.0, 'p99': 1500.0, 'allocations': 2000.0}
+    results = {'v16 Heartbeat CALL parse': {'baseline': measure, 'candidate': dict(measure, ops=500.0)}}
+    mocker.patch.object(bench, 'compare', return_value=(results, ['v16 Heartbeat CALL parse']))
+
+    json_path = str(tmp_path / 'results.json')
+    assert bench.main(['compare', 'git:0.2.0', '.', '--json', json_path]) == 1
+    assert 'REGRESSION' in capsys.readouterr().out
+    with open(json_path) as json_file:
+        assert json.load(json_file)['regressions'] == ['v16 Heartbeat CALL parse']
+
+    mocker.patch.object(bench, 'compare', return_value=(results, []))
+    assert bench.main(['compare', 'git:0.2.0', '.']) == 0
@@ -0,0 +1,81 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import copy
+import json
+
+import pytest
+
+from ocpp_codec import binary
+from ocpp_codec import compat
+from ocpp_codec import serializer
+
+from .test_columnar import METER_VALUES_V16
+from .test_columnar import TRANSACTION_EVENT_V20
+
+
+@pytest.mark.parametrize('value', [
+    None, True, False, 0, 127, 128, 65536, 2 ** 64 - 1, -1, -32, -33, -129, -2 ** 63, 1.5, '', 'é' * 300,
+    [None] * 20, {'key': [1, {'nested': 'value'}]}, {str(i): i for i in range(20)},
+])
+def test_packb(value):
+    assert binary.unpackb(binary.packb(value)) == value
+
+
+def test_packb_errors():
+    with pytest.raises(ValueError):
+        binary.packb(2 ** 64)
+    with pytest.raises(ValueError):
+        binary.packb(object())
+    with pytest.raises(ValueError):
+        binary.unpackb(binary.packb('value')[:-1])
+    with pytest.raises(ValueError):
+        binary.unpackb(binary.packb('value') + b'\x00')
+    with pytest.raises(ValueError):
+        binary.unpackb(b'\xc4\x01\x00')  # bin 8, not supported
+
+
+@pytest.mark.parametrize('raw_data,protocol,action', [
+    (METER_VALUES_V16, compat.OcppJsonProtocol.v16, None),
+    (TRANSACTION_EVENT_V20, compat.OcppJsonProtocol.v20, None),
+    ([2, 'uid', 'BootNotification', {'chargePointModel': 'model', 'chargePointVendor': 'vendor', 'iccid': 'iccid'}],
+     compat.OcppJsonProtocol.v16, None),
+    ([3, 'uid', {'currentTime': '2020-01-01T10:00:00.5Z', 'interval': 300, 'status': 'Accepted'}],
+     compat.OcppJsonProtocol.v16, 'BootNotification'),
+    ([3, 'uid', {}], compat.OcppJsonProtocol.v20, 'TransactionEvent'),
+    ([4, 'uid', 'NotImplemented', 'Unknown action', {'action': 'Foo', 'details': [1, 2.5, None]}],
+     compat.OcppJsonProtocol.v16, None),
+])
+def test_dumps_loads(raw_data, protocol, action):
+    message = serializer.parse(copy.deepcopy(raw_data), action, protocol=protocol)
+
+    data = binary.dumps(message, protocol=protocol, action=action)
+    decoded = binary.loads(data)
+    assert decoded == message
+    assert serializer.serialize(decoded) == serializer.serialize(message)
+
+
+def test_dumps_size():
+    message = serializer.parse(copy.deepcopy(METER_VALUES_V16), protocol=compat.OcppJsonProtocol.v16)
+    assert len(binary.dumps(message, protocol=compat.OcppJsonProtocol.v16)) < len(json.dumps(METER_VALUES_V16)) / 3
+
+
+def test_dumps_loads_errors():
+    call_result = serializer.parse(
+        [3, 'uid', {'currentTime': '2020-01-01T10:00:00Z', 'interval': 300, 'status': 'Accepted'}],
+        'BootNotification',
+        protocol=compat.OcppJsonProtocol.v16,
+    )
+    with pytest.raises(ValueError):
+        binary.dumps(call_result, protocol=compat.OcppJsonProtocol.v16)
+
+    data = binary.dumps(call_result, protocol=compat.OcppJsonProtocol.v16, action='BootNotification')
+    header = binary.unpackb(data)
+
+    # Messages encoded with another version of the schema are rejected
+    with pytest.raises(ValueError):
+        binary.loads(binary.packb([binary.SCHEMA_VERSION + 1] + header[1:]))
+    # Unknown actions are rejected
+    with pytest.raises(ValueError):
+        binary.loads(binary.packb(header[:4] + ['Unknown', header[5]]))
+    # As well as payloads with too many fields
+    with pytest.raises(ValueError):
+        binary.loads(binary.packb(header[:5] + [header[5] + [None] * 10]))
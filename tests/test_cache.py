@@ -0,0 +1,108 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import pytest
+
+from ocpp_codec import cache
+
+
+def test_lru_cache():
+    with pytest.raises(ValueError):
+        cache.LRUCache(maxsize=0)
+
+    lru_cache = cache.LRUCache(maxsize=2)
+    assert lru_cache.get('a') is None
+    assert lru_cache.get('a', 'default') == 'default'
+    assert (lru_cache.hits, lru_cache.misses) == (0, 2)
+
+    lru_cache.put('a', 1)
+    lru_cache.put('b', 2)
+    assert lru_cache.get('a') == 1
+    assert (lru_cache.hits, lru_cache.misses) == (1, 2)
+
+    # 'b' is the least recently used entry and gets evicted
+    lru_cache.put('c', 3)
+    assert len(lru_cache) == 2
+    assert 'b' not in lru_cache
+    assert lru_cache.get('a') == 1
+    assert lru_cache.get('c') == 3
+
+    # Counters survive clearing the cache
+    lru_cache.clear()
+    assert len(lru_cache) == 0
+    assert (lru_cache.hits, lru_cache.misses) == (3, 2)
+
+
+def test_ttl_cache():
+    with pytest.raises(ValueError):
+        cache.TTLCache(ttl=0)
+
+    now = [0]
+    ttl_cache = cache.TTLCache(maxsize=2, ttl=10, timer=lambda: now[0])
+    ttl_cache.put('a', 1)
+    now[0] = 5
+    assert ttl_cache.get('a') == 1
+    # Entries expire, whether they were looked up or not
+    now[0] = 10
+    assert ttl_cache.get('a') is None
+    assert 'a' not in ttl_cache
+    assert (ttl_cache.hits, ttl_cache.misses) == (1, 1)
+
+    # Size is still bounded
+    ttl_cache.put('a', 1)
+    ttl_cache.put('b', 2)
+    ttl_cache.put('c', 3)
+    assert len(ttl_cache) == 2
+    assert ttl_cache.get('a') is None
+
+
+def test_ttl_cache_concurrent_put():
+    now = [0]
+    callbacks = []
+
+    def timer():
+        while callbacks:
+            callbacks.pop()()
+        return now[0]
+
+    ttl_cache = cache.TTLCache(ttl=10, timer=timer)
+    ttl_cache.put('a', 1)
+    # An entry stored while the expired one is looked up isn't dropped
+    now[0] = 10
+    callbacks.append(lambda: ttl_cache.put('a', 2))
+    assert ttl_cache.get('a') == 2
+    assert ttl_cache.get('a') == 2
+    assert (ttl_cache.hits, ttl_cache.misses) == (2, 0)
+
+
+def test_intern_table():
+    table = cache.InternTable(maxsize=2)
+    value = ''.join(['ven', 'dor'])
+    assert table.intern(value) is value
+    # Equal values are replaced by the interned one
+    other_value = ''.join(['vend', 'or'])
+    assert other_value is not value
+    assert table.intern(other_value) is value
+
+    # Least recently used values are dropped
+    table.intern('model')
+    table.intern('firmware')
+    assert table.intern(other_value) is other_value
+
+
+def test_retransmission_cache():
+    now = [0]
+    retransmissions = cache.RetransmissionCache(maxsize=2, ttl=10, timer=lambda: now[0])
+    call = '[2, "19223201", "Heartbeat", {}]'
+    response = [3, '19223201', {'currentTime': '2019-01-30T12:00:00+00:00'}]
+
+    assert retransmissions.get(call) is None
+    retransmissions.put(call, response)
+    # Raw frames can be given either as str or bytes
+    assert retransmissions.get(call) == response
+    assert retransmissions.get(call.encode()) == response
+    # Same uniqueId, different payload
+    assert retransmissions.get('[2, "19223201", "Heartbeat", {"extra": "field"}]') is None
+    assert (retransmissions.hits, retransmissions.misses) == (2, 2)
+
+    now[0] = 10
+    assert retransmissions.get(call) is None
+    assert len(retransmissions) == 0
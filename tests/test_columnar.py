@@ -0,0 +1,155 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import copy
+import math
+
+import pytest
+
+from ocpp_codec import columnar
+from ocpp_codec import compat
+from ocpp_codec import errors
+from ocpp_codec import serializer
+from ocpp_codec.v16 import messages as messages_v16
+from ocpp_codec.v16 import types as types_v16
+from ocpp_codec.v20 import messages as messages_v20
+from ocpp_codec.v20 import types as types_v20
+
+
+OPTIONS = serializer.ParseOptions(field_parsers=columnar.FIELD_PARSERS)
+
+METER_VALUES_V16 = [2, 'uid', 'MeterValues', {
+    'connectorId': 1,
+    'transactionId': 12,
+    'meterValue': [
+        {'timestamp': '2020-01-01T10:00:00.123456Z', 'sampledValue': [
+            {'value': '12'},
+            {'value': '12.50', 'measurand': 'Energy.Active.Import.Register', 'unit': 'Wh', 'phase': 'L1'},
+            {'value': 'signed-data', 'format': 'SignedData'},
+        ]},
+        {'timestamp': '2020-01-01T10:01:00Z', 'sampledValue': [
+            {'value': '230.5', 'context': 'Sample.Periodic', 'location': 'Outlet'},
+        ]},
+        {'timestamp': '2020-01-01T10:02:00Z', 'sampledValue': [{'value': '0'}]},
+    ],
+}]
+
+TRANSACTION_EVENT_V20 = [2, 'uid', 'TransactionEvent', {
+    'eventType': 'Updated',
+    'timestamp': '2020-01-01T10:00:00Z',
+    'triggerReason': 'MeterValuePeriodic',
+    'seqNo': 1,
+    'transactionData': {'id': 'transaction'},
+    'meterValue': [
+        {'timestamp': '2020-01-01T10:00:00Z', 'sampledValue': [
+            {'value': 12.5, 'measurand': 'Energy.Active.Import.Register', 'unitOfMeasure': 'Wh'},
+            {'value': 3.0, 'phase': 'L2'},
+        ]},
+    ],
+}]
+
+
+@pytest.mark.parametrize('raw_data,protocol', [
+    (METER_VALUES_V16, compat.OcppJsonProtocol.v16),
+    (TRANSACTION_EVENT_V20, compat.OcppJsonProtocol.v20),
+])
+def test_parse_meter_values(raw_data, protocol):
+    columnar_msg = serializer.parse(raw_data, protocol=protocol, options=OPTIONS)
+    regular_msg = serializer.parse(raw_data, protocol=protocol)
+
+    meter_values = columnar_msg.payload.meterValue
+    assert isinstance(meter_values, columnar.MeterValueColumns)
+    # Rows are rebuilt as regular dataclass instances
+    assert list(meter_values) == regular_msg.payload.meterValue
+    assert meter_values[-1] == regular_msg.payload.meterValue[-1]
+    assert meter_values[:1] == regular_msg.payload.meterValue[:1]
+    with pytest.raises(IndexError):
+        meter_values[len(meter_values)]  # pylint: disable=pointless-statement
+
+    # Serialization is unchanged
+    assert serializer.serialize(columnar_msg) == serializer.serialize(regular_msg)
+
+
+def test_columns_v16():
+    meter_values = serializer.parse(METER_VALUES_V16, protocol=compat.OcppJsonProtocol.v16, options=OPTIONS).payload
+    columns = meter_values.meterValue
+
+    assert list(columns.timestamps) == [1577872800123456, 1577872860000000, 1577872920000000]
+    assert list(columns.offsets) == [0, 3, 4, 5]
+    assert list(columns.values[:2]) == [12.0, 12.5]
+    assert math.isnan(columns.values[2])
+    assert columns.values[3] == 230.5
+
+    measurands = list(types_v16.MeasurandEnum)
+    assert list(columns.enums['measurand']) == [
+        columnar.UNDEFINED, measurands.index(types_v16.MeasurandEnum.Energy_Active_Import_Register),
+        columnar.UNDEFINED, columnar.UNDEFINED, columnar.UNDEFINED,
+    ]
+    # Values which can't be rebuilt from their float representation are kept as is
+    assert columns.extras['value'] == {1: '12.50', 2: 'signed-data'}
+    assert columns.sampled_value(1) == types_v16.SampledValue(
+        value='12.50',
+        measurand=types_v16.MeasurandEnum.Energy_Active_Import_Register,
+        unit=types_v16.UnitOfMeasureEnum.Wh,
+        phase=types_v16.PhaseEnum.L1,
+    )
+
+
+def test_columns_v20():
+    transaction_event = serializer.parse(
+        TRANSACTION_EVENT_V20, protocol=compat.OcppJsonProtocol.v20, options=OPTIONS,
+    ).payload
+    columns = transaction_event.meterValue
+
+    assert list(columns.values) == [12.5, 3.0]
+    assert 'value' not in columns.extras
+    # Other optional fields are stored in sparse columns
+    assert columns.extras['unitOfMeasure'] == {0: 'Wh'}
+    phases = list(types_v20.PhaseEnum)
+    assert list(columns.enums['phase']) == [columnar.UNDEFINED, phases.index(types_v20.PhaseEnum.L2)]
+
+
+def test_parse_meter_values_errors():
+    def parse_with_meter_values(meter_values):
+        data = {'connectorId': 1, 'meterValue': meter_values}
+        return serializer.parse_data(messages_v16.MeterValues.req, data, options=OPTIONS)
+
+    with pytest.raises(errors.TypeConstraintViolationError):
+        parse_with_meter_values({'timestamp': '2020-01-01T10:00:00Z', 'sampledValue': []})
+    with pytest.raises(errors.TypeConstraintViolationError):
+        parse_with_meter_values([{'timestamp': '2020-01-01T10:00:00Z', 'sampledValue': 'value'}])
+    with pytest.raises(errors.ProtocolError):
+        parse_with_meter_values([{'timestamp': '2020-01-01T10:00:00Z'}])
+    with pytest.raises(errors.ProtocolError):
+        parse_with_meter_values([{'timestamp': '2020-01-01T10:00:00Z', 'sampledValue': []}])
+    with pytest.raises(errors.ProtocolError):
+        parse_with_meter_values([{'timestamp': '2020-01-01T10:00:00Z', 'sampledValue': [{'unit': 'Wh'}]}])
+    with pytest.raises(errors.PropertyConstraintViolationError):
+        parse_with_meter_values([{'timestamp': '2020-01-01T10:00:00Z', 'sampledValue': [
+            {'value': '1', 'unit': 'Parsecs'},
+        ]}])
+
+
+def test_parse_meter_values_limits():
+    def parse_v16(sampled_values, limits=serializer.DEFAULT_LIMITS):
+        options = serializer.ParseOptions(field_parsers=columnar.FIELD_PARSERS, limits=limits)
+        data = {'connectorId': 1, 'meterValue': [{'timestamp': '2020-01-01T10:00:00Z', 'sampledValue': sampled_values}]}
+        return serializer.parse_data(messages_v16.MeterValues.req, data, options=options)
+
+    # Sampled values are limited like the default parsing logic limits them
+    sampled_values = [{'value': '1'}] * (serializer.DEFAULT_MAX_LIST_LENGTH + 1)
+    with pytest.raises(errors.OccurenceConstraintViolationError):
+        parse_v16(sampled_values)
+    assert len(parse_v16(sampled_values, limits=None).meterValue) == 1
+    with pytest.raises(errors.PropertyConstraintViolationError):
+        parse_v16([{'value': '1' * 11}], limits=serializer.Limits(max_string_length=10))
+
+    # Limits apply to the nested types of sampled values as well
+    raw_data = copy.deepcopy(TRANSACTION_EVENT_V20)
+    raw_data[3]['meterValue'][0]['sampledValue'][0]['signedMeterValue'] = {
+        'meterValueSignature': 's' * 11, 'signatureMethod': 'ECDSAP256SHA256', 'encodingMethod': 'DER',
+        'encodedMeterValue': 'value',
+    }
+    options = serializer.ParseOptions(
+        field_parsers=columnar.FIELD_PARSERS, limits=serializer.Limits(max_string_length=10),
+    )
+    with pytest.raises(errors.PropertyConstraintViolationError):
+        serializer.parse_data(messages_v20.TransactionEvent.Request, raw_data[3], options=options)
@@ -0,0 +1,104 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import copy
+import datetime
+
+import pytest
+
+from ocpp_codec import compat
+from ocpp_codec import export
+from ocpp_codec import serializer
+from ocpp_codec import structure
+from ocpp_codec.v16 import messages as messages_v16
+from ocpp_codec.v16 import types as types_v16
+
+from .test_columnar import METER_VALUES_V16
+from .test_columnar import OPTIONS
+from .test_columnar import TRANSACTION_EVENT_V20
+
+pyarrow = pytest.importorskip('pyarrow')
+pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+
+
+def _parse_messages(options=None):
+    return [
+        serializer.parse(copy.deepcopy(METER_VALUES_V16), protocol=compat.OcppJsonProtocol.v16, options=options),
+        serializer.parse(copy.deepcopy(TRANSACTION_EVENT_V20), protocol=compat.OcppJsonProtocol.v20, options=options),
+    ]
+
+
+def test_to_record_batch():
+    batch = export.to_record_batch(_parse_messages())
+    assert batch.schema == export.SCHEMA
+    assert batch.num_rows == 7
+
+    # Enums are dictionary-encoded
+    assert batch.column('measurand').type == pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    data = batch.to_pydict()
+    assert data['protocol'] == ['v16'] * 5 + ['v20'] * 2
+    assert data['transaction_id'] == ['12'] * 5 + ['transaction'] * 2
+    assert data['timestamp'][:4] == [1577872800123456, 1577872800123456, 1577872800123456, 1577872860000000]
+    assert data['value'][:3] == [12.0, 12.5, None]
+    assert data['raw_value'][:3] == [None, None, 'signed-data']
+    assert data['measurand'][1] == 'Energy.Active.Import.Register'
+    assert data['unit'] == [None, 'Wh', None, None, None, 'Wh', None]
+
+    # Meter values parsed into columns are exported without building dataclass instances
+    assert export.to_record_batch(_parse_messages(OPTIONS)).equals(batch)
+
+
+def test_to_record_batch_stop_transaction():
+    stop_transaction = structure.Call(
+        uniqueId='uid',
+        action='StopTransaction',
+        payload=messages_v16.StopTransaction.req(
+            meterStop=1000,
+            timestamp=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc),
+            transactionId=42,
+            transactionData=[types_v16.MeterValue(
+                timestamp=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc),
+                sampledValue=[types_v16.SampledValue(value='1000', unit=types_v16.UnitOfMeasureEnum.Wh)],
+            )],
+        ),
+    )
+    data = export.to_record_batch([stop_transaction]).to_pydict()
+    assert data['action'] == ['StopTransaction']
+    assert data['transaction_id'] == ['42']
+    assert data['value'] == [1000.0]
+
+    # Messages without meter values
+    stop_transaction.payload.transactionData = None
+    assert export.to_record_batch([stop_transaction]).num_rows == 0
+
+    # Messages which can't carry meter values
+    heartbeat = structure.Call(uniqueId='uid', action='Heartbeat', payload=messages_v16.Heartbeat.req())
+    with pytest.raises(ValueError):
+        export.to_record_batch([heartbeat])
+
+
+def test_parquet_writer(tmp_path):
+    path = str(tmp_path / 'meter_values.parquet')
+    with export.ParquetWriter(path, batch_size=4) as writer:
+        for message in _parse_messages() * 3:
+            writer.write(message)
+
+    parquet_file = pyarrow_parquet.ParquetFile(path)
+    assert parquet_file.metadata.num_rows == 21
+    # Rows were written batch by batch
+    assert parquet_file.metadata.num_row_groups > 1
+    expected_values = export.to_record_batch(_parse_messages()).column('value').to_pylist()
+    assert parquet_file.read().column('value').to_pylist() == expected_values * 3
+
+
+def test_to_record_batch_nan():
+    raw_data = copy.deepcopy(METER_VALUES_V16)
+    raw_data[3]['meterValue'] = [{'timestamp': '2020-01-01T10:00:00Z', 'sampledValue': [
+        {'value': 'nan'}, {'value': 'NaN'}, {'value': '1'},
+    ]}]
+    rows_batch = export.to_record_batch([serializer.parse(raw_data, protocol=compat.OcppJsonProtocol.v16)])
+    columns_batch = export.to_record_batch([
+        serializer.parse(raw_data, protocol=compat.OcppJsonProtocol.v16, options=OPTIONS),
+    ])
+    data = rows_batch.to_pydict()
+    assert data['value'] == [None, None, 1.0]
+    assert data['raw_value'] == ['nan', 'NaN', None]
+    assert columns_batch.equals(rows_batch)
@@ -0,0 +1,88 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import pytest
+
+from ocpp_codec import compat
+from ocpp_codec import errors
+from ocpp_codec import exceptions
+from ocpp_codec import generator
+from ocpp_codec import serializer
+from ocpp_codec import structure
+
+
+@pytest.mark.parametrize('protocol', list(compat.OcppJsonProtocol))
+def test_generate_valid_frames(protocol):
+    frame_generator = generator.Generator(protocol, seed=1, optional_density=1, list_length=(2, 4))
+    for action in compat.get_implemented_messages(protocol):
+        call = serializer.parse(frame_generator.call(action), protocol=protocol)
+        assert call.action == action
+        serializer.serialize(call)
+        call_result = serializer.parse(frame_generator.call_result(action), action, protocol=protocol)
+        serializer.serialize(call_result)
+
+    for generated in frame_generator.frames(200):
+        serializer.parse(generated.frame, generated.call_result_action_name, protocol=protocol)
+
+
+def test_generate_deterministic():
+    def frames(seed):
+        frame_generator = generator.Generator(compat.OcppJsonProtocol.v20, seed=seed)
+        return list(frame_generator.frames(50, mutations=list(generator.Mutation), mutation_rate=0.5))
+
+    assert frames(1) == frames(1)
+    assert frames(1) != frames(2)
+
+
+def test_generate_settings():
+    frame_generator = generator.Generator(compat.OcppJsonProtocol.v16, seed=1, optional_density=0)
+    assert frame_generator.call('BootNotification')[3].keys() == {'chargePointModel', 'chargePointVendor'}
+
+    frame_generator = generator.Generator(compat.OcppJsonProtocol.v16, seed=1, list_length=(5, 5), string_length=3)
+    meter_value = frame_generator.call('MeterValues')[3]['meterValue']
+    assert len(meter_value) == 5
+    assert all(len(sampled_value['value']) <= 3 for sampled_value in meter_value[0]['sampledValue'])
+
+    with pytest.raises(ValueError):
+        generator.Generator(compat.OcppJsonProtocol.v16, list_length=(0, 1))
+    with pytest.raises(ValueError):
+        generator.Generator(compat.OcppJsonProtocol.v16, optional_density=2)
+
+
+@pytest.mark.parametrize('protocol', list(compat.OcppJsonProtocol))
+@pytest.mark.parametrize('mutation', list(generator.Mutation))
+def test_generate_invalid_frames(protocol, mutation):
+    frame_generator = generator.Generator(protocol, seed=1, optional_density=1)
+    error_class = generator.expected_error(mutation, protocol)
+
+    mutated = 0
+    for action in compat.get_implemented_messages(protocol):
+        for message_type in (structure.MessageTypeEnum.CALL, structure.MessageTypeEnum.CALLRESULT):
+            frame = frame_generator.invalid_frame(action, message_type, mutation)
+            if frame is None:
+                continue
+            mutated += 1
+            with pytest.raises(exceptions.OCPPException) as exc_info:
+                serializer.parse(
+                    frame, action if message_type is structure.MessageTypeEnum.CALLRESULT else None, protocol=protocol,
+                )
+            assert isinstance(exc_info.value.ocpp_error, error_class)
+
+    # v16 types don't use identifiers, v20 types don't limit the precision of decimals nor require positive numbers
+    if (protocol, mutation) not in {
+        (compat.OcppJsonProtocol.v16, generator.Mutation.INVALID_IDENTIFIER),
+        (compat.OcppJsonProtocol.v20, generator.Mutation.EXCESS_PRECISION),
+        (compat.OcppJsonProtocol.v20, generator.Mutation.NEGATIVE_NUMBER),
+    }:
+        assert mutated
+
+
+def test_expected_error():
+    assert generator.expected_error(generator.Mutation.NOT_A_LIST, compat.OcppJsonProtocol.v16) is errors.GenericError
+    assert generator.expected_error(
+        generator.Mutation.UNKNOWN_MESSAGE_TYPE, compat.OcppJsonProtocol.v20,
+    ) is errors.MessageTypeNotSupportedError
+    assert generator.expected_error(
+        generator.Mutation.TOO_DEEP, compat.OcppJsonProtocol.v20,
+    ) is errors.FormatViolationError
+    assert generator.expected_error(
+        generator.Mutation.LIST_TOO_LONG, compat.OcppJsonProtocol.v16,
+    ) is errors.OccurenceConstraintViolationError
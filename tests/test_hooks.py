@@ -0,0 +1,136 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import contextlib
+import datetime
+import json
+
+import pytest
+
+from ocpp_codec import compat
+from ocpp_codec import exceptions
+from ocpp_codec import hooks
+from ocpp_codec import serializer
+from ocpp_codec import structure
+from ocpp_codec.v16 import messages as messages_v16
+from ocpp_codec.v16 import types as types_v16
+
+
+BOOT_NOTIFICATION = [2, 'uid', 'BootNotification', {'chargePointModel': 'model', 'chargePointVendor': 'vendor'}]
+
+
+def _stages(events):
+    return [(event.stage, event.direction, event.action) for event in events if event.stage not in (
+        hooks.Stage.VALIDATOR, hooks.Stage.ENCODER,
+    )]
+
+
+def test_disabled(mocker):
+    assert not hooks.enabled
+    event_class = mocker.spy(hooks, 'Event')
+    serializer.serialize(serializer.parse(list(BOOT_NOTIFICATION), protocol=compat.OcppJsonProtocol.v16))
+    assert not event_class.called
+
+
+def test_parse():
+    events = []
+    with hooks.installed(events.append):
+        assert hooks.enabled
+        frame = json.dumps(BOOT_NOTIFICATION)
+        serializer.loads(frame, protocol=compat.OcppJsonProtocol.v16)
+    assert not hooks.enabled
+
+    incoming = hooks.Direction.INCOMING
+    assert _stages(events) == [
+        (hooks.Stage.ENVELOPE, incoming, 'BootNotification'),
+        (hooks.Stage.PAYLOAD, incoming, 'BootNotification'),
+        (hooks.Stage.MESSAGE, incoming, 'BootNotification'),
+        (hooks.Stage.FRAME, incoming, 'BootNotification'),
+    ]
+    assert events[-1].size == len(frame)
+    assert events[-2].message_type is structure.MessageTypeEnum.CALL
+    assert events[-2].protocol is compat.OcppJsonProtocol.v16
+    assert all(event.elapsed_ns >= 0 for event in events)
+    assert events[-1].elapsed_ns >= sum(event.elapsed_ns for event in events[:-1] if event.stage is hooks.Stage.PAYLOAD)
+
+    # Validators and encoders of the payload know its action
+    validator_events = [event for event in events if event.stage is hooks.Stage.VALIDATOR]
+    assert {(event.field, event.name) for event in validator_events if event.action == 'BootNotification'} == {
+        ('chargePointModel', 'max_length(20)'), ('chargePointVendor', 'max_length(20)'),
+    }
+
+
+def test_serialize():
+    events = []
+    payload = messages_v16.BootNotification.conf(
+        currentTime=datetime.datetime(2020, 6, 1, tzinfo=datetime.timezone.utc), interval=300,
+        status=types_v16.RegistrationStatusEnum.Accepted,
+    )
+    with hooks.installed(events.append):
+        frame = serializer.dumps(structure.CallResult(uniqueId='uid', payload=payload))
+
+    outgoing = hooks.Direction.OUTGOING
+    assert _stages(events) == [
+        (hooks.Stage.ENVELOPE, outgoing, 'BootNotification'),
+        (hooks.Stage.PAYLOAD, outgoing, 'BootNotification'),
+        (hooks.Stage.MESSAGE, outgoing, 'BootNotification'),
+        (hooks.Stage.FRAME, outgoing, 'BootNotification'),
+    ]
+    assert events[-1].size == len(frame)
+    # The protocol is found from the payload
+    assert events[-2].protocol is compat.OcppJsonProtocol.v16
+    encoder_events = [event for event in events if event.stage is hooks.Stage.ENCODER]
+    assert {(event.field, event.name) for event in encoder_events} >= {
+        ('currentTime', 'DateTimeEncoder'), ('status', 'EnumEncoder'),
+    }
+
+
+def test_serialize_broadcast():
+    events = []
+    payload = messages_v16.ChangeAvailability.req(connectorId=0, type=types_v16.AvailabilityTypeEnum.Operative)
+    with hooks.installed(events.append):
+        frames = list(serializer.serialize_broadcast(payload, ['1', '2']))
+
+    # The payload is serialized once, then every frame is measured as if it went through 'dumps'
+    outgoing = hooks.Direction.OUTGOING
+    assert _stages(events) == [
+        (hooks.Stage.PAYLOAD, outgoing, 'ChangeAvailability'),
+        (hooks.Stage.MESSAGE, outgoing, 'ChangeAvailability'),
+        (hooks.Stage.FRAME, outgoing, 'ChangeAvailability'),
+        (hooks.Stage.MESSAGE, outgoing, 'ChangeAvailability'),
+        (hooks.Stage.FRAME, outgoing, 'ChangeAvailability'),
+    ]
+    message_events = [event for event in events if event.stage is hooks.Stage.MESSAGE]
+    assert [event.unique_id for event in message_events] == ['1', '2']
+    assert message_events[0].message_type is structure.MessageTypeEnum.CALL
+    assert message_events[0].protocol is compat.OcppJsonProtocol.v16
+    assert events[-1].size == len(frames[-1])
+
+
+def test_errors():
+    events = []
+    invalid = [2, 'uid', 'BootNotification', {'chargePointModel': 'm' * 21, 'chargePointVendor': 'vendor'}]
+    with hooks.installed(events.append), pytest.raises(exceptions.OCPPException):
+        serializer.parse(invalid, protocol=compat.OcppJsonProtocol.v16)
+
+    failed = [event for event in events if event.error is not None]
+    assert [event.stage for event in failed] == [hooks.Stage.VALIDATOR, hooks.Stage.PAYLOAD, hooks.Stage.MESSAGE]
+    assert failed[0].field == 'chargePointModel'
+
+
+def test_context():
+    stages = []
+
+    @contextlib.contextmanager
+    def context(event):
+        stages.append(('enter', event.stage, event.elapsed_ns))
+        yield
+        stages.append(('exit', event.stage, event.elapsed_ns is not None))
+
+    with hooks.installed(context=context):
+        serializer.parse([3, 'uid', {}], 'StatusNotification', protocol=compat.OcppJsonProtocol.v16)
+    envelope_stages = [stage for stage in stages if stage[1] in (hooks.Stage.ENVELOPE, hooks.Stage.PAYLOAD)]
+    assert envelope_stages[0] == ('enter', hooks.Stage.ENVELOPE, None)
+    assert ('exit', hooks.Stage.ENVELOPE, True) in envelope_stages
+    assert envelope_stages[-2:] == [('enter', hooks.Stage.PAYLOAD, None), ('exit', hooks.Stage.PAYLOAD, True)]
+
+    with pytest.raises(ValueError):
+        hooks.remove(context=context)
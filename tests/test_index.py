@@ -0,0 +1,112 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import datetime
+
+from ocpp_codec import archive
+from ocpp_codec import compat
+from ocpp_codec import index
+from ocpp_codec import serializer
+from ocpp_codec import structure
+
+
+START = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _write_traffic(path, first, count):
+    with archive.ArchiveWriter(path, block_size=256) as writer:
+        for i in range(first, first + count):
+            action = 'StopTransaction' if i % 10 == 0 else 'Heartbeat'
+            payload = {'meterStop': i, 'timestamp': '2020-01-01T00:00:00Z', 'transactionId': i} if i % 10 == 0 else {}
+            timestamp = START + datetime.timedelta(seconds=i)
+            writer.write(
+                [2, f'uid-{i}', action, payload],
+                charge_point_id=f'CP-{i % 4}', direction=archive.Direction.RECEIVED, timestamp=timestamp,
+            )
+            writer.write(
+                [3, f'uid-{i}', {}],
+                charge_point_id=f'CP-{i % 4}', direction=archive.Direction.SENT, timestamp=timestamp,
+            )
+
+
+def test_index(tmp_path):
+    log_path = tmp_path / 'traffic.ocpplog'
+    index_path = tmp_path / 'traffic.index'
+    _write_traffic(log_path, 0, 100)
+
+    builder = index.IndexBuilder(index_path)
+    assert builder.add(log_path) == 200
+    # Already indexed blocks are skipped
+    assert builder.add(log_path) == 0
+
+    with index.Index(index_path) as traffic_index:
+        records = traffic_index.find(unique_id='uid-42')
+        assert [record.frame[0] for record in records] == [2, 3]
+        assert records[0].charge_point_id == 'CP-2'
+
+        # Found frames can be parsed
+        records = traffic_index.find(charge_point_id='CP-2', action='StopTransaction')
+        assert [record.frame[1] for record in records] == [f'uid-{i}' for i in (10, 30, 50, 70, 90) for _ in range(2)]
+        call = serializer.parse(records[0].frame, protocol=compat.OcppJsonProtocol.v16)
+        assert call.payload.transactionId == 10
+        # CallResult frames are indexed with the action of their Call
+        call_result = serializer.parse(records[1].frame, 'StopTransaction', protocol=compat.OcppJsonProtocol.v16)
+        assert isinstance(call_result, structure.CallResult)
+
+        start, end = START + datetime.timedelta(seconds=10), START + datetime.timedelta(seconds=20)
+        records = traffic_index.find(charge_point_id='CP-1', start=start, end=end)
+        assert [record.frame[1] for record in records] == ['uid-13', 'uid-13', 'uid-17', 'uid-17']
+        assert len(traffic_index.find(action='StopTransaction')) == 20
+        assert traffic_index.find(unique_id='unknown') == []
+        assert traffic_index.find(charge_point_id='CP-1', unique_id='uid-42') == []
+
+
+def test_index_incremental(tmp_path):
+    log_path = tmp_path / 'traffic.ocpplog'
+    index_path = tmp_path / 'traffic.index'
+    _write_traffic(log_path, 0, 50)
+    builder = index.IndexBuilder(index_path)
+    builder.add(log_path)
+
+    # Index new blocks appended to the log, and new logs
+    _write_traffic(log_path, 50, 50)
+    other_log_path = tmp_path / 'other.ocpplog'
+    _write_traffic(other_log_path, 100, 50)
+    builder = index.IndexBuilder(index_path)
+    assert builder.add(log_path) == 100
+    assert builder.add(other_log_path) == 100
+
+    with index.Index(index_path) as traffic_index:
+        assert len(traffic_index.find(action='StopTransaction')) == 30
+        assert len(traffic_index.find(charge_point_id='CP-0')) == 76
+
+    builder.compact()
+    assert len(list(index_path.glob('segment-*'))) == 2
+    with index.Index(index_path) as traffic_index:
+        assert len(traffic_index.find(action='StopTransaction')) == 30
+        records = traffic_index.find(unique_id='uid-120')
+        assert [record.frame[0] for record in records] == [2, 3]
+
+
+def test_index_directions(tmp_path):
+    log_path = tmp_path / 'traffic.ocpplog'
+    index_path = tmp_path / 'traffic.index'
+    builder = index.IndexBuilder(index_path)
+    with archive.ArchiveWriter(log_path) as writer:
+        writer.write([2, 'uid', 'Heartbeat', {}], charge_point_id='CP-0', direction=archive.Direction.RECEIVED)
+        writer.write([2, 'uid', 'GetLocalListVersion', {}], charge_point_id='CP-0', direction=archive.Direction.SENT)
+    builder.add(log_path)
+
+    # Results are indexed with the action of the Call sent in the other direction, even across builds
+    with archive.ArchiveWriter(log_path) as writer:
+        writer.write(
+            [3, 'uid', {'currentTime': '2020-01-01T00:00:00Z'}], charge_point_id='CP-0', direction=archive.Direction.SENT,
+        )
+        writer.write([3, 'uid', {'listVersion': 3}], charge_point_id='CP-0', direction=archive.Direction.RECEIVED)
+    builder.add(log_path)
+
+    with index.Index(index_path) as traffic_index:
+        assert [record.frame for record in traffic_index.find(action='Heartbeat')] == [
+            [2, 'uid', 'Heartbeat', {}], [3, 'uid', {'currentTime': '2020-01-01T00:00:00Z'}],
+        ]
+        assert [record.frame for record in traffic_index.find(action='GetLocalListVersion')] == [
+            [2, 'uid', 'GetLocalListVersion', {}], [3, 'uid', {'listVersion': 3}],
+        ]
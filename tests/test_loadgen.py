@@ -0,0 +1,59 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import json
+
+import pytest
+
+from ocpp_codec import compat
+from ocpp_codec import loadgen
+
+
+@pytest.mark.parametrize('protocol', list(compat.OcppJsonProtocol))
+def test_run(protocol):
+    config = loadgen.FleetConfig(
+        protocol=protocol, charge_points=10, duration=0.3, interval=0.01, server_interval=0.05, mix={'transaction': 1},
+    )
+    report = loadgen.run(config)
+
+    assert report.charge_points['BootNotification']['calls'] == 10
+    for action in loadgen.TRANSACTIONS[protocol]:
+        assert report.charge_points[action]['calls'] > 0
+    assert set(report.central_system) <= set(loadgen.SERVER_ACTIONS[protocol])
+    assert report.central_system
+    for summary in (report.charge_points, report.central_system):
+        for measures in summary.values():
+            assert measures['errors'] == 0
+            assert measures['p50'] <= measures['p99'] <= measures['max']
+    assert report.rate > 0
+
+
+def test_run_websocket():
+    pytest.importorskip('websockets')
+    config = loadgen.FleetConfig(charge_points=3, duration=0.2, interval=0.01, server_interval=0, transport='websocket')
+    report = loadgen.run(config)
+    assert report.charge_points['BootNotification']['calls'] == 3
+    assert report.charge_points['Heartbeat']['calls'] > 0
+    assert not report.central_system
+
+
+def test_fleet_config():
+    with pytest.raises(ValueError):
+        loadgen.FleetConfig(protocol=compat.OcppJsonProtocol.v20, mix={'StartTransaction': 1})
+    with pytest.raises(ValueError):
+        loadgen.FleetConfig(mix={'Heartbeat': 0})
+    with pytest.raises(ValueError):
+        loadgen.FleetConfig(transport='carrier-pigeon')
+
+
+def test_main(tmp_path, capsys):
+    json_path = str(tmp_path / 'report.json')
+    assert loadgen.main([
+        '--charge-points', '2', '--duration', '0.1', '--interval', '0', '--mix', 'Heartbeat=1', '--json', json_path,
+    ]) == 0
+    assert 'Heartbeat' in capsys.readouterr().out
+    with open(json_path) as json_file:
+        report = json.load(json_file)
+    assert report['config']['protocol'] == 'v16'
+    assert report['charge_points']['Heartbeat']['calls'] > 0
+
+    with pytest.raises(SystemExit):
+        loadgen.main(['--mix', 'Heartbeat'])
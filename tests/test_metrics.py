@@ -0,0 +1,130 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import json
+import threading
+
+import pytest
+
+from ocpp_codec import compat
+from ocpp_codec import exceptions
+from ocpp_codec import hooks
+from ocpp_codec import metrics
+from ocpp_codec import serializer
+
+
+BOOT_NOTIFICATION = [2, 'uid', 'BootNotification', {'chargePointModel': 'model', 'chargePointVendor': 'vendor'}]
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.Registry()
+    registry.install()
+    yield registry
+    registry.uninstall()
+
+
+def test_registry(registry):
+    frame = json.dumps(BOOT_NOTIFICATION)
+    message = serializer.loads(frame, protocol=compat.OcppJsonProtocol.v16)
+    serializer.serialize(message)
+    invalid = [2, 'uid', 'BootNotification', {'chargePointModel': 'm' * 21, 'chargePointVendor': 'vendor'}]
+    with pytest.raises(exceptions.OCPPException):
+        serializer.parse(invalid, protocol=compat.OcppJsonProtocol.v16)
+
+    snapshot = registry.snapshot()
+    assert snapshot['frames'] == [
+        {'action': 'BootNotification', 'message_type': 'CALL', 'protocol': 'v16', 'direction': 'incoming', 'value': 2},
+        {'action': 'BootNotification', 'message_type': 'CALL', 'protocol': 'v16', 'direction': 'outgoing', 'value': 1},
+    ]
+    assert snapshot['errors'] == [{
+        'code': 'PropertyConstraintViolation', 'field': 'chargePointModel', 'protocol': 'v16', 'direction': 'incoming',
+        'value': 1,
+    }]
+    durations = {histogram['direction']: histogram for histogram in snapshot['duration_seconds']}
+    assert durations['incoming']['count'] == 2
+    assert list(durations['incoming']['buckets'])[-1] == '+Inf'
+    assert durations['incoming']['buckets']['+Inf'] == 2
+    assert 0 < durations['outgoing']['sum'] < 1
+    assert snapshot['frame_bytes'] == [{
+        'action': 'BootNotification', 'direction': 'incoming', 'buckets': {
+            **{str(bound): 0 for bound in metrics.SIZE_BUCKETS[:1]},
+            **{str(bound): 1 for bound in metrics.SIZE_BUCKETS[1:]},
+            '+Inf': 1,
+        }, 'count': 1, 'sum': len(frame),
+    }]
+    # Snapshots are JSON serializable
+    json.dumps(snapshot)
+
+    registry.reset()
+    assert registry.snapshot() == {'frames': [], 'errors': [], 'duration_seconds': [], 'frame_bytes': []}
+
+
+def test_threads(registry):
+    def parse():
+        for _ in range(50):
+            serializer.parse(list(BOOT_NOTIFICATION), protocol=compat.OcppJsonProtocol.v16)
+
+    threads = [threading.Thread(target=parse) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Values of finished threads are kept
+    assert registry.snapshot()['frames'][0]['value'] == 200
+    assert registry.snapshot()['duration_seconds'][0]['count'] == 200
+
+
+def test_to_prometheus(registry):
+    serializer.loads(json.dumps(BOOT_NOTIFICATION), protocol=compat.OcppJsonProtocol.v16)
+    with pytest.raises(exceptions.OCPPException):
+        serializer.parse([2, 'uid', 'Foo"Bar', {}], protocol=compat.OcppJsonProtocol.v16)
+
+    lines = registry.to_prometheus().splitlines()
+    assert '# TYPE ocpp_codec_frames_total counter' in lines
+    assert (
+        'ocpp_codec_frames_total{action="BootNotification",message_type="CALL",protocol="v16",direction="incoming"} 1'
+    ) in lines
+    # Actions that aren't implemented share a single label
+    assert (
+        'ocpp_codec_frames_total{action="unknown",message_type="CALL",protocol="v16",direction="incoming"} 1'
+    ) in lines
+    assert 'ocpp_codec_errors_total{code="NotImplemented",field="",protocol="v16",direction="incoming"} 1' in lines
+    assert '# TYPE ocpp_codec_duration_seconds histogram' in lines
+    assert 'ocpp_codec_duration_seconds_bucket{action="BootNotification",direction="incoming",le="+Inf"} 1' in lines
+    assert 'ocpp_codec_duration_seconds_count{action="BootNotification",direction="incoming"} 1' in lines
+    assert 'ocpp_codec_frame_bytes_bucket{action="BootNotification",direction="incoming",le="64"} 0' in lines
+    assert registry.to_prometheus(prefix='codec').startswith('# HELP codec_frames_total')
+
+    registry.uninstall()
+    assert not hooks.enabled
+    registry.install()
+
+
+def test_unknown_actions(registry):
+    for action in ('Foo', 'Bar', 'SetVariables'):  # SetVariables is only implemented by OCPP v20
+        with pytest.raises(exceptions.OCPPException):
+            serializer.loads(json.dumps([2, 'uid', action, {}]), protocol=compat.OcppJsonProtocol.v16)
+
+    snapshot = registry.snapshot()
+    assert snapshot['frames'] == [
+        {'action': 'unknown', 'message_type': 'CALL', 'protocol': 'v16', 'direction': 'incoming', 'value': 3},
+    ]
+    assert [histogram['action'] for histogram in snapshot['duration_seconds']] == ['unknown']
+    assert metrics._format_labels({'field': 'Foo"Bar\n'}) == 'field="Foo\\"Bar\\n"'
+
+
+def test_frame_errors(registry):
+    # Frames rejected before being parsed are counted as well
+    with pytest.raises(exceptions.OCPPException):
+        serializer.loads('{not json', protocol=compat.OcppJsonProtocol.v16)
+    with pytest.raises(exceptions.OCPPException):
+        serializer.loads(' ' * (2 * 1024 * 1024), protocol=compat.OcppJsonProtocol.v16)
+
+    snapshot = registry.snapshot()
+    assert snapshot['errors'] == [
+        {'code': 'FormationViolation', 'field': '', 'protocol': 'v16', 'direction': 'incoming', 'value': 1},
+        {'code': 'GenericError', 'field': '', 'protocol': 'v16', 'direction': 'incoming', 'value': 1},
+    ]
+    assert snapshot['frames'] == [
+        {'action': '', 'message_type': '', 'protocol': 'v16', 'direction': 'incoming', 'value': 2},
+    ]
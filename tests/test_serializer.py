@@ -1,16 +1,22 @@
 # Copyright (c) Polyconseil SAS. All rights reserved.
+import copy
+import dataclasses
 from dataclasses import fields
 import datetime
+import json
 
 import pytest
 import pytz
 
+from ocpp_codec import cache
 from ocpp_codec import compat
 from ocpp_codec import errors
 from ocpp_codec import exceptions
 from ocpp_codec import serializer
 from ocpp_codec import structure
 from ocpp_codec import types as common_types
+from ocpp_codec.v16 import messages as messages_v16
+from ocpp_codec.v16 import types as types_v16
 
 from . import messages
 from . import types
@@ -525,3 +531,425 @@ def test_serialize():
     assert serializer.serialize(call_error_msg) == [
         4, "19223201", "GenericError", "What a tragedy", {"do_you_hear_me": "hey_ho"}
     ]
+
+
+def test_serialize_broadcast():
+    payload = messages_v16.ChangeAvailability.req(connectorId=0, type=types_v16.AvailabilityTypeEnum.Operative)
+
+    def unique_ids():
+        yield from ('1', '2', '3')
+
+    broadcast = serializer.serialize_broadcast(payload, unique_ids())
+    frames = [
+        serializer.dumps(structure.Call(uniqueId=unique_id, action='ChangeAvailability', payload=payload))
+        for unique_id in ('1', '2', '3')
+    ]
+    assert list(broadcast) == frames
+    assert list(serializer.serialize_broadcast(payload, unique_ids(), binary=True)) == [
+        frame.encode('utf-8') for frame in frames
+    ]
+    # uniqueIds are escaped
+    frame = next(serializer.serialize_broadcast(payload, ['"\\']))
+    assert json.loads(frame)[1] == '"\\'
+
+    # Payload errors are raised upfront, before consuming any uniqueId
+    with pytest.raises(errors.PropertyConstraintViolationError):
+        serializer.serialize_broadcast(
+            messages_v16.ChangeAvailability.req(connectorId=-1, type=types_v16.AvailabilityTypeEnum.Operative),
+            unique_ids(),
+        )
+    # uniqueIds are still validated
+    with pytest.raises(errors.PropertyConstraintViolationError):
+        list(serializer.serialize_broadcast(payload, ['a' * 37]))
+    # Payloads must be tied to an action to know the 'Call.action' value
+    with pytest.raises(ValueError):
+        serializer.serialize_broadcast(messages.SimpleAction.req('data', 'data', types.FooBarEnum.Foo), ['1'])
+
+
+def test_serialize_fields_cache(mocker):
+    serialization_cache = cache.LRUCache()
+    frozen_req_class = common_types.frozen_variant(messages.ComplexAction.req)
+    dt = datetime.datetime(year=2019, month=1, day=30, hour=12, minute=0, tzinfo=pytz.UTC)
+    complex_req_msg = frozen_req_class(
+        complexValue=types.ComplexType(enumValue=types.FooBarEnum.Foo, validatedValue='data'),
+        listValue=[types.ListElementType(datetimeValue=dt, nestedListValue=[types.ElementType(value='foo')])],
+    )
+    expected = {
+        'complexValue': {'enumValue': 'Foo', 'validatedValue': 'data'},
+        'listValue': [{'datetimeValue': '2019-01-30T12:00:00+00:00', 'nestedListValue': [{'value': 'foo'}]}],
+    }
+
+    assert serializer.serialize_fields(complex_req_msg, cache=serialization_cache) == expected
+    # The message and its nested types were cached
+    assert len(serialization_cache) == 4
+    assert (serialization_cache.hits, serialization_cache.misses) == (0, 4)
+
+    # An equal message is served from the cache, without serializing anything
+    spy = mocker.spy(serializer, 'serialize_field')
+    same_msg = frozen_req_class(complexValue=complex_req_msg.complexValue, listValue=complex_req_msg.listValue)
+    assert serializer.serialize_fields(same_msg, cache=serialization_cache) == expected
+    assert spy.call_count == 0
+    assert serialization_cache.hits == 1
+
+    # Every caller gets its own dict, modifying it doesn't alter the cached one
+    serialized = serializer.serialize_fields(complex_req_msg, cache=serialization_cache)
+    serialized['complexValue']['enumValue'] = 'Bar'
+    serialized['listValue'].clear()
+    assert serializer.serialize_fields(same_msg, cache=serialization_cache) == expected
+    assert serialization_cache.hits == 3
+
+    # Non-frozen messages are never cached
+    call_msg = structure.Call(
+        uniqueId='19223201',
+        action='SimpleAction',
+        payload=messages.SimpleAction.req(value='data', validatedValue='data', enumValue=types.FooBarEnum.Foo),
+    )
+    assert serializer.serialize(call_msg, cache=serialization_cache) == serializer.serialize(call_msg)
+    assert len(serialization_cache) == 4
+
+
+def test_serialize_memoization(mocker):
+    frozen_req_class = common_types.frozen_variant(messages.SimpleAction.req)
+    call_msg = structure.Call(
+        uniqueId='19223201',
+        action='SimpleAction',
+        payload=frozen_req_class(value='data', validatedValue='data', enumValue=types.FooBarEnum.Foo),
+    )
+    expected = [2, '19223201', 'SimpleAction', {'value': 'data', 'validatedValue': 'data', 'enumValue': 'Foo'}]
+    assert serializer.serialize(call_msg) == expected
+
+    # Retries reuse the memoized message
+    spy = mocker.spy(serializer, 'serialize_fields')
+    serialized = serializer.serialize(call_msg)
+    assert serialized == expected
+    assert spy.call_count == 0
+    # Modifying the returned list, or the payload it holds, doesn't alter the memoized one
+    serialized.append('garbage')
+    serialized[3]['value'] = 'modified'
+    assert serializer.serialize(call_msg) == expected
+    # Frames are memoized, retries aren't encoded again
+    json_spy = mocker.spy(serializer.json, 'dumps')
+    assert json.loads(serializer.dumps(call_msg)) == expected
+    assert json_spy.call_count == 0
+
+    # Reassigning a field drops the memoized message
+    call_msg.uniqueId = '19223202'
+    assert serializer.serialize(call_msg) == [2, '19223202'] + expected[2:]
+    call_msg.payload = frozen_req_class(value='other', validatedValue='data', enumValue=types.FooBarEnum.Foo)
+    assert serializer.serialize(call_msg)[3]['value'] == 'other'
+    assert spy.call_count == 2
+
+    # Mutable payloads are always serialized again, as they may be modified in place
+    call_msg.payload = messages.SimpleAction.req(value='data', validatedValue='data', enumValue=types.FooBarEnum.Foo)
+    serializer.serialize(call_msg)
+    call_msg.payload.value = 'modified'
+    assert serializer.serialize(call_msg)[3]['value'] == 'modified'
+
+
+def test_serialize_fields_tracked(mocker):
+    tracked_req_class = common_types.tracked_variant(messages.ComplexAction.req)
+    tracked_element_class = common_types.tracked_variant(types.ElementType)
+    dt = datetime.datetime(year=2019, month=1, day=30, hour=12, minute=0, tzinfo=pytz.UTC)
+    complex_req_msg = tracked_req_class(
+        complexValue=common_types.tracked_variant(types.ComplexType)(
+            enumValue=types.FooBarEnum.Foo, validatedValue='data',
+        ),
+        listValue=[types.ListElementType(datetimeValue=dt, nestedListValue=[tracked_element_class(value='foo')])],
+    )
+    expected = {
+        'complexValue': {'enumValue': 'Foo', 'validatedValue': 'data'},
+        'listValue': [{'datetimeValue': '2019-01-30T12:00:00+00:00', 'nestedListValue': [{'value': 'foo'}]}],
+        'optionalValue': 'bar',
+    }
+
+    complex_req_msg.optionalValue = 'bar'
+    assert serializer.serialize_fields(complex_req_msg) == expected
+    # Nested types and lists may be modified in place, they're always serialized again
+    assert complex_req_msg.dirty_fields == {'complexValue', 'listValue'}
+
+    # Only fields that weren't serialized before are serialized again, including inside nested tracked types
+    spy = mocker.spy(serializer, 'serialize_field')
+    assert serializer.serialize_fields(complex_req_msg) == expected
+    # Only the untracked ListElementType's 'datetimeValue' field is serialized again
+    assert spy.call_count == 1
+
+    # Changes are picked up, including nested ones and lists modified in place
+    complex_req_msg.optionalValue = None
+    complex_req_msg.complexValue.validatedValue = 'other'
+    complex_req_msg.listValue[0].nestedListValue.append(tracked_element_class(value='new'))
+    complex_req_msg.listValue[0].nestedListValue[0].optionalValue = types.FooBarEnum.Bar
+    assert serializer.serialize_fields(complex_req_msg) == {
+        'complexValue': {'enumValue': 'Foo', 'validatedValue': 'other'},
+        'listValue': [{'datetimeValue': '2019-01-30T12:00:00+00:00', 'nestedListValue': [
+            {'value': 'foo', 'optionalValue': 'Bar'},
+            {'value': 'new'},
+        ]}],
+    }
+
+    # Invalid values are still rejected
+    complex_req_msg.complexValue.validatedValue = 'a' * 21
+    with pytest.raises(errors.PropertyConstraintViolationError):
+        serializer.serialize_fields(complex_req_msg)
+
+
+def test_parse_data_field_parsers():
+    data = {
+        'complexValue': {'enumValue': 'Foo', 'validatedValue': 'data'},
+        'listValue': [{'datetimeValue': '2019-01-30T12:00:00Z', 'nestedListValue': [{'value': 'foo'}]}],
+    }
+    options = serializer.ParseOptions(field_parsers={
+        types.ListElementType: {'nestedListValue': lambda field, raw, options: tuple(item['value'] for item in raw)},
+    })
+
+    # Field parsers replace the default parsing of a field, including in nested types
+    complex_req_msg = serializer.parse_data(messages.ComplexAction.req, data, options=options)
+    assert complex_req_msg.listValue[0].nestedListValue == ('foo',)
+    assert complex_req_msg.complexValue == types.ComplexType(enumValue=types.FooBarEnum.Foo, validatedValue='data')
+
+    # Required and unknown fields are still checked
+    del data['listValue'][0]['nestedListValue']
+    with pytest.raises(errors.ProtocolError):
+        serializer.parse_data(messages.ComplexAction.req, data, options=options)
+
+
+def test_parse_interning():
+    def boot_notification():
+        # Build new string objects for every message, like JSON decoding does
+        return [2, 'uid', 'BootNotification', {
+            'chargePointVendor': ''.join(['Ven', 'dor']),
+            'chargePointModel': ''.join(['Mod', 'el']),
+            'chargeBoxSerialNumber': ''.join(['Seri', 'al']),
+        }]
+
+    first = serializer.parse(boot_notification(), protocol=compat.OcppJsonProtocol.v16)
+    second = serializer.parse(boot_notification(), protocol=compat.OcppJsonProtocol.v16)
+    assert first.payload.chargePointVendor is not second.payload.chargePointVendor
+
+    options = serializer.ParseOptions(intern_table=cache.InternTable())
+    first = serializer.parse(boot_notification(), protocol=compat.OcppJsonProtocol.v16, options=options)
+    second = serializer.parse(boot_notification(), protocol=compat.OcppJsonProtocol.v16, options=options)
+    assert first == second
+    # Only fields marked with the 'intern' metadata are interned
+    assert first.payload.chargePointVendor is second.payload.chargePointVendor
+    assert first.payload.chargePointModel is second.payload.chargePointModel
+    assert first.payload.chargeBoxSerialNumber is not second.payload.chargeBoxSerialNumber
+    assert len(options.intern_table) == 2
+
+
+def test_parse_flyweights():
+    def get_variables_result(value):
+        return [3, 'uid', {'getVariableResult': [
+            {
+                'attributeStatus': 'Accepted',
+                'component': {'name': 'EVSE', 'evse': {'id': 1}},
+                'variable': {'name': 'Power'},
+                'attributeValue': value,
+            },
+            {
+                'attributeStatus': 'Accepted',
+                'component': {'name': 'EVSE', 'evse': {'id': 1}},
+                'variable': {'name': 'Available'},
+                'attributeValue': 'true',
+            },
+        ]}]
+
+    options = serializer.ParseOptions(flyweights=cache.LRUCache())
+    first = serializer.parse(
+        get_variables_result('11000'), 'GetVariables', protocol=compat.OcppJsonProtocol.v20, options=options,
+    )
+    second = serializer.parse(
+        get_variables_result('7400'), 'GetVariables', protocol=compat.OcppJsonProtocol.v20, options=options,
+    )
+
+    # Nested complex types with the same raw content are shared, frozen, instances
+    first_results, second_results = first.payload.getVariableResult, second.payload.getVariableResult
+    assert first_results[0].component is first_results[1].component is second_results[0].component
+    assert first_results[0].variable is not first_results[1].variable
+    assert first_results[1] is second_results[1]
+    assert first_results[0] is not second_results[0]
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first_results[0].component.name = 'Connector'
+
+    # Parsed messages are equal to the ones parsed without flyweights
+    assert first == serializer.parse(
+        get_variables_result('11000'), 'GetVariables', protocol=compat.OcppJsonProtocol.v20,
+    )
+
+    # Deep copies don't share instances with the cache, and are still frozen
+    duplicate = copy.deepcopy(first)
+    assert duplicate == first
+    assert duplicate.payload.getVariableResult[0].component is not first_results[0].component
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        duplicate.payload.getVariableResult[0].component.name = 'Connector'
+
+    # Invalid content is still rejected
+    invalid = get_variables_result('11000')
+    invalid[2]['getVariableResult'][0]['component']['evse']['id'] = 1.0
+    with pytest.raises(exceptions.OCPPException):
+        serializer.parse(invalid, 'GetVariables', protocol=compat.OcppJsonProtocol.v20, options=options)
+
+
+def test_parse_flyweights_options():
+    flyweights = cache.LRUCache()
+    data = {
+        'complexValue': {'enumValue': 'Foo', 'validatedValue': 'data'},
+        'listValue': [{'datetimeValue': '2019-01-30T12:00:00Z', 'nestedListValue': [{'value': 'foo'}] * 10}],
+    }
+    unlimited = serializer.ParseOptions(flyweights=flyweights, limits=None)
+    complex_req_msg = serializer.parse_data(messages.ComplexAction.req, data, options=unlimited)
+    assert serializer.parse_data(messages.ComplexAction.req, data, options=unlimited).listValue[0] is (
+        complex_req_msg.listValue[0]
+    )
+
+    # Instances cached under other options aren't shared: their limits are still enforced...
+    limited = serializer.ParseOptions(flyweights=flyweights, limits=serializer.Limits(max_list_length=5))
+    with pytest.raises(errors.OccurenceConstraintViolationError):
+        serializer.parse_data(messages.ComplexAction.req, data, options=limited)
+
+    # ... as well as their field parsers
+    field_parsers = serializer.ParseOptions(flyweights=flyweights, limits=None, field_parsers={
+        types.ListElementType: {'nestedListValue': lambda field, raw, options: tuple(item['value'] for item in raw)},
+    })
+    parsed = serializer.parse_data(messages.ComplexAction.req, data, options=field_parsers)
+    assert parsed.listValue[0].nestedListValue == ('foo',) * 10
+    assert parsed.listValue[0] is not complex_req_msg.listValue[0]
+
+
+def test_parse_into_dict():
+    raw_data = [2, 'uid', 'BootNotification', {
+        'chargePointModel': 'model', 'chargePointVendor': 'vendor', 'firmwareVersion': 'v1', 'meterSerialNumber': None,
+    }]
+    message = serializer.parse(list(raw_data), protocol=compat.OcppJsonProtocol.v16, into='dict')
+    # Undefined optional fields are omitted
+    payload = {'chargePointModel': 'model', 'chargePointVendor': 'vendor', 'firmwareVersion': 'v1'}
+    assert message.payload == payload
+    serialized = serializer.serialize(message, protocol=compat.OcppJsonProtocol.v16)
+    assert serialized == [2, 'uid', 'BootNotification', payload]
+
+    # Nested complex types are dicts too, cleaned by their encoders
+    raw_data = [3, 'uid', {'getVariableResult': [
+        {
+            'attributeStatus': 'Accepted',
+            'component': {'name': 'EVSE', 'evse': {'id': 1}},
+            'variable': {'name': 'Power'},
+        },
+    ]}]
+    message = serializer.parse(list(raw_data), 'GetVariables', protocol=compat.OcppJsonProtocol.v20, into='dict')
+    result = message.payload['getVariableResult'][0]
+    assert result['component'] == {'name': 'EVSE', 'evse': {'id': 1}}
+    assert result['attributeStatus'].value == 'Accepted'
+    assert serializer.serialize(message, 'GetVariables', protocol=compat.OcppJsonProtocol.v20) == raw_data
+
+    # Same checks as when parsing into dataclasses
+    with pytest.raises(exceptions.OCPPException):
+        serializer.parse([2, 'uid', 'BootNotification', {'chargePointModel': 'model'}],
+                         protocol=compat.OcppJsonProtocol.v16, into='dict')
+    with pytest.raises(exceptions.OCPPException):
+        serializer.parse([2, 'uid', 'BootNotification', {'chargePointModel': 'm' * 21, 'chargePointVendor': 'vendor'}],
+                         protocol=compat.OcppJsonProtocol.v16, into='dict')
+    with pytest.raises(ValueError):
+        serializer.parse(list(raw_data), 'GetVariables', protocol=compat.OcppJsonProtocol.v20, into='tuple')
+
+
+def test_serialize_data():
+    payload_class = compat.get_request_payload_dataclass(messages_v16.BootNotification)
+    assert serializer.serialize_data(payload_class, {'chargePointModel': 'model', 'chargePointVendor': 'vendor'}) == {
+        'chargePointModel': 'model', 'chargePointVendor': 'vendor',
+    }
+
+    with pytest.raises(errors.ProtocolError):
+        serializer.serialize_data(payload_class, {'chargePointModel': 'model', 'chargePointVendor': 'vendor', 'foo': 1})
+    with pytest.raises(errors.ProtocolError):
+        serializer.serialize_data(payload_class, {'chargePointModel': 'model'})
+    with pytest.raises(errors.TypeConstraintViolationError):
+        serializer.serialize_data(
+            compat.get_response_payload_dataclass(messages_v16.BootNotification),
+            {'currentTime': datetime.datetime.now(tz=pytz.utc), 'interval': '300', 'status': 'Accepted'},
+        )
+    with pytest.raises(errors.PropertyConstraintViolationError):
+        serializer.serialize_data(payload_class, {'chargePointModel': 'model', 'chargePointVendor': 'v' * 21})
+
+    # The action's dataclass must be found to serialize dict payloads
+    call = structure.Call(uniqueId='uid', action='BootNotification', payload={'chargePointModel': 'model'})
+    with pytest.raises(ValueError):
+        serializer.serialize(call)
+    with pytest.raises(ValueError):
+        serializer.serialize(structure.CallResult(uniqueId='uid', payload={}), protocol=compat.OcppJsonProtocol.v16)
+
+
+def _meter_values(count, value='1'):
+    return [2, 'uid', 'MeterValues', {'connectorId': 1, 'meterValue': [
+        {'timestamp': '2020-06-01T12:00:00Z', 'sampledValue': [{'value': value}]} for _ in range(count)
+    ]}]
+
+
+def test_parse_limits():
+    limits = serializer.Limits(max_list_length=2, max_string_length=20, max_depth=6)
+    options = serializer.ParseOptions(limits=limits)
+    v16 = compat.OcppJsonProtocol.v16
+    serializer.parse(_meter_values(2), protocol=v16, options=options)
+
+    with pytest.raises(exceptions.OCPPException) as exc_info:
+        serializer.parse(_meter_values(3), protocol=v16, options=options)
+    assert exc_info.value.ocpp_error.code == common_types.ErrorCodeEnum.OccurenceConstraintViolation
+    assert exc_info.value.ocpp_error.details['max_length'] == 2
+    with pytest.raises(exceptions.OCPPException) as exc_info:
+        serializer.parse(_meter_values(1, value='1' * 21), protocol=v16, options=options)
+    assert exc_info.value.ocpp_error.code == common_types.ErrorCodeEnum.PropertyConstraintViolation
+    # Depth is checked while parsing the payload, and on CallError details which aren't parsed any further
+    deep_options = serializer.ParseOptions(limits=dataclasses.replace(limits, max_depth=5))
+    with pytest.raises(exceptions.OCPPException) as exc_info:
+        serializer.parse(_meter_values(1), protocol=v16, options=deep_options)
+    assert exc_info.value.ocpp_error.code == common_types.ErrorCodeEnum.FormationViolation
+    assert exc_info.value.related_request_id == 'uid'
+    with pytest.raises(exceptions.OCPPException) as exc_info:
+        serializer.parse([4, 'uid', 'GenericError', '', {'a': [[[[[]]]]]}], protocol=v16, options=options)
+    assert exc_info.value.ocpp_error.code == common_types.ErrorCodeEnum.FormationViolation
+    assert exc_info.value.related_request_id == '-1'
+    serializer.parse([4, 'uid', 'GenericError', '', {'a': [[[[]]]]}], protocol=v16, options=options)
+
+    # Per-field overrides, and disabled limits
+    payload_class = compat.get_request_payload_dataclass(messages_v16.MeterValues)
+    list_lengths = {payload_class: {'meterValue': 3}}
+    options = serializer.ParseOptions(limits=dataclasses.replace(limits, list_lengths=list_lengths))
+    serializer.parse(_meter_values(3), protocol=v16, options=options)
+    serializer.parse(_meter_values(3, value='1' * 21), protocol=v16, options=serializer.ParseOptions(limits=None))
+
+    # OCPP v20 error codes
+    with pytest.raises(exceptions.OCPPException) as exc_info:
+        serializer.parse([4, 'uid', 'GenericError', '', {'a': [[[[[]]]]]}], protocol=compat.OcppJsonProtocol.v20,
+                         options=options)
+    assert exc_info.value.ocpp_error.code == common_types.ErrorCodeEnum.FormatViolation
+    assert isinstance(exc_info.value.ocpp_error.__cause__, errors.FormationViolationError)
+
+
+def test_loads():
+    v16 = compat.OcppJsonProtocol.v16
+    frame = json.dumps(_meter_values(2))
+    message = serializer.loads(frame, protocol=v16)
+    assert len(message.payload.meterValue) == 2
+    assert serializer.loads(frame.encode('utf-8'), protocol=v16) == message
+
+    options = serializer.ParseOptions(limits=serializer.Limits(max_frame_bytes=len(frame) - 1))
+    with pytest.raises(exceptions.OCPPException) as exc_info:
+        serializer.loads(frame, protocol=v16, options=options)
+    assert exc_info.value.ocpp_error.code == common_types.ErrorCodeEnum.FormationViolation
+    # Non-ASCII characters are counted as their UTF-8 encoding
+    options = serializer.ParseOptions(limits=serializer.Limits(max_frame_bytes=len(frame)))
+    serializer.loads(frame, protocol=v16, options=options)
+    with pytest.raises(exceptions.OCPPException):
+        serializer.loads(frame.replace('"1"', '"é"'), protocol=v16, options=options)
+    with pytest.raises(exceptions.OCPPException) as exc_info:
+        serializer.loads(frame, protocol=compat.OcppJsonProtocol.v20, options=serializer.ParseOptions(
+            limits=serializer.Limits(max_frame_bytes=10),
+        ))
+    assert exc_info.value.ocpp_error.code == common_types.ErrorCodeEnum.FormatViolation
+
+    with pytest.raises(exceptions.OCPPException) as exc_info:
+        serializer.loads('[2, "uid"', protocol=v16)
+    assert exc_info.value.ocpp_error.code == common_types.ErrorCodeEnum.GenericError
+    with pytest.raises(exceptions.OCPPException) as exc_info:
+        serializer.loads('[' * 100000 + ']' * 100000, protocol=v16, options=serializer.ParseOptions(
+            limits=serializer.Limits(max_frame_bytes=None),
+        ))
+    assert exc_info.value.ocpp_error.code == common_types.ErrorCodeEnum.FormationViolation
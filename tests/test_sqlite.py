@@ -0,0 +1,84 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import copy
+import sqlite3
+
+import pytest
+
+from ocpp_codec import compat
+from ocpp_codec import serializer
+from ocpp_codec import sqlite
+from ocpp_codec import structure
+from ocpp_codec import types
+
+from .test_columnar import METER_VALUES_V16
+from .test_columnar import TRANSACTION_EVENT_V20
+
+
+def _parse(raw_data, protocol):
+    return serializer.parse(copy.deepcopy(raw_data), protocol=protocol)
+
+
+def test_create_schema():
+    connection = sqlite3.connect(':memory:')
+    sqlite.SQLiteSink(connection).create_schema()
+
+    tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {
+        'v16_BootNotification_req', 'v16_BootNotification_conf', 'v16_MeterValues_req__meterValue__sampledValue',
+        'v20_TransactionEvent_Request', 'v20_TransactionEvent_Request__meterValue',
+    } <= tables
+
+    columns = [row[1] for row in connection.execute('PRAGMA table_info("v20_TransactionEvent_Request")')]
+    # Nested complex types are flattened
+    assert {'id', 'unique_id', 'transactionData__id', 'evse__connectorId'} <= set(columns)
+
+    # Creating the schema again is fine
+    sqlite.SQLiteSink(connection).create_schema()
+
+
+def test_write():
+    connection = sqlite3.connect(':memory:')
+    sink = sqlite.SQLiteSink(connection, batch_size=3)
+    sink.create_schema()
+
+    for _ in range(2):
+        sink.write(_parse(METER_VALUES_V16, compat.OcppJsonProtocol.v16))
+        sink.write(_parse(TRANSACTION_EVENT_V20, compat.OcppJsonProtocol.v20))
+    # The first batch was written, the last message is still buffered
+    assert connection.execute('SELECT COUNT(*) FROM "v16_MeterValues_req"').fetchone() == (2,)
+    assert connection.execute('SELECT COUNT(*) FROM "v20_TransactionEvent_Request"').fetchone() == (1,)
+    sink.close()
+    assert connection.execute('SELECT COUNT(*) FROM "v20_TransactionEvent_Request"').fetchone() == (2,)
+
+    assert connection.execute(
+        'SELECT id, unique_id, connectorId, transactionId FROM "v16_MeterValues_req"',
+    ).fetchall() == [(1, 'uid', 1, 12), (2, 'uid', 1, 12)]
+    # Lists are written to child tables
+    assert connection.execute(
+        'SELECT id, parent_id, position, timestamp FROM "v16_MeterValues_req__meterValue" WHERE parent_id = 2',
+    ).fetchall() == [
+        (4, 2, 0, '2020-01-01T10:00:00.123456+00:00'),
+        (5, 2, 1, '2020-01-01T10:01:00+00:00'),
+        (6, 2, 2, '2020-01-01T10:02:00+00:00'),
+    ]
+    assert connection.execute(
+        'SELECT value, measurand, unit FROM "v16_MeterValues_req__meterValue__sampledValue" WHERE parent_id = 4',
+    ).fetchall() == [('12', None, None), ('12.50', 'Energy.Active.Import.Register', 'Wh'), ('signed-data', None, None)]
+    assert connection.execute(
+        'SELECT transactionData__id, evse__id FROM "v20_TransactionEvent_Request"',
+    ).fetchall() == [('transaction', None)] * 2
+
+    # Another sink carries on assigning ids after existing rows
+    with sqlite.SQLiteSink(connection) as other_sink:
+        call = _parse(METER_VALUES_V16, compat.OcppJsonProtocol.v16)
+        call.payload = types.frozen_variant(type(call.payload))(**{
+            'connectorId': call.payload.connectorId, 'meterValue': call.payload.meterValue,
+        })
+        other_sink.write(call)
+    assert connection.execute('SELECT MAX(id) FROM "v16_MeterValues_req"').fetchone() == (3,)
+
+
+def test_write_errors():
+    sink = sqlite.SQLiteSink(sqlite3.connect(':memory:'))
+    with pytest.raises(ValueError):
+        sink.write(structure.Call(uniqueId='uid', action='Unknown', payload={}))
@@ -0,0 +1,101 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import json
+
+import pytest
+
+from ocpp_codec import compat
+from ocpp_codec import errors
+from ocpp_codec import exceptions
+from ocpp_codec import hooks
+from ocpp_codec import serializer
+from ocpp_codec import tracing
+
+
+BOOT_NOTIFICATION = [2, 'uid', 'BootNotification', {'chargePointModel': 'model', 'chargePointVendor': 'vendor'}]
+
+
+@pytest.fixture
+def tracer():
+    tracer = tracing.InMemoryTracer()
+    tracing.install(tracer)
+    yield tracer
+    tracing.uninstall()
+
+
+def test_spans(tracer):
+    message = serializer.loads(json.dumps(BOOT_NOTIFICATION), protocol=compat.OcppJsonProtocol.v16)
+    serializer.serialize(message)
+
+    payload, parse, serialize_payload, serialize = tracer.spans
+    assert [span.name for span in tracer.spans] == [
+        'ocpp.parse.payload', 'ocpp.parse', 'ocpp.serialize.payload', 'ocpp.serialize',
+    ]
+    assert payload.parent is parse and parse.parent is None
+    assert serialize_payload.parent is serialize
+    assert parse.attributes == {
+        'ocpp.action': 'BootNotification', 'ocpp.unique_id': 'uid', 'ocpp.protocol': 'v16', 'ocpp.message_type': 'CALL',
+    }
+    assert serialize.attributes == parse.attributes
+    assert payload.attributes == {'ocpp.action': 'BootNotification'}
+    assert parse.start_time <= payload.start_time <= payload.end_time <= parse.end_time
+    assert all(span.error is None for span in tracer.spans)
+
+
+def test_errors(tracer):
+    invalid = [2, 'uid', 'BootNotification', {'chargePointModel': 'm' * 21, 'chargePointVendor': 'vendor'}]
+    with pytest.raises(exceptions.OCPPException):
+        serializer.parse(invalid, protocol=compat.OcppJsonProtocol.v16)
+    with pytest.raises(exceptions.OCPPException):
+        serializer.parse([9, 'uid'], protocol=compat.OcppJsonProtocol.v20)
+
+    payload, parse, envelope_parse = tracer.spans
+    assert isinstance(payload.error, errors.PropertyConstraintViolationError)
+    assert payload.attributes['ocpp.error_code'] == 'PropertyConstraintViolation'
+    assert isinstance(parse.error, exceptions.OCPPException)
+    assert parse.attributes['ocpp.error_code'] == 'PropertyConstraintViolation'
+    # The envelope couldn't be parsed, only the protocol is known
+    assert envelope_parse.attributes == {'ocpp.protocol': 'v20', 'ocpp.error_code': 'MessageTypeNotSupported'}
+
+
+def test_install():
+    assert not hooks.enabled
+    tracer, other_tracer = tracing.InMemoryTracer(), tracing.InMemoryTracer()
+    tracing.install(tracer)
+    tracing.install(other_tracer)
+    serializer.parse([3, 'uid', {}], 'StatusNotification', protocol=compat.OcppJsonProtocol.v16)
+    tracing.uninstall()
+    assert not hooks.enabled
+
+    assert not tracer.spans
+    assert [span.name for span in other_tracer.spans] == ['ocpp.parse.payload', 'ocpp.parse']
+    other_tracer.clear()
+    assert not other_tracer.spans
+
+
+def test_opentelemetry():
+    pytest.importorskip('opentelemetry.sdk')
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    otel_tracer = provider.get_tracer(__name__)
+
+    tracing.install(tracing.OpenTelemetryTracer(otel_tracer))
+    try:
+        with otel_tracer.start_as_current_span('handler') as handler:
+            serializer.parse(list(BOOT_NOTIFICATION), protocol=compat.OcppJsonProtocol.v16)
+            with pytest.raises(exceptions.OCPPException):
+                serializer.parse([2, 'uid', 'Unknown', {}], protocol=compat.OcppJsonProtocol.v16)
+    finally:
+        tracing.uninstall()
+
+    payload_span, *parse_spans = [span for span in exporter.get_finished_spans() if span.name != 'handler']
+    assert [span.name for span in parse_spans] == ['ocpp.parse', 'ocpp.parse']
+    assert payload_span.parent.span_id == parse_spans[0].context.span_id
+    assert parse_spans[0].parent.span_id == handler.get_span_context().span_id
+    assert parse_spans[0].attributes['ocpp.action'] == 'BootNotification'
+    assert parse_spans[1].attributes['ocpp.error_code'] == 'NotImplemented'
+    assert not parse_spans[1].status.is_ok
@@ -0,0 +1,92 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import copy
+import dataclasses
+import pickle
+
+import pytest
+
+from ocpp_codec import types as common_types
+
+from . import messages
+from . import types
+
+
+def test_frozen_variant():
+    frozen_class = common_types.frozen_variant(types.ElementType)
+    # Variants are built only once, and are subclasses of the original dataclass
+    assert common_types.frozen_variant(types.ElementType) is frozen_class
+    assert common_types.frozen_variant(frozen_class) is frozen_class
+    assert issubclass(frozen_class, types.ElementType)
+
+    element = frozen_class(value='foo', optionalValue=types.FooBarEnum.Foo)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        element.value = 'bar'
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        del element.value
+
+    # Frozen instances compare equal to mutable ones, and can be hashed
+    assert element == types.ElementType(value='foo', optionalValue=types.FooBarEnum.Foo)
+    assert types.ElementType(value='foo', optionalValue=types.FooBarEnum.Foo) == element
+    assert element != types.ElementType(value='bar')
+    assert hash(element) == hash(frozen_class(value='foo', optionalValue=types.FooBarEnum.Foo))
+    assert repr(element) == repr(types.ElementType(value='foo', optionalValue=types.FooBarEnum.Foo))
+
+    # Nested dataclasses and lists are frozen as well
+    frozen_list_element = common_types.frozen_variant(types.ListElementType)(
+        datetimeValue=None,
+        nestedListValue=[types.ElementType(value='foo')],
+    )
+    assert frozen_list_element.nestedListValue == (element.__class__(value='foo'),)
+    assert isinstance(frozen_list_element.nestedListValue[0], frozen_class)
+    assert frozen_list_element == types.ListElementType(datetimeValue=None, nestedListValue=[types.ElementType('foo')])
+    hash(frozen_list_element)
+
+    # Works on messages too
+    frozen_req = common_types.frozen_variant(messages.NoPayloadAction.req)()
+    assert frozen_req == messages.NoPayloadAction.req()
+    assert {frozen_req: 'value'}[common_types.frozen_variant(messages.NoPayloadAction.req)()] == 'value'
+
+
+def test_tracked_variant():
+    tracked_class = common_types.tracked_variant(types.ElementType)
+    assert common_types.tracked_variant(types.ElementType) is tracked_class
+    assert common_types.tracked_variant(tracked_class) is tracked_class
+    assert issubclass(tracked_class, types.ElementType)
+
+    element = tracked_class(value='foo')
+    assert element == types.ElementType(value='foo')
+    assert types.ElementType(value='foo') == element
+    assert element.dirty_fields == {'value', 'optionalValue'}
+
+    # Reassigning a field marks it as dirty again
+    element._serialized_fields.update(value='foo', optionalValue=None)
+    assert element.dirty_fields == set()
+    element.value = 'bar'
+    assert element.dirty_fields == {'value'}
+
+
+@pytest.mark.parametrize('build_variant', [common_types.frozen_variant, common_types.tracked_variant])
+def test_variant_copy_and_pickle(build_variant):
+    list_element = build_variant(types.ListElementType)(
+        datetimeValue=None,
+        nestedListValue=[build_variant(types.ElementType)(value='foo', optionalValue=types.FooBarEnum.Foo)],
+    )
+    for duplicate in (
+        copy.copy(list_element),
+        copy.deepcopy(list_element),
+        pickle.loads(pickle.dumps(list_element)),
+    ):
+        assert duplicate is not list_element
+        assert type(duplicate) is type(list_element)
+        assert duplicate == list_element
+        assert type(duplicate.nestedListValue[0]) is build_variant(types.ElementType)
+
+    # Copies of frozen instances are still frozen, copies of tracked instances are serialized again
+    duplicate = copy.deepcopy(list_element)
+    if build_variant is common_types.frozen_variant:
+        assert hash(duplicate) == hash(list_element)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            duplicate.datetimeValue = None
+    else:
+        assert duplicate.nestedListValue is not list_element.nestedListValue
+        assert duplicate.dirty_fields == {'datetimeValue', 'nestedListValue'}
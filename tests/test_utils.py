@@ -0,0 +1,62 @@
+# Copyright (c) Polyconseil SAS. All rights reserved.
+import copy
+import dataclasses
+import pickle
+import weakref
+
+import pytest
+
+from ocpp_codec import structure
+from ocpp_codec import utils
+
+
+def test_slotted_dataclass():
+    @utils.slotted_dataclass
+    class Parent:
+        __slots__ = ('extra',)
+
+        value: str
+        optionalValue: int = None
+
+        def __setattr__(self, name, value):
+            # Zero-argument super() still works on the slotted class
+            super().__setattr__(name, value)
+
+    @utils.slotted_dataclass(frozen=False)
+    class Child(Parent):
+        childValue: str = 'default'
+
+    assert Parent.__slots__ == ('extra', 'value', 'optionalValue', '__weakref__')
+    assert Child.__slots__ == ('childValue',)
+
+    child = Child('value')
+    assert not hasattr(child, '__dict__')
+    assert child == Child(value='value', optionalValue=None, childValue='default')
+    child.extra = 'extra'
+    with pytest.raises(AttributeError):
+        child.undefined = 'undefined'
+    assert weakref.ref(child)() is child
+
+
+def test_slotted_dataclass_copy():
+    @utils.slotted_dataclass
+    class Parent:
+        __slots__ = ('extra',)
+
+        value: list
+        shadowed: str = dataclasses.field(init=False)  # Let subclasses define that field
+
+    @utils.slotted_dataclass
+    class Child(Parent):
+        shadowed = 'class attribute'
+
+    child = Child(['value'])
+    child.extra = 'extra'
+    for duplicate in (copy.copy(child), copy.deepcopy(child)):
+        assert duplicate == child
+        assert duplicate.extra == 'extra'
+        assert duplicate.shadowed == 'class attribute'
+    assert copy.deepcopy(child).value is not child.value
+
+    message = structure.CallResult(uniqueId='uid', payload={'status': 'Accepted'})
+    assert pickle.loads(pickle.dumps(message)) == message